@@ -0,0 +1,462 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Bounded cache on top of a HashMap. The map finds a key's entry and an eviction policy (LRU, LFU, CLOCK,
+# or LRU behind a TinyLFU admission filter) decides which entry goes once the cache is over its entry or byte limit.
+# Every operation is O(1), and memoize turns a cache into a decorator
+
+
+import functools
+import sys
+
+import hash_map_oa
+from hash_functions import resolve_hash_function
+from resize_policy import next_power_of_two
+
+
+MASK_64 = (1 << 64) - 1
+POLICIES = ('lru', 'lfu', 'clock', 'tinylfu')
+_NO_KEY = object()  # stands for no key where None could be a real one
+
+
+def _size_of(key: object, value: object) -> int:
+    """
+    Helper _size_of returns the shallow size of a key and value in bytes, the default size of a cache entry
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class _Entry:
+    """
+    Cached key/value pair. prev and next link it into its policy's list, count is its LFU use count or CLOCK
+    reference bit, and home is its LFU frequency node or CLOCK slot
+    """
+    __slots__ = ('key', 'value', 'size', 'prev', 'next', 'count', 'home')
+
+    def __init__(self, key: object = None, value: object = None, size: int = 0) -> None:
+        """
+        Init new _Entry. An entry made without a key is the sentinel of a circular list, linked to itself
+        """
+        self.key = key
+        self.value = value
+        self.size = size
+        self.prev = self.next = self
+        self.count = 0
+        self.home = None
+
+
+def _unlink(entry: _Entry) -> None:
+    """
+    Helper _unlink takes entry out of the list it is in
+    """
+    entry.prev.next = entry.next
+    entry.next.prev = entry.prev
+
+
+def _push_front(head: _Entry, entry: _Entry) -> None:
+    """
+    Helper _push_front links entry in right after the sentinel head, the most recently used end
+    """
+    entry.prev = head
+    entry.next = head.next
+    head.next.prev = entry
+    head.next = entry
+
+
+class _LRU:
+    """
+    Least recently used eviction, with the entries in a list ordered by last use
+    """
+
+    def __init__(self) -> None:
+        self.head = _Entry()
+
+    def add(self, entry: _Entry) -> None:
+        _push_front(self.head, entry)
+
+    def touch(self, entry: _Entry) -> None:
+        _unlink(entry)
+        _push_front(self.head, entry)
+
+    def remove(self, entry: _Entry) -> None:
+        _unlink(entry)
+
+    def victim(self) -> _Entry:
+        return self.head.prev
+
+    def clear(self) -> None:
+        self.head = _Entry()
+
+
+class _FrequencyNode:
+    """
+    Node of the LFU frequency list, holding the entries used count times, most recently used first
+    """
+    __slots__ = ('count', 'entries', 'prev', 'next')
+
+    def __init__(self, count: int) -> None:
+        self.count = count
+        self.entries = _Entry()
+        self.prev = self.next = self
+
+
+class _LFU:
+    """
+    Least frequently used eviction in O(1): the frequency nodes are kept in a list in increasing order of count, so
+    a use moves an entry to the next node, and the victim is the least recently used entry of the first node
+    """
+
+    def __init__(self) -> None:
+        self.head = _FrequencyNode(0)
+
+    def _node_after(self, node: _FrequencyNode, count: int) -> _FrequencyNode:
+        """
+        Method _node_after returns the node for count, which belongs right after node, creating it if needed
+        """
+        following = node.next
+        if following.count == count:
+            return following
+        new_node = _FrequencyNode(count)
+        new_node.prev, new_node.next = node, following
+        node.next = following.prev = new_node
+        return new_node
+
+    def _leave(self, entry: _Entry) -> None:
+        """
+        Method _leave takes entry out of its frequency node, dropping the node if that empties it
+        """
+        _unlink(entry)
+        node = entry.home
+        if node.entries.next is node.entries:
+            node.prev.next = node.next
+            node.next.prev = node.prev
+
+    def add(self, entry: _Entry) -> None:
+        entry.count = 1
+        entry.home = self._node_after(self.head, 1)
+        _push_front(entry.home.entries, entry)
+
+    def touch(self, entry: _Entry) -> None:
+        node = entry.home
+        entry.count += 1
+        new_node = self._node_after(node, entry.count)  # before _leave, which may unlink node
+        self._leave(entry)
+        entry.home = new_node
+        _push_front(new_node.entries, entry)
+
+    def remove(self, entry: _Entry) -> None:
+        self._leave(entry)
+
+    def victim(self) -> _Entry:
+        return self.head.next.entries.prev
+
+    def clear(self) -> None:
+        self.head = _FrequencyNode(0)
+
+
+class _Clock:
+    """
+    CLOCK eviction, an approximation of LRU that only sets a bit on a hit. The entries sit in a ring of slots and
+    the hand clears set bits as it passes, stopping at the first entry whose bit is already clear
+    """
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def add(self, entry: _Entry) -> None:
+        if self.free:
+            entry.home = self.free.pop()
+            self.slots[entry.home] = entry
+        else:
+            entry.home = len(self.slots)
+            self.slots.append(entry)
+
+    def touch(self, entry: _Entry) -> None:
+        entry.count = 1
+
+    def remove(self, entry: _Entry) -> None:
+        self.slots[entry.home] = None
+        self.free.append(entry.home)
+
+    def victim(self) -> _Entry:
+        slots = self.slots
+        while True:
+            entry = slots[self.hand]
+            if entry is not None:
+                if not entry.count:
+                    return entry
+                entry.count = 0
+            self.hand = (self.hand + 1) % len(slots)
+
+    def clear(self) -> None:
+        self.slots = []
+        self.free = []  # indexes of slots emptied by removes, filled again before the ring grows
+        self.hand = 0
+
+
+class _FrequencySketch:
+    """
+    Count-min sketch estimating how often each key was seen recently, for TinyLFU admission. It has four rows of
+    counters capped at 15, and every counter is halved once sample_size keys have been counted so old popularity
+    fades
+    """
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, width: int) -> None:
+        width = next_power_of_two(max(16, width))
+        self.rows = [bytearray(width) for _ in self.SEEDS]
+        self.shift = 64 - (width.bit_length() - 1)
+        self.sample_size = 10 * width
+        self.additions = 0
+
+    def increment(self, hash: int) -> None:
+        """
+        Method increment counts one more sighting of the key with the given hash
+        """
+        hash &= MASK_64
+        for row, seed in zip(self.rows, self.SEEDS):
+            index = ((hash * seed) & MASK_64) >> self.shift
+            if row[index] < 15:
+                row[index] += 1
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.rows = [bytearray(count >> 1 for count in row) for row in self.rows]
+            self.additions //= 2
+
+    def estimate(self, hash: int) -> int:
+        """
+        Method estimate returns an upper bound on the recent count of the key with the given hash
+        """
+        hash &= MASK_64
+        return min(row[((hash * seed) & MASK_64) >> self.shift] for row, seed in zip(self.rows, self.SEEDS))
+
+
+class Cache:
+    def __init__(self, max_entries: int = None, max_bytes: int = None, policy: str = 'lru', function='builtin',
+                 backend=hash_map_oa, size_of=_size_of, **kwargs) -> None:
+        """
+        Init new Cache holding at most max_entries entries and max_bytes bytes, where an entry's bytes are
+        size_of(key, value) (the shallow sizes of both by default), with None for no limit. policy is 'lru', 'lfu',
+        'clock', or 'tinylfu' for LRU eviction behind a TinyLFU filter that only admits a new key if it has been seen
+        more often lately than the entry it would evict. The entries are found through a backend.HashMap (hash_map_oa
+        by default, or any module with the same API) using function, and any other keyword argument is passed on
+        to it. 'builtin' also takes keys that are not strings, as long as they are hashable
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}, choose one of {POLICIES}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.size_of = size_of
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.map = backend.HashMap(max_entries or 16, self.hash_function, **kwargs)
+        self._policy = {'lru': _LRU, 'lfu': _LFU, 'clock': _Clock, 'tinylfu': _LRU}[policy]()
+        self._sketch = _FrequencySketch(max_entries or 4096) if policy == 'tinylfu' else None
+        self._missed = _NO_KEY  # the key of the last lookup that missed, whose access the sketch has already counted
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0  # new keys the TinyLFU filter or the byte limit kept out
+
+    @property
+    def size(self) -> int:
+        """
+        Number of entries in the cache
+        """
+        return self.map.size
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the cache
+        """
+        return self.map.size
+
+    def __contains__(self, key: object) -> bool:
+        """
+        Return True if key is cached, without counting a hit or a miss
+        """
+        return self.map.contains_key(key)
+
+    def contains_key(self, key: object) -> bool:
+        """
+        Method contains_key returns True if key is cached, without counting a hit or a miss
+        """
+        return self.map.contains_key(key)
+
+    def _lookup(self, key: object) -> _Entry:
+        """
+        Method _lookup returns the entry for key, or None, and counts the hit or miss
+        """
+        if self._sketch is not None:
+            self._sketch.increment(self.hash_function(key))
+        entry = self.map.get(key)
+        if entry is None:
+            self.misses += 1
+            if self._sketch is not None:
+                self._missed = key
+            return None
+        self.hits += 1
+        self._policy.touch(entry)
+        return entry
+
+    def get(self, key: object) -> object:
+        """
+        Method get returns the value cached for key and marks it used. If the key is not cached it returns None
+        """
+        entry = self._lookup(key)
+        return entry.value if entry is not None else None
+
+    def put(self, key: object, value: object) -> None:
+        """
+        Method put caches value for key, evicting entries until the cache is within its limits. A new key bigger
+        than max_bytes on its own, or one the TinyLFU filter turns away, is not cached
+        """
+        size = self.size_of(key, value) if self.max_bytes is not None else 0
+        entry = self.map.get(key)
+
+        if entry is not None:
+            self.bytes += size - entry.size
+            entry.value, entry.size = value, size
+            self._policy.touch(entry)
+            self._evict(0, 0)  # a bigger value may push the cache over max_bytes
+            return
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejections += 1
+            return
+        if self._sketch is not None:
+            hash = self.hash_function(key)
+            # a put right after a get that missed the key is the same access, which the get already counted
+            if key != self._missed:
+                self._sketch.increment(hash)
+            self._missed = _NO_KEY
+            if self._over(1, size) and (self._sketch.estimate(hash)
+                                        <= self._sketch.estimate(self.hash_function(self._policy.victim().key))):
+                self.rejections += 1
+                return
+
+        # make room first, so a policy that ranks new entries lowest cannot evict the one being added
+        self._evict(1, size)
+        entry = _Entry(key, value, size)
+        self.map.put(key, entry)
+        self._policy.add(entry)
+        self.bytes += size
+
+    def _over(self, entries: int, size: int) -> bool:
+        """
+        Method _over returns True if the cache would be over a limit with entries more entries and size more bytes
+        """
+        return ((self.max_entries is not None and self.map.size + entries > self.max_entries)
+                or (self.max_bytes is not None and self.bytes + size > self.max_bytes))
+
+    def _evict(self, entries: int, size: int) -> None:
+        """
+        Method _evict evicts the policy's victims until entries more entries and size more bytes fit
+        """
+        while self.map.size and self._over(entries, size):
+            entry = self._policy.victim()
+            self._policy.remove(entry)
+            self.map.remove(entry.key)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def remove(self, key: object) -> None:
+        """
+        Method remove removes key from the cache. If the key is not cached, nothing is done
+        """
+        entry = self.map.get(key)
+        if entry is not None:
+            self._policy.remove(entry)
+            self.map.remove(key)
+            self.bytes -= entry.size
+
+    def clear(self) -> None:
+        """
+        Method clear empties the cache. The counters are kept
+        """
+        self.map.clear()
+        self._policy.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Method stats returns the cache's counters and its hit ratio
+        """
+        lookups = self.hits + self.misses
+        return {
+            'policy': self.policy,
+            'size': self.map.size,
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+        }
+
+
+_KEYWORDS = object()  # separates the positional from the keyword arguments in a memoize key
+
+
+def memoize(max_entries: int = 128, max_bytes: int = None, policy: str = 'lru', **kwargs):
+    """
+    Function memoize returns a decorator that caches a function's results in a Cache with the given limits and
+    policy, keyed on its arguments, which must be hashable. Any other keyword argument is passed on to the Cache.
+    The decorated function has the cache as its cache attribute
+    """
+    def decorator(func):
+        cache = Cache(max_entries, max_bytes, policy, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(*args, **keywords):
+            key = args
+            if keywords:
+                key += (_KEYWORDS,) + tuple(sorted(keywords.items()))
+            elif len(args) == 1 and type(args[0]) in (str, int):
+                key = args[0]  # a lone str or int is its own key, which saves building and hashing a tuple
+
+            entry = cache._lookup(key)
+            if entry is not None:
+                return entry.value
+            value = func(*args, **keywords)
+            cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nevicting with each policy, 3 entries at most")
+    print("---------------------------------------------")
+    for policy in POLICIES:
+        cache = Cache(3, policy=policy)
+        for key in ('a', 'b', 'c', 'a', 'a', 'b', 'd', 'a', 'e', 'e', 'e', 'f'):
+            if cache.get(key) is None:
+                cache.put(key, key.upper())
+        print(f"{policy:<8}", sorted(cache.map.keys()), cache.stats())
+
+    print("\ntinylfu counts a miss followed by a put as one access")
+    print("-----------------------------------------------------")
+    cache = Cache(3, policy='tinylfu')
+    if cache.get('a') is None:
+        cache.put('a', 'A')
+    cache.put('b', 'B')
+    assert cache._sketch.estimate(cache.hash_function('a')) == 1
+    assert cache._sketch.estimate(cache.hash_function('b')) == 1
+    cache.get('a')
+    print(cache._sketch.estimate(cache.hash_function('a')), cache._sketch.estimate(cache.hash_function('b')))
+
+    @memoize(max_entries=100)
+    def fibonacci(n: int) -> int:
+        return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+    print("\nmemoized fibonacci(90):", fibonacci(90), fibonacci.cache.stats())
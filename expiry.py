@@ -0,0 +1,172 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Per-key expiration for hash_map_oa.HashMap and hash_map_sc.HashMap. The deadlines live beside the
+# table in a min-heap, so a sweep only looks at the keys that are due instead of scanning every bucket, and a
+# Sweeper thread can run those sweeps in the background
+
+
+import heapq
+import threading
+import time
+
+
+class Expiry:
+    """
+    Deadlines of the keys put with a ttl. deadlines has the current deadline of each key, and heap has (deadline, key)
+    pairs in deadline order. Giving a key a new deadline or none at all leaves its old pair in the heap, and due skips
+    a pair that no longer matches deadlines
+    """
+
+    def __init__(self, clock=time.monotonic) -> None:
+        """
+        Init new Expiry that reads the time in seconds from clock
+        """
+        self.clock = clock
+        self.deadlines = {}
+        self.heap = []
+
+    def set(self, key: str, ttl: float) -> None:
+        """
+        Method set makes key expire ttl seconds from now
+        """
+        deadline = self.clock() + ttl
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, key))
+
+        # rebuild the heap once pairs left behind by new deadlines outnumber the live ones
+        if len(self.heap) > 2 * len(self.deadlines) + 1024:
+            self.heap = [(deadline, key) for key, deadline in self.deadlines.items()]
+            heapq.heapify(self.heap)
+
+    def discard(self, key: str) -> None:
+        """
+        Method discard forgets the deadline of key, if it has one
+        """
+        self.deadlines.pop(key, None)
+
+    def expired(self, key: str) -> bool:
+        """
+        Method expired returns True if key has a deadline and it has passed
+        """
+        deadline = self.deadlines.get(key)
+        return deadline is not None and deadline <= self.clock()
+
+    def remaining(self, key: str) -> float:
+        """
+        Method remaining returns the seconds left before key expires, or None if it has no deadline
+        """
+        deadline = self.deadlines.get(key)
+        return None if deadline is None else deadline - self.clock()
+
+    def due(self, limit: int = None) -> list:
+        """
+        Method due takes at most limit keys whose deadline has passed off the heap and returns them, earliest first.
+        A limit of None takes every one of them
+        """
+        now, heap, deadlines = self.clock(), self.heap, self.deadlines
+        keys = []
+        while heap and heap[0][0] <= now and (limit is None or len(keys) < limit):
+            deadline, key = heapq.heappop(heap)
+            if deadlines.get(key) == deadline:
+                keys.append(key)
+        return keys
+
+    def clear(self) -> None:
+        """
+        Method clear forgets every deadline
+        """
+        self.deadlines = {}
+        self.heap = []
+
+
+class Sweeper:
+    """
+    Background thread calling hash_map.expire(limit) every interval seconds, so expired keys nobody looks up again
+    still give their memory back. The maps are not thread safe: if anything else uses hash_map while the sweeper
+    runs, pass the lock it holds while doing so, and each sweep holds it too
+    """
+
+    def __init__(self, hash_map, interval: float = 1.0, limit: int = 1000, lock=None) -> None:
+        """
+        Init new Sweeper for hash_map and start it
+        """
+        self.hash_map = hash_map
+        self.interval = interval
+        self.limit = limit
+        self.lock = lock
+        self.expired = 0  # keys removed by the sweeper so far
+        self.error = None  # an exception raised by a sweep, which stops the thread
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """
+        Method _run is the background thread, sweeping until stop is called
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                if self.lock is not None:
+                    with self.lock:
+                        self.expired += self.hash_map.expire(self.limit)
+                else:
+                    self.expired += self.hash_map.expire(self.limit)
+            except Exception as error:
+                self.error = error
+                return
+
+    def stop(self) -> None:
+        """
+        Method stop stops the thread and waits for it, raising any exception a sweep ran into
+        """
+        self._stopped.set()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    import hash_map_oa
+    import hash_map_sc
+    import wal
+
+    print("\nlazy expiry, bounded sweeps and a background sweeper")
+    print("----------------------------------------------------")
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(16, 'fnv1a')
+        for i in range(1000):
+            m.put('session' + str(i), i, ttl=0.05 if i % 4 else 60)
+        time.sleep(0.1)
+        print(module.__name__, m.size, m.get('session1'), m.contains_key('session2'), m.get('session4'), m.size)
+        print(m.expire(limit=100), m.size, len(m.expiry.heap))
+
+        lock = threading.Lock()
+        sweeper = Sweeper(m, interval=0.01, limit=100, lock=lock)
+        time.sleep(0.2)
+        sweeper.stop()
+        with lock:
+            print(sweeper.expired, m.size, m.expire())
+
+    print("\nttls survive recovery from the write-ahead log")
+    print("----------------------------------------------")
+    with tempfile.TemporaryDirectory() as directory:
+        m = wal.open_map(directory, hash_map_oa.HashMap, 16, 'fnv1a')
+        m.put('short', 1, ttl=0.05)
+        m.put('long', 2, ttl=60)
+        m.put('forever', 3)
+        m.wal.compact(wait=True)  # the deadlines go into a file next to the snapshot
+        m.put('later', 4, ttl=60)
+        m.wal.close()
+        time.sleep(0.1)
+
+        m = wal.open_map(directory, hash_map_oa.HashMap, 16, 'fnv1a')
+        print(m.get('short'), m.get('long'), m.get('forever'), 59 < m.ttl('long') <= 60, 59 < m.ttl('later') <= 60,
+              m.ttl('forever'), sorted(os.listdir(directory)))
+        m.wal.close()
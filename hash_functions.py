@@ -0,0 +1,191 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Hash functions for the hash map implementations, a registry so a HashMap can select one by name, and
+# a report on how evenly a hash function spreads a sample of keys
+
+
+import hashlib
+import os
+import zlib
+
+
+MASK_64 = (1 << 64) - 1
+FNV_OFFSET_BASIS = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+
+def hash_function_1(key: str) -> int:
+    """
+    Sample Hash function #1 to be used with HashMap implementation
+    DO NOT CHANGE THIS FUNCTION IN ANY WAY
+    """
+    hash = 0
+    for letter in key:
+        hash += ord(letter)
+    return hash
+
+
+def hash_function_2(key: str) -> int:
+    """
+    Sample Hash function #2 to be used with HashMap implementation
+    DO NOT CHANGE THIS FUNCTION IN ANY WAY
+    """
+    hash, index = 0, 0
+    index = 0
+    for letter in key:
+        hash += (index + 1) * ord(letter)
+        index += 1
+    return hash
+
+
+def builtin_hash(key: str) -> int:
+    """
+    Function builtin_hash wraps Python's hash as a non-negative 64 bit value. It is the fastest option, but string
+    hashes change between processes unless PYTHONHASHSEED is set
+    """
+    return hash(key) & MASK_64
+
+
+def fnv1a(key: str) -> int:
+    """
+    Function fnv1a returns the 64 bit FNV-1a hash of the key's UTF-8 bytes. It is stable across processes
+    """
+    hash = FNV_OFFSET_BASIS
+    for byte in key.encode():
+        hash = ((hash ^ byte) * FNV_PRIME) & MASK_64
+    return hash
+
+
+def crc32(key: str) -> int:
+    """
+    Function crc32 returns the CRC-32 of the key's UTF-8 bytes, computed in C by zlib. It is stable across processes
+    """
+    return zlib.crc32(key.encode())
+
+
+def seeded_hash(seed: bytes = None):
+    """
+    Function seeded_hash returns a hash function keyed with seed (random if not given). The function is a 64 bit keyed
+    BLAKE2b digest, so keys that collide cannot be found without knowing the seed
+    """
+    if seed is None:
+        seed = os.urandom(16)
+    blake2b = hashlib.blake2b
+
+    def hash_function(key: str) -> int:
+        return int.from_bytes(blake2b(key.encode(), digest_size=8, key=seed).digest(), 'little')
+
+    hash_function.seed = seed
+    return hash_function
+
+
+HASH_FUNCTIONS = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+    'builtin': builtin_hash,
+    'fnv1a': fnv1a,
+    'crc32': crc32,
+    'seeded': seeded_hash(),
+}
+
+
+def register_hash_function(name: str, function) -> None:
+    """
+    Function register_hash_function makes function selectable by name
+    """
+    HASH_FUNCTIONS[name] = function
+
+
+def get_hash_function(name: str):
+    """
+    Function get_hash_function returns the hash function registered under name
+    """
+    if name not in HASH_FUNCTIONS:
+        raise KeyError(f"no hash function registered as {name!r}, choose one of {sorted(HASH_FUNCTIONS)}")
+    return HASH_FUNCTIONS[name]
+
+
+def function_name(function) -> str:
+    """
+    Function function_name returns the name function is registered under, or '' if it is not registered
+    """
+    for name, registered in HASH_FUNCTIONS.items():
+        if registered is function:
+            return name
+    return ''
+
+
+def resolve_hash_function(function):
+    """
+    Function resolve_hash_function returns function itself, or the registered hash function if given a name
+    """
+    if isinstance(function, str):
+        return get_hash_function(function)
+    return function
+
+
+def distribution_report(function, keys, capacity: int) -> dict:
+    """
+    Function distribution_report hashes the keys into capacity buckets and reports how evenly they spread. The chain
+    histogram maps a chain length to the number of buckets with that many keys (separate chaining), and the probe
+    lengths are what triangular open addressing needs to insert each key in turn
+    """
+    function = resolve_hash_function(function)
+    hashes = [function(key) for key in keys]
+
+    chains = [0] * capacity
+    for hash in hashes:
+        chains[hash % capacity] += 1
+    histogram = {}
+    for length in chains:
+        histogram[length] = histogram.get(length, 0) + 1
+
+    occupied = bytearray(capacity)
+    max_probe, total_probe = 0, 0
+    for hash in hashes[:capacity]:  # an open addressing table cannot hold more keys than buckets
+        bucket = hash % capacity
+        probes = 1
+        while occupied[bucket]:
+            if probes < capacity:
+                bucket = (bucket + probes) % capacity
+            else:
+                # the triangular sequence can skip free buckets when capacity is not a power of two, so carry on
+                # with a linear scan, which is sure to reach one
+                bucket = (bucket + 1) % capacity
+            probes += 1
+        occupied[bucket] = 1
+        max_probe = max(max_probe, probes)
+        total_probe += probes
+
+    placed = min(len(hashes), capacity)
+    return {
+        'keys': len(hashes),
+        'capacity': capacity,
+        'distinct_hashes': len(set(hashes)),
+        'empty_buckets': histogram.get(0, 0),
+        'max_chain': max(chains) if chains else 0,
+        'chain_histogram': dict(sorted(histogram.items())),
+        'max_probe': max_probe,
+        'mean_probe': total_probe / placed if placed else 0.0,
+    }
+
+
+def print_distribution_report(keys, capacity: int, names=None) -> None:
+    """
+    Function print_distribution_report prints a distribution report line for each registered hash function
+    """
+    keys = list(keys)
+    print("function          distinct  empty  max chain  max probe  mean probe")
+    for name in names or HASH_FUNCTIONS:
+        report = distribution_report(name, keys, capacity)
+        print(f"{name:<16} {report['distinct_hashes']:>9} {report['empty_buckets']:>6} {report['max_chain']:>10} "
+              f"{report['max_probe']:>10} {report['mean_probe']:>11.2f}")
+
+
+if __name__ == "__main__":
+    print("\nkey1 .. key9999 into 20011 buckets")
+    print_distribution_report(('key' + str(i) for i in range(10000)), 20011)
+
+    print("\nkey0 .. key10 into 11 buckets, filling every one")
+    print_distribution_report(('key' + str(i) for i in range(11)), 11)
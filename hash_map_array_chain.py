@@ -0,0 +1,412 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Separate chaining hash map with the same behaviour as hash_map_sc.HashMap, but each bucket is a flat
+# Python list created when the first key lands in it, instead of a LinkedList of nodes. A bucket whose chain grows
+# past TREEIFY_THRESHOLD is kept sorted by (hash, key) so that lookups in it are a binary search
+
+
+from bisect import bisect_left
+
+from a6_include import *
+from hash_functions import hash_function_2, resolve_hash_function
+from resize_policy import ResizePolicy
+
+
+TREEIFY_THRESHOLD = 8  # a flat bucket with more entries than this becomes a sorted bucket
+UNTREEIFY_THRESHOLD = 6  # a sorted bucket with this many entries or fewer goes back to a flat one
+
+
+class _SortedBucket:
+    """
+    Bucket for long chains, holding (hash, key) pairs in sorted order with the values in a parallel list. Keys must be
+    orderable, which the str keys the hash maps take always are
+    """
+    __slots__ = ('entries', 'values')
+
+    def __init__(self, flat: list) -> None:
+        """
+        Init new _SortedBucket holding the entries of a flat bucket
+        """
+        items = sorted(zip(zip(flat[0::3], flat[1::3]), flat[2::3]))
+        self.entries = [entry for entry, _ in items]
+        self.values = [value for _, value in items]
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the bucket
+        """
+        return len(self.entries)
+
+    def find(self, key: str, hash: int) -> int:
+        """
+        Method find returns the index of key, or -1 if it is not in the bucket
+        """
+        index = bisect_left(self.entries, (hash, key))
+        if index < len(self.entries) and self.entries[index] == (hash, key):
+            return index
+        return -1
+
+    def put(self, key: str, value: object, hash: int) -> bool:
+        """
+        Method put sets the value for key and returns True if the key was added, or False if it was replaced
+        """
+        index = bisect_left(self.entries, (hash, key))
+        if index < len(self.entries) and self.entries[index] == (hash, key):
+            self.values[index] = value
+            return False
+        self.entries.insert(index, (hash, key))
+        self.values.insert(index, value)
+        return True
+
+    def remove(self, key: str, hash: int) -> bool:
+        """
+        Method remove removes key and returns True if it was in the bucket
+        """
+        index = self.find(key, hash)
+        if index < 0:
+            return False
+        del self.entries[index]
+        del self.values[index]
+        return True
+
+    def flatten(self) -> list:
+        """
+        Method flatten returns the entries as a flat bucket
+        """
+        flat = []
+        for (hash, key), value in zip(self.entries, self.values):
+            flat += (hash, key, value)
+        return flat
+
+
+def _entries(bucket):
+    """
+    Helper _entries yields (hash, key, value) for every entry in a flat or sorted bucket
+    """
+    if type(bucket) is list:
+        for i in range(0, len(bucket), 3):
+            yield bucket[i], bucket[i + 1], bucket[i + 2]
+    else:
+        for (hash, key), value in zip(bucket.entries, bucket.values):
+            yield hash, key, value
+
+
+def _chain_length(bucket) -> int:
+    """
+    Helper _chain_length returns the number of entries in a bucket, or 0 for a bucket that was never created
+    """
+    if bucket is None:
+        return 0
+    if type(bucket) is list:
+        return len(bucket) // 3
+    return len(bucket)
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, policy: ResizePolicy = None) -> None:
+        """
+        Init new HashMap with array buckets for collision resolution. A flat bucket stores hash, key, value, hash,
+        key, value, ... in a single list. If a resize policy is given the table grows and shrinks automatically,
+        otherwise the capacity only changes through resize_table
+        """
+        if policy is not None:
+            capacity = policy.round_capacity(capacity)
+        self.policy = policy
+        self.buckets = [None] * capacity  # a bucket is only created once a key is added to it
+        self.capacity = capacity
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.size = 0
+
+        # _chain_counts[n] is the number of buckets holding n entries, counting a bucket never created as empty
+        self._chain_counts = [capacity]
+        self._max_chain = 0
+        self._sorted_buckets = 0  # buckets kept as a _SortedBucket
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form
+        """
+        out = ''
+        for i in range(self.capacity):
+            bucket = self.buckets[i]
+            chain = ' -> '.join(f"({key}: {value})" for _, key, value in _entries(bucket)) if bucket else ''
+            out += str(i) + ': ' + chain + '\n'
+        return out
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map. It does not change the underlying hash table capacity
+        """
+        self.buckets = [None] * self.capacity
+        self.size = 0
+        self._chain_counts = [self.capacity]
+        self._max_chain = 0
+        self._sorted_buckets = 0
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        hash = self.hash_function(key)
+        bucket = self.buckets[hash % self.capacity]  # only the bucket the key hashes to can hold it
+        if bucket is None:
+            return None
+
+        if type(bucket) is list:
+            # only compare the keys once the stored hashes match
+            for i in range(0, len(bucket), 3):
+                if bucket[i] == hash and bucket[i + 1] == key:
+                    return bucket[i + 2]
+            return None
+
+        index = bucket.find(key, hash)
+        return bucket.values[index] if index >= 0 else None
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value
+        """
+        hash = self.hash_function(key)
+        index = hash % self.capacity
+        bucket = self.buckets[index]
+
+        if bucket is None:
+            # grow the table first if the policy says this insert would overload it
+            if self._grow():
+                index = hash % self.capacity
+                bucket = self.buckets[index]
+            if bucket is None:
+                self.buckets[index] = [hash, key, value]
+                self._count_chain(0, 1)
+                self.size += 1
+                return
+
+        if type(bucket) is list:
+            for i in range(0, len(bucket), 3):
+                if bucket[i] == hash and bucket[i + 1] == key:
+                    bucket[i + 2] = value
+                    return
+            if self._grow():
+                self.put(key, value)  # the key's bucket moved with the resize
+                return
+            bucket += (hash, key, value)
+            self._count_chain(len(bucket) // 3 - 1, len(bucket) // 3)
+            if len(bucket) > TREEIFY_THRESHOLD * 3:
+                self.buckets[index] = _SortedBucket(bucket)
+                self._sorted_buckets += 1
+            self.size += 1
+            return
+
+        if bucket.find(key, hash) < 0 and self._grow():
+            self.put(key, value)
+            return
+        if bucket.put(key, value, hash):
+            self._count_chain(len(bucket) - 1, len(bucket))
+            self.size += 1
+
+    def _grow(self) -> bool:
+        """
+        Method _grow resizes the table before a new key is added if the resize policy says the load factor is too
+        high, and returns True if it did
+        """
+        if self.policy is None:
+            return False
+        new_capacity = self.policy.grow_capacity(self.size, self.capacity)
+        if new_capacity is None:
+            return False
+        self.resize_table(new_capacity)
+        return True
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        hash = self.hash_function(key)
+        index = hash % self.capacity
+        bucket = self.buckets[index]
+        if bucket is None:
+            return
+
+        if type(bucket) is list:
+            for i in range(0, len(bucket), 3):
+                if bucket[i] == hash and bucket[i + 1] == key:
+                    del bucket[i:i + 3]
+                    break
+            else:
+                return
+            self._count_chain(len(bucket) // 3 + 1, len(bucket) // 3)
+            if not bucket:
+                self.buckets[index] = None  # drop the empty bucket so it stops using memory
+
+        else:
+            if not bucket.remove(key, hash):
+                return
+            self._count_chain(len(bucket) + 1, len(bucket))
+            if len(bucket) <= UNTREEIFY_THRESHOLD:
+                self.buckets[index] = bucket.flatten()
+                self._sorted_buckets -= 1
+
+        self.size -= 1
+
+        # give memory back once the table has drained below the policy's minimum load
+        if self.policy is not None:
+            new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+            if new_capacity is not None:
+                self.resize_table(new_capacity)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        hash = self.hash_function(key)
+        bucket = self.buckets[hash % self.capacity]  # only the bucket the key hashes to can hold it
+        if bucket is None:
+            return False
+
+        if type(bucket) is list:
+            for i in range(0, len(bucket), 3):
+                if bucket[i] == hash and bucket[i + 1] == key:
+                    return True
+            return False
+
+        return bucket.find(key, hash) >= 0
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets in the hash table.
+        """
+        return self._chain_counts[0]
+
+    def stats(self) -> dict:
+        """
+        Method stats returns a snapshot of the table's counters in the same format as hash_map_sc.HashMap.stats, plus
+        the number of sorted buckets. Every counter is kept up to date by the operations that change it, so this never
+        scans the table
+        """
+        return {
+            'size': self.size,
+            'capacity': self.capacity,
+            'load': self.size / self.capacity,
+            'occupied_buckets': self.capacity - self._chain_counts[0],
+            'empty_buckets': self._chain_counts[0],
+            'max_chain': self._max_chain,
+            'resizing': False,
+            'sorted_buckets': self._sorted_buckets,
+        }
+
+    def _count_chain(self, old_length: int, new_length: int) -> None:
+        """
+        Method _count_chain records that a bucket went from old_length to new_length entries
+        """
+        counts = self._chain_counts
+        counts[old_length] -= 1
+        if new_length == len(counts):
+            counts.append(0)
+        counts[new_length] += 1
+
+        if new_length > self._max_chain:
+            self._max_chain = new_length
+        elif old_length == self._max_chain and counts[old_length] == 0:
+            self._max_chain = new_length  # the only longest chain got shorter
+
+    def _recount_chains(self) -> None:
+        """
+        Method _recount_chains rebuilds the bucket counters from the current table, after a resize
+        """
+        self._chain_counts = [0]
+        self._max_chain = 0
+        self._sorted_buckets = 0
+        for bucket in self.buckets:
+            length = _chain_length(bucket)
+            while length >= len(self._chain_counts):
+                self._chain_counts.append(0)
+            self._chain_counts[length] += 1
+            self._max_chain = max(self._max_chain, length)
+            if bucket is not None and type(bucket) is not list:
+                self._sorted_buckets += 1
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table changes the capacity of the internal hash table, while retaining
+        existing key/value pairs. The entries are moved to their new buckets using their stored
+        hash, so no key is hashed again.
+        """
+        if self.policy is not None:
+            new_capacity = self.policy.round_capacity(new_capacity)  # keep prime/power of two capacities if requested
+        if new_capacity < 1:
+            return
+
+        new_buckets = [None] * new_capacity
+        for bucket in self.buckets:
+            if bucket is None:
+                continue
+            for hash, key, value in _entries(bucket):
+                index = hash % new_capacity
+                new_bucket = new_buckets[index]
+                if new_bucket is None:
+                    new_buckets[index] = [hash, key, value]
+                elif type(new_bucket) is list:
+                    new_bucket += (hash, key, value)
+                    if len(new_bucket) > TREEIFY_THRESHOLD * 3:
+                        new_buckets[index] = _SortedBucket(new_bucket)
+                else:
+                    new_bucket.put(key, value, hash)
+
+        self.buckets = new_buckets
+        self.capacity = new_capacity
+        self._recount_chains()
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()  # initiate new array to store keys
+
+        for bucket in self.buckets:
+            if bucket is not None:
+                for _, key, _ in _entries(bucket):
+                    key_array.append(key)  # add to the array
+
+        return key_array
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\narray buckets put/remove/resize")
+    print("-------------------------------")
+    m = HashMap(8, 'fnv1a')
+    for i in range(50):
+        m.put('key' + str(i), i * 10)
+    m.put('key1', 'ten')
+    for i in range(0, 50, 4):
+        m.remove('key' + str(i))
+    print(m.size, m.capacity, m.get('key1'), m.get('key4'), m.contains_key('key49'), m.contains_key('key0'))
+    print(m.get_keys().length(), round(m.table_load(), 2), m.empty_buckets())
+
+    print("\nkeys that collide under hash_function_2, checked against a dict")
+    print("---------------------------------------------------------------")
+    m = HashMap(8, hash_function_2)
+    expected = {}
+    for i in range(600):
+        key = str(i * 7 % 300)
+        if i % 5 == 4:
+            m.remove(key)
+            expected.pop(key, None)
+        else:
+            m.put(key, i)
+            expected[key] = i
+    print(m.size == len(expected), all(m.get(key) == value for key, value in expected.items()),
+          not any(m.contains_key(str(i)) for i in range(300) if str(i) not in expected))
+    print(m.stats())
@@ -0,0 +1,689 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Benchmarks for the hash map implementations. Each benchmark prints its results so that runs can be
+# compared before and after a change
+
+
+import gc
+import itertools
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+import tempfile
+import tracemalloc
+
+import cache
+import hash_functions
+import hash_map_array_chain
+import hash_map_compact
+import hash_map_concurrent
+import hash_map_cuckoo
+import hash_map_mmap
+import hash_map_oa
+import hash_map_robin_hood
+import hash_map_sc
+import hash_map_shared
+import hash_map_sharded
+import hash_map_swiss
+import wal
+from resize_policy import ResizePolicy
+
+
+def _time_per_op(func, keys) -> float:
+    """
+    Helper _time_per_op calls func once for every key and returns the average time per call in microseconds
+    """
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def bench_sc_lookup(capacities=(1000, 10000, 100000, 1000000), count: int = 1000) -> None:
+    """
+    Function bench_sc_lookup measures get/contains_key/remove latency of the separate chaining HashMap as the
+    capacity grows. The number of keys stays fixed, so the latency should stay flat as the capacity grows
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+
+    print("\nSC lookup latency (us/op) vs capacity")
+    print("capacity     get  contains  miss  remove")
+    for capacity in capacities:
+        m = hash_map_sc.HashMap(capacity, hash_map_sc.hash_function_2)
+        for key in keys:
+            m.put(key, key)
+
+        get = _time_per_op(m.get, keys)
+        contains = _time_per_op(m.contains_key, keys)
+        miss = _time_per_op(m.contains_key, missing)
+        remove = _time_per_op(m.remove, keys)
+        print(f"{capacity:>8} {get:>7.2f} {contains:>9.2f} {miss:>5.2f} {remove:>7.2f}")
+
+
+def _oa_probe_length(m, key: str) -> int:
+    """
+    Helper _oa_probe_length returns how many buckets the open addressing map looks at to find (or miss) the key
+    """
+    bucket = m.hash_function(key) % m.capacity
+    probes = 1
+    while m.buckets[bucket] is not None and m.buckets[bucket].key != key and probes <= m.capacity:
+        bucket = (bucket + probes) % m.capacity
+        probes += 1
+    return probes
+
+
+def bench_oa_churn(cycles: int = 2000000, live_keys: int = 1000, report_every: int = 250000) -> None:
+    """
+    Function bench_oa_churn runs put/remove cycles of short lived keys against the open addressing HashMap while a
+    fixed set of keys stays live. Tombstone compaction should keep the tombstone count and probe lengths bounded
+    """
+    m = hash_map_oa.HashMap(16, hash_map_oa.hash_function_2)
+    live = ['live' + str(i) for i in range(live_keys)]
+    for key in live:
+        m.put(key, key)
+
+    print("\nOA churn: put/remove cycles with", live_keys, "live keys")
+    print("  cycles  capacity  tombstones  max probe  miss probe  ops/sec")
+    start = time.perf_counter()
+    for i in range(1, cycles + 1):
+        key = 'session' + str(i)
+        m.put(key, i)
+        m.remove(key)
+
+        if i % report_every == 0:
+            elapsed = time.perf_counter() - start
+            max_probe = max(_oa_probe_length(m, key) for key in live)
+            miss_probe = max(_oa_probe_length(m, 'missing' + str(j)) for j in range(live_keys))
+            print(f"{i:>8} {m.capacity:>9} {m.tombstones:>11} {max_probe:>10} {miss_probe:>11} "
+                  f"{report_every * 2 / elapsed:>8.0f}")
+            start = time.perf_counter()
+
+
+def bench_oa_ops(count: int = 100000, function=hash) -> None:
+    """
+    Function bench_oa_ops measures put/get/contains_key/remove throughput of the open addressing HashMap
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    m = hash_map_oa.HashMap(16, function)
+
+    print("\nOA operations (ops/sec) with", count, "keys using", function.__name__)
+    print("     put      get     miss   remove")
+    put = 1e6 / _time_per_op(lambda key: m.put(key, key), keys)
+    get = 1e6 / _time_per_op(m.get, keys)
+    miss = 1e6 / _time_per_op(m.contains_key, missing)
+    remove = 1e6 / _time_per_op(m.remove, keys)
+    print(f"{put:>8.0f} {get:>8.0f} {miss:>8.0f} {remove:>8.0f}")
+
+
+def bench_hash_functions(count: int = 100000) -> None:
+    """
+    Function bench_hash_functions measures the time each registered hash function takes per key, and how well it
+    spreads the same keys over a table twice as large as the key count
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nHash functions over", count, "keys")
+    print("function          us/key  distinct  max chain  max probe")
+    for name, function in hash_functions.HASH_FUNCTIONS.items():
+        per_key = _time_per_op(function, keys)
+        report = hash_functions.distribution_report(function, keys, count * 2)
+        print(f"{name:<16} {per_key:>7.3f} {report['distinct_hashes']:>9} {report['max_chain']:>10} "
+              f"{report['max_probe']:>10}")
+
+
+def bench_resize(count: int = 1000000, function='fnv1a') -> None:
+    """
+    Function bench_resize measures how long resize_table takes to double the capacity of each map holding count string
+    keys. Entries carry their hash, so the time should not depend on how expensive the hash function is
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nresize_table with", count, "keys using", function)
+    for name, m in (('OA', hash_map_oa.HashMap(count * 4, function)), ('SC', hash_map_sc.HashMap(count, function))):
+        for key in keys:
+            m.put(key, key)
+
+        start = time.perf_counter()
+        m.resize_table(m.capacity * 2)
+        print(f"{name}: {time.perf_counter() - start:.2f}s to resize to {m.capacity} buckets")
+
+
+def bench_memory(count: int = 10000000, function='builtin') -> None:
+    """
+    Function bench_memory reports the memory each open addressing storage layout uses per entry, measured with
+    tracemalloc. The keys and values are created before tracing starts, so only the table itself is counted
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nOA memory with", count, "entries")
+    for name, module in (('HashEntry objects', hash_map_oa), ('parallel arrays', hash_map_compact)):
+        tracemalloc.start()
+        m = module.HashMap(16, function)
+        for key in keys:
+            m.put(key, key)
+        used, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<18} {used / count:>7.1f} bytes/entry  (peak {peak / count:.1f}, capacity {m.capacity})")
+        del m
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """
+    Helper _percentile returns the value at the given fraction of an already sorted list
+    """
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_put_latency(count: int = 500000, rehash_step: int = 8, function='builtin') -> None:
+    """
+    Function bench_put_latency reports p50/p99/max latency of each put while the maps grow from a small capacity,
+    resizing all at once and incrementally
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    maps = (
+        ('OA all at once', hash_map_oa.HashMap(16, function)),
+        ('OA incremental', hash_map_oa.HashMap(16, function, rehash_step=rehash_step)),
+        ('SC all at once', hash_map_sc.HashMap(16, function, ResizePolicy(max_load=1.0))),
+        ('SC incremental', hash_map_sc.HashMap(16, function, ResizePolicy(max_load=1.0), rehash_step=rehash_step)),
+    )
+
+    print("\nput latency (us) while growing to", count, "keys")
+    print("map                 p50     p99       max")
+    for name, m in maps:
+        latencies = []
+        gc.disable()  # collector pauses would otherwise hide the resize pauses
+        for key in keys:
+            start = time.perf_counter_ns()
+            m.put(key, key)
+            latencies.append(time.perf_counter_ns() - start)
+        gc.enable()
+        latencies.sort()
+        print(f"{name:<16} {_percentile(latencies, 0.5) / 1000:>6.2f} {_percentile(latencies, 0.99) / 1000:>7.2f} "
+              f"{latencies[-1] / 1000:>9.0f}")
+
+
+def bench_bulk_load(count: int = 1000000, function='builtin') -> None:
+    """
+    Function bench_bulk_load compares loading count pairs with repeated put against put_many and from_pairs
+    """
+    pairs = [('key' + str(i), i) for i in range(count)]
+
+    print("\nloading", count, "pairs (seconds)")
+    print("map   repeated put  put_many  from_pairs")
+    for name, module, kwargs in (('OA', hash_map_oa, {}), ('SC', hash_map_sc, {'policy': ResizePolicy(max_load=1.0)})):
+        start = time.perf_counter()
+        m = module.HashMap(16, function, **kwargs)
+        for key, value in pairs:
+            m.put(key, value)
+        repeated = time.perf_counter() - start
+
+        start = time.perf_counter()
+        m = module.HashMap(16, function, **kwargs)
+        m.put_many(pairs)
+        put_many = time.perf_counter() - start
+
+        start = time.perf_counter()
+        module.HashMap.from_pairs(pairs, function, **kwargs)
+        from_pairs = time.perf_counter() - start
+        print(f"{name:<4} {repeated:>13.2f} {put_many:>9.2f} {from_pairs:>11.2f}")
+
+
+def bench_probe_histograms(count: int = 20000, names=('hash_function_2', 'fnv1a', 'builtin')) -> None:
+    """
+    Function bench_probe_histograms loads count keys into each map with instrumentation enabled, looks every key up,
+    and prints the probe length (OA) and chain depth (SC) percentiles of the lookups for each hash function
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nget probe percentiles with", count, "keys")
+    print("map  function           p50   p90   p99  p999    max")
+    for name, module, kwargs in (('OA', hash_map_oa, {}), ('SC', hash_map_sc, {'policy': ResizePolicy(max_load=1.0)})):
+        for function in names:
+            m = module.HashMap(16, function, **kwargs)
+            m.put_many((key, key) for key in keys)
+            histogram = m.enable_instrumentation().histograms['get']
+            for key in keys:
+                m.get(key)
+            print(f"{name:<4} {function:<16} {histogram.percentile(0.5):>5} {histogram.percentile(0.9):>5} "
+                  f"{histogram.percentile(0.99):>5} {histogram.percentile(0.999):>5} {histogram.percentile(1.0):>6}")
+
+
+def bench_robin_hood(count: int = 235000, function='builtin') -> None:
+    """
+    Function bench_robin_hood compares the memory per entry and the hit and miss lookup latency of quadratic probing
+    at its default 0.5 load and at 0.9, against Robin Hood hashing at 0.9. The default count fills 2 ** 18 buckets
+    to just under 0.9
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    maps = (
+        ('quadratic 0.5', hash_map_oa, {}),
+        ('quadratic 0.9', hash_map_oa, {'policy': ResizePolicy(max_load=0.9)}),
+        ('robin hood 0.9', hash_map_robin_hood, {}),
+    )
+
+    print("\nquadratic probing vs Robin Hood with", count, "keys")
+    print("map               bytes/entry  capacity   get us  miss us  max probe")
+    for name, module, kwargs in maps:
+        tracemalloc.start()
+        m = module.HashMap(16, function, **kwargs)
+        for key in keys:
+            m.put(key, key)
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        get = _time_per_op(m.get, keys)
+        miss = _time_per_op(m.contains_key, missing)
+        print(f"{name:<17} {used / count:>11.1f} {m.capacity:>9} {get:>8.2f} {miss:>8.2f} "
+              f"{m.stats()['max_probe']:>10}")
+
+
+def bench_swiss_lookup(count: int = 200000, miss_ratio: int = 9, function='builtin') -> None:
+    """
+    Function bench_swiss_lookup measures hit and miss latency, and a lookup workload with miss_ratio misses for
+    every hit, against each open addressing layout using its default resize policy
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    lookups = [keys[i] if i % (miss_ratio + 1) == 0 else missing[i] for i in range(count)]
+
+    print("\nlookups with", miss_ratio, "misses per hit over", count, "keys")
+    print("map                load    get us  miss us  mixed us")
+    for name, module in (('HashEntry objects', hash_map_oa), ('parallel arrays', hash_map_compact),
+                         ('swiss groups', hash_map_swiss)):
+        m = module.HashMap(16, function)
+        for key in keys:
+            m.put(key, key)
+        get = _time_per_op(m.get, keys)
+        miss = _time_per_op(m.contains_key, missing)
+        mixed = _time_per_op(m.contains_key, lookups)
+        print(f"{name:<18} {m.table_load():>5.2f} {get:>9.2f} {miss:>8.2f} {mixed:>9.2f}")
+
+
+def bench_get_latency(count: int = 200000, function='fnv1a') -> None:
+    """
+    Function bench_get_latency reports p50/p99/p99.9/max latency of get for hits and misses on maps holding count
+    keys, to compare the unbounded probe sequences and chains with the fixed number of slots cuckoo hashing checks
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(count)]
+    maps = (
+        ('OA quadratic', hash_map_oa, {}),
+        ('SC chaining', hash_map_sc, {'policy': ResizePolicy(max_load=1.0)}),
+        ('robin hood', hash_map_robin_hood, {}),
+        ('cuckoo', hash_map_cuckoo, {}),
+    )
+
+    print("\nget latency (us) with", count, "keys using", function)
+    print("map                load  hit p50   p99  p99.9    max  miss p50   p99  p99.9    max")
+    for name, module, kwargs in maps:
+        m = module.HashMap(16, function, **kwargs)
+        for key in keys:
+            m.put(key, key)
+
+        columns = []
+        gc.disable()  # collector pauses would otherwise hide the lookup times
+        for lookups in (keys, missing):
+            latencies = []
+            for key in lookups:
+                start = time.perf_counter_ns()
+                m.get(key)
+                latencies.append(time.perf_counter_ns() - start)
+            latencies.sort()
+            columns.append(f"{_percentile(latencies, 0.5) / 1000:>8.2f} {_percentile(latencies, 0.99) / 1000:>5.2f} "
+                           f"{_percentile(latencies, 0.999) / 1000:>6.2f} {latencies[-1] / 1000:>6.1f}")
+        gc.enable()
+        print(f"{name:<16} {m.table_load():>6.2f} " + ' '.join(columns))
+
+
+def bench_array_chain(count: int = 200000, sample: int = 5000, functions=('fnv1a', 'hash_function_1')) -> None:
+    """
+    Function bench_array_chain compares the linked list and array bucket chaining maps at a load factor of 1: the
+    memory the table uses per entry, and get latency for a sample of the keys. hash_function_1 gives long chains,
+    which is where sorted buckets keep lookups logarithmic
+    """
+    keys = ['key' + str(i) for i in range(count)]
+    missing = ['missing' + str(i) for i in range(sample)]
+
+    print("\nchaining with", count, "keys")
+    print("map               function         bytes/entry   get us  miss us  max chain")
+    for function in functions:
+        for name, module in (('linked lists', hash_map_sc), ('array buckets', hash_map_array_chain)):
+            tracemalloc.start()
+            m = module.HashMap(count, function)
+            for key in keys:
+                m.put(key, key)
+            used, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            get = _time_per_op(m.get, keys[:sample])
+            miss = _time_per_op(m.contains_key, missing)
+            print(f"{name:<17} {function:<16} {used / count:>11.1f} {get:>8.2f} {miss:>8.2f} "
+                  f"{m.stats()['max_chain']:>10}")
+
+
+def bench_create_clear(capacities=(1000, 100000, 1000000, 10000000), function='builtin') -> None:
+    """
+    Function bench_create_clear measures how long each map takes to be created with, and then cleared at, the given
+    capacity while holding a handful of keys
+    """
+    print("\ncreate and clear time (ms) vs capacity")
+    print("capacity   OA create  OA clear  SC create  SC clear")
+    for capacity in capacities:
+        times = []
+        for module in (hash_map_oa, hash_map_sc):
+            start = time.perf_counter()
+            m = module.HashMap(capacity, function)
+            times.append(time.perf_counter() - start)
+
+            for i in range(10):
+                m.put('key' + str(i), i)
+            start = time.perf_counter()
+            m.clear()
+            times.append(time.perf_counter() - start)
+            del m
+        print(f"{capacity:>8} " + ' '.join(f"{seconds * 1000:>9.2f}" for seconds in times))
+
+
+def bench_concurrent(count: int = 400000, thread_counts=(1, 2, 4, 8), function='builtin') -> None:
+    """
+    Function bench_concurrent measures the total throughput of threads sharing a concurrent HashMap, doing 9 gets for
+    every put, with a single lock and with 16 striped locks. Threads only run in parallel on a free-threaded build
+    """
+    keys = ['key' + str(i) for i in range(10000)]
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+
+    print("\nconcurrent HashMap throughput (ops/sec),", "GIL enabled" if gil else "free-threaded")
+    print("threads    1 lock  16 locks")
+    for threads in thread_counts:
+        results = []
+        for segments in (1, 16):
+            m = hash_map_concurrent.HashMap(len(keys) * 2, function, segments=segments)
+            for key in keys:
+                m.put(key, key)
+
+            def worker(offset: int) -> None:
+                get, put = m.get, m.put
+                for i in range(offset, offset + count // threads):
+                    key = keys[i % len(keys)]
+                    if i % 10:
+                        get(key)
+                    else:
+                        put(key, i)
+
+            workers = [threading.Thread(target=worker, args=(number * 7919,)) for number in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            results.append(count / (time.perf_counter() - start))
+        print(f"{threads:>7} {results[0]:>9.0f} {results[1]:>9.0f}")
+
+
+def bench_sharded(count: int = 1000000, shard_counts=(1, 2, 4, 8), batch: int = 50000, function='fnv1a') -> None:
+    """
+    Function bench_sharded measures put_many and get_many throughput of the sharded map in batches of batch keys,
+    against a single in-process map. The front end hashes every key to route it, so a slow hash function limits
+    how far the shards can scale
+    """
+    pairs = [('key' + str(i), i) for i in range(count)]
+    keys = [key for key, _ in pairs]
+    batches = range(0, count, batch)
+
+    print("\nsharded map throughput (ops/sec) with", count, "keys using", function)
+    print("shards       put      get")
+    m = hash_map_oa.HashMap(16, function)
+    put = _time_per_op(lambda start: m.put_many(pairs[start:start + batch]), batches)
+    get = _time_per_op(lambda start: m.get_many(keys[start:start + batch]), batches)
+    print(f"{'local':>6} {batch * 1e6 / put:>9.0f} {batch * 1e6 / get:>8.0f}")
+
+    for shards in shard_counts:
+        with hash_map_sharded.HashMap(16, function, shards=shards) as m:
+            put = _time_per_op(lambda start: m.put_many(pairs[start:start + batch]), batches)
+            get = _time_per_op(lambda start: m.get_many(keys[start:start + batch]), batches)
+        print(f"{shards:>6} {batch * 1e6 / put:>9.0f} {batch * 1e6 / get:>8.0f}")
+
+
+def bench_shared(count: int = 200000, function='fnv1a') -> None:
+    """
+    Function bench_shared compares what a second process pays to use a table another process built: attaching to a
+    shared memory table, against unpickling a copy of an open addressing HashMap, and the get latency of each
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nsharing a table of", count, "keys with another process")
+    print("map                  open ms   get us   extra bytes")
+    local = hash_map_oa.HashMap(16, function)
+    local.put_many((key, i) for i, key in enumerate(keys))
+    data = pickle.dumps(local)
+    start = time.perf_counter()
+    copy = pickle.loads(data)
+    opened = time.perf_counter() - start
+    print(f"{'unpickled HashMap':<20} {opened * 1000:>8.1f} {_time_per_op(copy.get, keys):>8.2f} {len(data):>13}")
+    del copy, local
+
+    with hash_map_shared.HashMap(16, function) as shared:
+        for i, key in enumerate(keys):
+            shared.put(key, i)
+        start = time.perf_counter()
+        with hash_map_shared.HashMap.attach(shared.name) as reader:
+            opened = time.perf_counter() - start
+            print(f"{'shared memory':<20} {opened * 1000:>8.1f} {_time_per_op(reader.get, keys):>8.2f} {0:>13}")
+
+
+def bench_mmap_reopen(count: int = 200000, function='fnv1a') -> None:
+    """
+    Function bench_mmap_reopen compares starting up with a saved memory mapped table against rebuilding a
+    hash_map_oa.HashMap with a put for every key, and times the recovery scan of a file left unflushed by a crash
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nstarting up with", count, "keys (the saved file is in the page cache)")
+    print("start up              ms   first get us   get us")
+    start = time.perf_counter()
+    rebuilt = hash_map_oa.HashMap(16, function)
+    for i, key in enumerate(keys):
+        rebuilt.put(key, i)
+    elapsed = time.perf_counter() - start
+    print(f"{'rebuild by put':<18} {elapsed * 1000:>8.1f} {'':>14} {_time_per_op(rebuilt.get, keys):>8.2f}")
+    del rebuilt
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.hm')
+        with hash_map_mmap.HashMap(path, 16, function) as saved:
+            for i, key in enumerate(keys):
+                saved.put(key, i)
+
+        for label in ('reopen', 'reopen after crash'):
+            if label == 'reopen after crash':
+                # drop a changed map without flushing it, as a crash would, so this open has to recover
+                crashed = hash_map_mmap.HashMap.open(path)
+                crashed.put(keys[0], -1)
+                crashed._handle.close()
+                crashed._handle = None
+
+            start = time.perf_counter()
+            with hash_map_mmap.HashMap.open(path) as reopened:
+                opened = time.perf_counter() - start
+                start = time.perf_counter()
+                reopened.get(keys[-1])
+                first = time.perf_counter() - start
+                per_get = _time_per_op(reopened.get, keys)
+            print(f"{label:<18} {opened * 1000:>8.1f} {first * 1e6:>14.1f} {per_get:>8.2f}")
+
+
+def bench_snapshot(count: int = 200000, function='fnv1a') -> None:
+    """
+    Function bench_snapshot compares saving and loading both hash maps with dump and load against pickling them, by
+    time, size on disk and the peak memory tracemalloc sees while saving
+    """
+    pairs = [('key' + str(i), i) for i in range(count)]
+
+    print("\nsaving and loading", count, "keys")
+    print("map  format        save ms   load ms      bytes   save peak bytes")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.snap')
+        for label, module in (('oa', hash_map_oa), ('sc', hash_map_sc)):
+            m = module.HashMap.from_pairs(pairs, function)
+            formats = (('pickle', lambda stream: pickle.dump(m, stream), pickle.load),
+                       ('dump', m.dump, module.HashMap.load),
+                       ('dump zlib', lambda stream: m.dump(stream, 'zlib'), module.HashMap.load))
+
+            for name, save, load in formats:
+                with open(path, 'wb') as stream:
+                    start = time.perf_counter()
+                    save(stream)
+                    saved = time.perf_counter() - start
+                with open(path, 'rb') as stream:
+                    start = time.perf_counter()
+                    loaded = load(stream)
+                    elapsed = time.perf_counter() - start
+                assert loaded.size == count
+                del loaded
+
+                with open(path, 'wb') as stream:
+                    tracemalloc.start()
+                    save(stream)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                print(f"{label:<4} {name:<10} {saved * 1000:>9.1f} {elapsed * 1000:>9.1f} "
+                      f"{os.path.getsize(path):>10} {peak:>17}")
+            del m
+
+
+def bench_wal(count: int = 10000000, fsync_count: int = 2000, function='fnv1a') -> None:
+    """
+    Function bench_wal measures what logging every change costs a put, with group commit and with an fsync per put,
+    and how long recovering count entries takes by replaying the log and by loading a compacted snapshot
+    """
+    keys = ['key' + str(i) for i in range(count)]
+
+    print("\nput latency with a write-ahead log")
+    print("log                    put us")
+    for label, sync_interval in (('none', None), ('group commit 10 ms', 0.01), ('fsync every put', 0)):
+        with tempfile.TemporaryDirectory() as directory:
+            if sync_interval is None:
+                m = hash_map_oa.HashMap(16, function)
+            else:
+                m = wal.open_map(directory, hash_map_oa.HashMap, 16, function, sync_interval=sync_interval,
+                                 compact_bytes=None)
+            sample = keys[:fsync_count] if sync_interval == 0 else keys
+            print(f"{label:<20} {_time_per_op(lambda key: m.put(key, 0), sample):>8.2f}")
+            if m.wal is not None:
+                m.wal.close()
+            del m
+
+    print("\nrecovering", count, "entries")
+    print("from                    open ms   log/snapshot bytes")
+    with tempfile.TemporaryDirectory() as directory:
+        m = wal.open_map(directory, hash_map_oa.HashMap, 16, function, compact_bytes=None)
+        for i, key in enumerate(keys):
+            m.put(key, i)
+        m.wal.close()
+        del m
+
+        for label in ('log replay', 'snapshot'):
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            start = time.perf_counter()
+            m = wal.open_map(directory, hash_map_oa.HashMap, 16, function, compact_bytes=None)
+            elapsed = time.perf_counter() - start
+            assert m.size == count
+            print(f"{label:<20} {elapsed * 1000:>10.1f} {size:>20}")
+            m.wal.compact(wait=True)  # so the second open loads a snapshot instead
+            m.wal.close()
+            del m
+
+
+def _zipf_trace(count: int, universe: int, skew: float = 0.99, seed: int = 261) -> list:
+    """
+    Helper _zipf_trace returns count keys drawn from universe distinct keys with Zipfian popularity, key i being
+    drawn with probability proportional to 1 / i ** skew
+    """
+    weights = itertools.accumulate(1 / rank ** skew for rank in range(1, universe + 1))
+    keys = ['key' + str(i) for i in range(universe)]
+    random.Random(seed).shuffle(keys)  # so popularity does not follow insertion order
+    return random.Random(seed).choices(keys, cum_weights=list(weights), k=count)
+
+
+def bench_cache(count: int = 1000000, universe: int = 100000, sizes=(1000, 10000), function='fnv1a') -> None:
+    """
+    Function bench_cache replays a Zipfian trace through a Cache of each policy and size, putting every key that
+    misses, and reports the hit ratio and how many lookups per second the cache served
+    """
+    trace = _zipf_trace(count, universe)
+
+    print("\nbounded cache on a Zipfian trace of", count, "lookups over", universe, "keys")
+    print("policy     entries   hit ratio   evictions   rejected   kops/s")
+    for size in sizes:
+        for policy in cache.POLICIES:
+            c = cache.Cache(size, policy=policy, function=function)
+            get, put = c.get, c.put
+            start = time.perf_counter()
+            for key in trace:
+                if get(key) is None:
+                    put(key, key)
+            elapsed = time.perf_counter() - start
+            stats = c.stats()
+            print(f"{policy:<8} {size:>9} {stats['hit_ratio']:>11.3f} {stats['evictions']:>11} "
+                  f"{stats['rejections']:>10} {count / elapsed / 1000:>8.0f}")
+
+
+def bench_expiry(sizes=(10000, 100000, 1000000), limit: int = 1000, function='fnv1a') -> None:
+    """
+    Function bench_expiry fills a table with size keys, half of them put with a ttl that has already run out, and
+    times one expire(limit) call and a get of a live key. The sweep only pops due deadlines, so its time should stay
+    flat as the table grows. A table with fewer than limit expired keys has them all expired
+    """
+    print("\nexpiring up to", limit, "keys per sweep")
+    print("map          keys  expired   sweep ms   get us (no ttl)   get us (ttl)")
+    for module in (hash_map_oa, hash_map_sc):
+        for size in sizes:
+            keys = ['key' + str(i) for i in range(size)]
+            plain = module.HashMap(size, function)
+            m = module.HashMap(size, function)
+            for i, key in enumerate(keys):
+                plain.put(key, i)
+                m.put(key, i, ttl=-1 if i % 2 else None)
+
+            start = time.perf_counter()
+            expired = m.expire(min(limit, size // 2))
+            sweep = time.perf_counter() - start
+
+            live = keys[0:20000:2]
+            print(f"{module.__name__:<11} {size:>8} {expired:>8} {sweep * 1000:>10.2f} "
+                  f"{_time_per_op(plain.get, live):>17.2f} {_time_per_op(m.get, live):>14.2f}")
+            del plain, m
+
+
+if __name__ == "__main__":
+    bench_sc_lookup()
+    bench_oa_churn()
+    bench_oa_ops()
+    bench_oa_ops(5000, hash_map_oa.hash_function_2)  # few distinct hash values, so probe sequences are long
+    bench_hash_functions()
+    bench_resize()
+    bench_memory()
+    bench_put_latency()
+    bench_bulk_load()
+    bench_probe_histograms()
+    bench_robin_hood()
+    bench_swiss_lookup()
+    bench_swiss_lookup(20000, function='hash_function_2')  # few distinct hashes, where scanning groups pays off
+    bench_get_latency()
+    bench_array_chain()
+    bench_create_clear()
+    bench_concurrent()
+    bench_sharded()
+    bench_shared()
+    bench_mmap_reopen()
+    bench_snapshot()
+    bench_wal()
+    bench_cache()
+    bench_expiry()
@@ -0,0 +1,263 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Open addressing hash map stored as parallel flat arrays of keys, values, hashes and a one byte state per
+# bucket instead of a HashEntry object per bucket. It probes, resizes and compacts the same way as hash_map_oa.HashMap
+# and has its original operations (put, get, remove, contains_key, clear, empty_buckets, table_load, resize_table and
+# get_keys), but none of the later ones such as incremental resizing, iteration, batches, stats, snapshots or ttls
+
+
+from array import array
+
+from a6_include import *
+from hash_functions import resolve_hash_function
+from resize_policy import ResizePolicy, OPEN_ADDRESSING_DEFAULT
+
+
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+MASK_64 = (1 << 64) - 1  # hashes are stored as unsigned 64 bit values
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, policy: ResizePolicy = OPEN_ADDRESSING_DEFAULT,
+                 tombstone_limit: float = 0.25) -> None:
+        """
+        Initialize new HashMap that uses Quadratic (triangular) Probing for collision resolution, with the buckets
+        stored as parallel arrays. Resizing and tombstone compaction work the same as in hash_map_oa.HashMap
+        """
+        capacity = policy.round_capacity(capacity)
+        self.policy = policy
+        self.capacity = capacity
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.size = 0
+        self.tombstones = 0  # number of removed entries still occupying a bucket
+        self.tombstone_limit = tombstone_limit
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Method _allocate replaces the storage with empty arrays of the given capacity
+        """
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._states = bytearray(capacity)  # EMPTY, LIVE or TOMBSTONE for each bucket
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form, in the same format as hash_map_oa.HashMap
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self._states[i] == EMPTY:
+                out += str(i) + ': None\n'
+            else:
+                tombstone = self._states[i] == TOMBSTONE
+                out += f"{i}: K: {self._keys[i]} V: {self._values[i]} TS: {tombstone}\n"
+        return out
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map. It does not change the underlying hash table capacity.
+        """
+        self._allocate(self.capacity)
+        self.size = 0
+        self.tombstones = 0
+
+    def _probe(self, key: str, hash: int) -> tuple:
+        """
+        Method _probe walks the probe sequence for key once and returns (found, free), the same as
+        hash_map_oa.HashMap._probe
+        """
+        capacity = self.capacity
+        states, hashes, keys = self._states, self._hashes, self._keys
+        bucket = hash % capacity
+        first_tombstone = -1
+        step = 0
+
+        while step < capacity:
+            state = states[bucket]
+            if state == EMPTY:
+                return -1, bucket if first_tombstone < 0 else first_tombstone
+
+            # only compare the keys once the stored hashes match
+            if state == TOMBSTONE:
+                if first_tombstone < 0:
+                    first_tombstone = bucket
+                # a put reuses the first tombstone it passes, so a live copy of the key is never past its own tombstone
+                if hashes[bucket] == hash and keys[bucket] == key:
+                    return -1, first_tombstone
+
+            elif hashes[bucket] == hash and keys[bucket] == key:
+                return bucket, first_tombstone
+
+            step += 1
+            bucket = (bucket + step) % capacity
+
+        return -1, first_tombstone
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        found, _ = self._probe(key, self.hash_function(key) & MASK_64)
+        if found < 0:
+            return None  # the key was not found, so return None
+        return self._values[found]
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value. The table is resized before adding a new key/value pair if the
+        resize policy says the load factor is too high
+        """
+        hash = self.hash_function(key) & MASK_64
+        found, free = self._probe(key, hash)
+
+        # if the key already exists, replace the value
+        if found >= 0:
+            self._values[found] = value
+            return
+
+        new_capacity = self.policy.grow_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+            _, free = self._probe(key, hash)
+
+        # the probe sequence has no free bucket left, grow the table and try again
+        if free < 0:
+            self.resize_table(self.capacity * 2)
+            self.put(key, value)
+            return
+
+        if self._states[free] == TOMBSTONE:
+            self.tombstones -= 1
+        self._keys[free] = key
+        self._values[free] = value
+        self._hashes[free] = hash
+        self._states[free] = LIVE
+        self.size += 1
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        found, _ = self._probe(key, self.hash_function(key) & MASK_64)
+        if found < 0:
+            return
+
+        # the key stays behind so lookups can stop at its tombstone, the value is released
+        self._states[found] = TOMBSTONE
+        self._values[found] = None
+        self.size -= 1
+        self.tombstones += 1
+
+        # give memory back once the table has drained below the policy's minimum load
+        new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+
+        # otherwise reclaim the tombstones before they make probe sequences too long
+        elif self.tombstones >= self.capacity * self.tombstone_limit:
+            self.compact()
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        found, _ = self._probe(key, self.hash_function(key) & MASK_64)
+        return found >= 0
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets in the hash table.
+        """
+        return self.capacity - self.size  # every bucket that does not hold a live entry is EMPTY or TOMBSTONE
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table changes the capacity of the internal hash table, while retaining
+        existing key/value pairs. The entries are moved to their bucket in the new arrays
+        using their stored hash, so no key is hashed again.
+        """
+        new_capacity = self.policy.round_capacity(new_capacity)  # keep prime/power of two capacities if requested
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+
+        keys, values, hashes, states = self._keys, self._values, self._hashes, self._states
+        old_capacity = self.capacity
+        self._allocate(new_capacity)
+        new_states = self._states
+
+        for bucket in range(old_capacity):
+            if states[bucket] != LIVE:
+                continue
+
+            # every key in the table is distinct, so just find the first empty bucket on the entry's probe sequence
+            hash = hashes[bucket]
+            new_bucket = hash % new_capacity
+            step = 0
+            while new_states[new_bucket] != EMPTY and step < new_capacity:
+                step += 1
+                new_bucket = (new_bucket + step) % new_capacity
+
+            if new_states[new_bucket] != EMPTY:
+                # the probe sequence has no free bucket at this capacity, start over with a bigger table
+                self._keys, self._values, self._hashes, self._states = keys, values, hashes, states
+                self.resize_table(new_capacity * 2)
+                return
+
+            self._keys[new_bucket] = keys[bucket]
+            self._values[new_bucket] = values[bucket]
+            self._hashes[new_bucket] = hash
+            new_states[new_bucket] = LIVE
+
+        self.capacity = new_capacity
+        self.tombstones = 0  # tombstones are not copied to the new table
+
+    def compact(self) -> None:
+        """
+        Method compact removes every tombstone from the hash table and rehashes the remaining entries. The capacity
+        does not change
+        """
+        self.resize_table(self.capacity)  # with flat arrays a rebuild at the same capacity is a few bulk copies
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()  # initiate new array to store keys
+
+        for bucket in range(self.capacity):
+            if self._states[bucket] == LIVE:
+                key_array.append(self._keys[bucket])  # add to the array
+
+        return key_array
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nparallel arrays, put/remove/resize")
+    print("----------------------------------")
+    m = HashMap(8, 'fnv1a')
+    for i in range(20):
+        m.put('key' + str(i), i * 10)
+    m.put('key1', 'ten')
+    for i in range(0, 20, 3):
+        m.remove('key' + str(i))
+    print(m.size, m.capacity, m.empty_buckets(), m.tombstones, m.get('key1'), m.get('key3'), m.contains_key('key19'))
+    m.compact()
+    print(m.size, m.capacity, m.empty_buckets(), m.tombstones, m.get_keys().length())
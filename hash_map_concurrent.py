@@ -0,0 +1,219 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Thread-safe hash map that splits the keys over independent segments, each an ordinary HashMap guarded
+# by its own lock. Threads only wait for each other when they use the same segment, and each segment resizes on its
+# own, so a resize never blocks the rest of the map
+
+
+import random
+import threading
+
+import hash_map_oa
+from a6_include import *
+from hash_functions import resolve_hash_function
+from resize_policy import next_power_of_two
+
+
+MASK_64 = (1 << 64) - 1
+FIBONACCI = 0x9E3779B97F4A7C15  # odd 64 bit multiplier (2 ** 64 / golden ratio) that spreads low bits upwards
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, segments: int = 16, backend=hash_map_oa, **kwargs) -> None:
+        """
+        Init new thread-safe HashMap with segments (rounded up to a power of two) segments. Each segment is a
+        backend.HashMap (hash_map_oa by default, or any module with the same API) with an equal share of the
+        capacity, and any other keyword argument is passed on to it. A key's segment comes from the top bits of its
+        multiplied out hash, so it does not depend on the bits the segment itself uses to pick a bucket
+        """
+        segments = next_power_of_two(segments)
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.segments = [backend.HashMap(max(1, -(-capacity // segments)), self.hash_function, **kwargs)
+                         for _ in range(segments)]
+        self.locks = [threading.Lock() for _ in range(segments)]
+        self._shift = 64 - (segments.bit_length() - 1)
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of every segment in human-readable form
+        """
+        out = ''
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                out += f"segment {index}\n" + str(segment)
+        return out
+
+    def _segment(self, key: str) -> int:
+        """
+        Method _segment returns the index of the segment that holds key
+        """
+        return ((self.hash_function(key) * FIBONACCI) & MASK_64) >> self._shift
+
+    @property
+    def size(self) -> int:
+        """
+        Number of keys in the hash map. Segments are counted one after another, so with other threads writing the
+        total is only a snapshot
+        """
+        return sum(segment.size for segment in self.segments)
+
+    @property
+    def capacity(self) -> int:
+        """
+        Total capacity of the segments
+        """
+        return sum(segment.capacity for segment in self.segments)
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map one segment at a time. It does not change the capacity
+        """
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                segment.clear()
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            return self.segments[index].get(key)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            self.segments[index].put(key, value)
+
+    def put_if_absent(self, key: str, value: object) -> object:
+        """
+        Method put_if_absent adds the key/value pair only if the key is not in the hash map yet. It returns the value
+        the key already had, or None if the pair was added
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            segment = self.segments[index]
+            if segment.contains_key(key):
+                return segment.get(key)
+            segment.put(key, value)
+            return None
+
+    def update(self, key: str, function) -> object:
+        """
+        Method update sets the value of key to function(current value), with None as the current value of a missing
+        key, and returns the new value. No other thread can change the key in between
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            segment = self.segments[index]
+            value = function(segment.get(key))
+            segment.put(key, value)
+            return value
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            self.segments[index].remove(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        index = self._segment(key)
+        with self.locks[index]:
+            return self.segments[index].contains_key(key)
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets over all segments
+        """
+        total = 0
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                total += segment.empty_buckets()
+        return total
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor over all segments
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table gives every segment an equal share of new_capacity. The segments are resized one at a
+        time, so only the segment being resized is unavailable to other threads
+        """
+        if new_capacity < 1:
+            return
+        share = max(1, -(-new_capacity // len(self.segments)))
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                segment.resize_table(share)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map. Each segment is copied
+        under its lock, so with other threads writing the result is a snapshot per segment, not of the whole map
+        """
+        key_array = DynamicArray()
+
+        for index, segment in enumerate(self.segments):
+            with self.locks[index]:
+                keys = segment.get_keys()
+            for i in range(keys.length()):
+                key_array.append(keys[i])
+
+        return key_array
+
+    def __len__(self) -> int:
+        """
+        Return the number of keys in the hash map
+        """
+        return self.size
+
+
+# ------------------- STRESS TEST ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nstress test: 8 threads with their own keys and a shared counter")
+    print("---------------------------------------------------------------")
+    threads, operations = 8, 20000
+    m = HashMap(16, 'fnv1a', segments=4)  # few segments and a small capacity so threads share locks and resizes
+    expected = [{} for _ in range(threads)]
+
+    def worker(number: int) -> None:
+        rng = random.Random(number)
+        mine = expected[number]
+        for i in range(operations):
+            key = f"t{number}-{rng.randrange(500)}"
+            if rng.random() < 0.6:
+                m.put(key, i)
+                mine[key] = i
+            else:
+                m.remove(key)
+                mine.pop(key, None)
+            m.update('counter', lambda value: (value or 0) + 1)
+
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    mismatches = sum(1 for mine in expected for key, value in mine.items() if m.get(key) != value)
+    size = sum(len(mine) for mine in expected) + 1
+    print("counter:", m.get('counter'), "expected", threads * operations)
+    print("size:", m.size, "expected", size, "mismatched values:", mismatches)
+    print("ok" if m.get('counter') == threads * operations and m.size == size and mismatches == 0 else "FAILED")
@@ -0,0 +1,328 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Hash map using bucketized cuckoo hashing. Every key can only live in one of the slots of its two
+# buckets or in a small stash, so a lookup checks a fixed number of slots no matter how full the table is. Inserts
+# make room by moving keys to their other bucket, and rehash with a new second hash function if that goes in a cycle
+
+
+import os
+import random
+from array import array
+
+from a6_include import *
+from hash_functions import hash_function_2, resolve_hash_function
+from resize_policy import ResizePolicy, CUCKOO_DEFAULT
+
+
+SLOTS = 4  # slots per bucket
+STASH_SIZE = 4  # entries that could not be placed in either bucket
+MAX_KICKS = 64  # keys moved to their other bucket before an insert gives up and uses the stash
+REHASH_ATTEMPTS = 3  # new second hash functions tried at one capacity before the table is grown
+
+MASK_64 = (1 << 64) - 1  # hashes are stored as unsigned 64 bit values
+
+
+def _new_seed() -> int:
+    """
+    Helper _new_seed returns a random seed for the second hash function
+    """
+    return int.from_bytes(os.urandom(8), 'little')
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, policy: ResizePolicy = CUCKOO_DEFAULT) -> None:
+        """
+        Initialize new HashMap that uses bucketized cuckoo hashing for collision resolution. The first bucket of a key
+        comes from the given hash function and the second from Python's hash of the key and a random seed, which is
+        replaced whenever inserts go in a cycle. The capacity is the number of slots, rounded up to whole buckets,
+        and by default the table doubles once 0.9 of the slots are used
+        """
+        self.policy = policy
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.size = 0
+        self._seed = _new_seed()
+        self._allocate(self._round_capacity(capacity))
+
+    def _round_capacity(self, capacity: int) -> int:
+        """
+        Method _round_capacity returns the capacity the policy asks for, rounded up to whole buckets
+        """
+        capacity = self.policy.round_capacity(capacity)
+        return (capacity + SLOTS - 1) // SLOTS * SLOTS
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Method _allocate replaces the storage with empty arrays of the given capacity and empties the stash
+        """
+        self.capacity = capacity
+        self._buckets = capacity // SLOTS
+        self._keys = [None] * capacity  # None marks an empty slot
+        self._values = [None] * capacity
+        self._hashes = array('Q', bytes(8 * capacity))  # first hash of each key
+        self._alt_hashes = array('Q', bytes(8 * capacity))  # second hash of each key, so moves never hash again
+        self._stash = []  # (key, value, hash, alt_hash) tuples
+
+    def _alt_hash(self, key: str) -> int:
+        """
+        Method _alt_hash returns the key's second hash, which depends on the current seed
+        """
+        return hash((self._seed, key)) & MASK_64
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form, one line per slot followed by the stash
+        """
+        out = ''
+        for i in range(self.capacity):
+            if self._keys[i] is None:
+                out += str(i) + ': None\n'
+            else:
+                out += f"{i}: K: {self._keys[i]} V: {self._values[i]}\n"
+        for key, value, _, _ in self._stash:
+            out += f"stash: K: {key} V: {value}\n"
+        return out
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map. It does not change the underlying hash table capacity.
+        """
+        self._allocate(self.capacity)
+        self.size = 0
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Method _find returns the slot holding key, or -1 if it is not in either of its buckets. The second hash is
+        only computed if the key is not in its first bucket
+        """
+        keys, hashes = self._keys, self._hashes
+
+        # only compare the keys once the stored hashes match
+        start = hash % self._buckets * SLOTS
+        for slot in range(start, start + SLOTS):
+            if hashes[slot] == hash and keys[slot] == key:
+                return slot
+
+        start = self._alt_hash(key) % self._buckets * SLOTS
+        for slot in range(start, start + SLOTS):
+            if hashes[slot] == hash and keys[slot] == key:
+                return slot
+
+        return -1
+
+    def _find_stashed(self, key: str, hash: int) -> int:
+        """
+        Method _find_stashed returns the index of key in the stash, or -1 if it is not there
+        """
+        for index, entry in enumerate(self._stash):
+            if entry[2] == hash and entry[0] == key:
+                return index
+        return -1
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        hash = self.hash_function(key) & MASK_64
+        slot = self._find(key, hash)
+        if slot >= 0:
+            return self._values[slot]
+
+        if self._stash:
+            index = self._find_stashed(key, hash)
+            if index >= 0:
+                return self._stash[index][1]
+        return None  # the key was not found, so return None
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value. The table is resized before adding a new key/value pair if the resize
+        policy says the load factor is too high
+        """
+        hash = self.hash_function(key) & MASK_64
+
+        # if the key already exists, replace the value
+        slot = self._find(key, hash)
+        if slot >= 0:
+            self._values[slot] = value
+            return
+        if self._stash:
+            index = self._find_stashed(key, hash)
+            if index >= 0:
+                self._stash[index] = (key, value, hash, self._stash[index][3])
+                return
+
+        new_capacity = self.policy.grow_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+
+        self.size += 1
+        entry = self._place((key, value, hash, self._alt_hash(key)))
+        if entry is not None:
+            # the moves went in a cycle and the stash is full
+            self._rebuild(self.capacity, entry)
+
+    def _place(self, entry: tuple) -> tuple:
+        """
+        Method _place adds an entry whose key is not in the table yet. If both of its buckets are full, a random entry
+        in one of them is moved to its other bucket, and so on, up to MAX_KICKS times before the entry being moved
+        goes in the stash. It returns None, or the entry left over if the stash was full as well
+        """
+        keys, values, hashes, alt_hashes = self._keys, self._values, self._hashes, self._alt_hashes
+        buckets = self._buckets
+        bucket = entry[2] % buckets
+
+        for _ in range(MAX_KICKS):
+            for candidate in (entry[2] % buckets, entry[3] % buckets):
+                start = candidate * SLOTS
+                for slot in range(start, start + SLOTS):
+                    if keys[slot] is None:
+                        keys[slot], values[slot], hashes[slot], alt_hashes[slot] = entry
+                        return None
+
+            # swap the entry with a random one in the bucket it did not just leave, which then has to move on
+            slot = bucket * SLOTS + random.randrange(SLOTS)
+            victim = (keys[slot], values[slot], hashes[slot], alt_hashes[slot])
+            keys[slot], values[slot], hashes[slot], alt_hashes[slot] = entry
+            entry = victim
+            first = entry[2] % buckets
+            bucket = entry[3] % buckets if first == bucket else first
+
+        if len(self._stash) < STASH_SIZE:
+            self._stash.append(entry)
+            return None
+        return entry
+
+    def _rebuild(self, capacity: int, extra: tuple = None) -> None:
+        """
+        Method _rebuild places every entry, and extra if given, into a new table of the given capacity. If the entries
+        do not fit, it tries again with a new second hash function, and after REHASH_ATTEMPTS with a doubled capacity
+        """
+        entries = [(self._keys[slot], self._values[slot], self._hashes[slot], self._alt_hashes[slot])
+                   for slot in range(self.capacity) if self._keys[slot] is not None]
+        entries.extend(self._stash)
+        if extra is not None:
+            entries.append(extra)
+
+        while True:
+            for _ in range(REHASH_ATTEMPTS):
+                self._allocate(capacity)
+                if all(self._place(entry) is None for entry in entries):
+                    return
+
+                # a different second hash function gives every key a different second bucket
+                self._seed = _new_seed()
+                entries = [(key, value, hash, self._alt_hash(key)) for key, value, hash, _ in entries]
+            capacity = self._round_capacity(capacity * 2)
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        hash = self.hash_function(key) & MASK_64
+        slot = self._find(key, hash)
+        index = self._find_stashed(key, hash) if slot < 0 and self._stash else -1
+
+        if slot >= 0:
+            self._keys[slot] = None
+            self._values[slot] = None
+            self.size -= 1
+            # a stashed entry that belongs in this bucket can move into the freed slot
+            bucket = slot // SLOTS
+            for index, entry in enumerate(self._stash):
+                if entry[2] % self._buckets == bucket or entry[3] % self._buckets == bucket:
+                    self._keys[slot], self._values[slot], self._hashes[slot], self._alt_hashes[slot] = entry
+                    del self._stash[index]
+                    break
+
+        elif index >= 0:
+            del self._stash[index]
+            self.size -= 1
+        else:
+            return
+
+        # give memory back once the table has drained below the policy's minimum load
+        new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        hash = self.hash_function(key) & MASK_64
+        if self._find(key, hash) >= 0:
+            return True
+        return bool(self._stash) and self._find_stashed(key, hash) >= 0
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty slots in the hash table
+        """
+        return self.capacity - (self.size - len(self._stash))
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table changes the capacity of the internal hash table, while retaining
+        existing key/value pairs. Both hashes of every entry are stored, so no key is hashed
+        again unless the entries only fit with a new second hash function.
+        """
+        new_capacity = self._round_capacity(new_capacity)
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+        self._rebuild(new_capacity)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()  # initiate new array to store keys
+
+        for key in self._keys:
+            if key is not None:
+                key_array.append(key)  # add to the array
+        for key, _, _, _ in self._stash:
+            key_array.append(key)
+
+        return key_array
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\ncuckoo put/remove/resize")
+    print("------------------------")
+    m = HashMap(8, 'fnv1a')
+    for i in range(50):
+        m.put('key' + str(i), i * 10)
+    m.put('key1', 'ten')
+    for i in range(0, 50, 4):
+        m.remove('key' + str(i))
+    print(m.size, m.capacity, m.get('key1'), m.get('key4'), m.contains_key('key49'), m.contains_key('key0'))
+    print(m.get_keys().length(), round(m.table_load(), 2), m.empty_buckets())
+
+    print("\nkeys that collide under hash_function_2, checked against a dict")
+    print("---------------------------------------------------------------")
+    m = HashMap(8, hash_function_2)
+    expected = {}
+    for i in range(600):
+        key = str(i * 7 % 300)
+        if i % 5 == 4:
+            m.remove(key)
+            expected.pop(key, None)
+        else:
+            m.put(key, i)
+            expected[key] = i
+    print(m.size == len(expected), all(m.get(key) == value for key, value in expected.items()),
+          not any(m.contains_key(str(i)) for i in range(300) if str(i) not in expected))
+    print(len(m._stash), m.capacity)
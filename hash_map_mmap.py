@@ -0,0 +1,244 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Persistent open addressing hash map kept in a memory mapped file. It uses the same header, slot and
+# arena layout as hash_map_shared.HashMap, so reopening a saved table only reads its header and lookups page the
+# slots and keys in from disk as they touch them, instead of rebuilding the table with a put for every key
+
+
+import mmap
+import os
+
+import hash_map_shared
+from a6_include import *
+from hash_map_shared import HEADER, HEADER_SIZE, SLOT, TOMBSTONE
+from resize_policy import ResizePolicy, OPEN_ADDRESSING_DEFAULT
+
+
+CLEAN = 1  # header flag, set by flush and cleared on disk before the first change after it
+
+
+class _MappedFile:
+    """
+    File mapped into memory, with the buf, name and close the shared memory blocks of hash_map_shared have
+    """
+
+    def __init__(self, path: str, size: int = 0, read_only: bool = False) -> None:
+        """
+        Init new _MappedFile. A size creates (or truncates) the file at that size, otherwise an existing file is opened
+        """
+        if size:
+            self.file = open(path, 'w+b')
+            self.file.truncate(size)
+        else:
+            self.file = open(path, 'rb' if read_only else 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ if read_only else mmap.ACCESS_WRITE)
+        self.buf = memoryview(self.map)
+        self.name = path
+
+    def sync(self, header_only: bool = False) -> None:
+        """
+        Method sync waits until the mapped pages, or only the page holding the header, are written to disk
+        """
+        if header_only:
+            self.map.flush(0, min(mmap.PAGESIZE, len(self.map)))
+        else:
+            self.map.flush()
+
+    def close(self) -> None:
+        """
+        Method close unmaps and closes the file
+        """
+        self.buf.release()
+        self.map.close()
+        self.file.close()
+
+
+def sync_directory(path: str) -> None:
+    """
+    Function sync_directory makes a rename in the directory holding path durable. Not every platform can open a
+    directory, and those that cannot do not need it
+    """
+    try:
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class HashMap(hash_map_shared.HashMap):
+    def __init__(self, path: str, capacity: int, function, arena_size: int = 1 << 16,
+                 policy: ResizePolicy = OPEN_ADDRESSING_DEFAULT, tombstone_limit: float = 0.25) -> None:
+        """
+        Create a new HashMap saved in the file at path, replacing any file already there. Values must be None, bool,
+        int, float, str or bytes, the same as in hash_map_shared.HashMap. Changes go straight to the mapped file;
+        flush, or close, makes them durable and marks the file clean so HashMap.open can trust its header
+        """
+        self.path = os.fspath(path)
+        self._clean = False
+        super().__init__(capacity, function, arena_size, policy, tombstone_limit)
+        self._install()
+        self.flush()
+
+    @classmethod
+    def open(cls, path: str, function=None, read_only: bool = False,
+             policy: ResizePolicy = OPEN_ADDRESSING_DEFAULT, tombstone_limit: float = 0.25) -> 'HashMap':
+        """
+        Method open reopens a table saved at path. A clean file only has its header read, the slots and arena are
+        paged in by the lookups that need them. A file that was not flushed after its last change, because the
+        process writing it crashed, has its counters rebuilt from the slots when it is opened for writing. function
+        is only needed if the table was built with a hash function that is not registered in hash_functions
+        """
+        path = os.fspath(path)
+        hash_map = cls.__new__(cls)
+        hash_map.path = path
+        if not read_only and os.path.exists(path + '.new'):
+            os.remove(path + '.new')  # a resize that never finished, the file at path is still the whole table
+
+        hash_map._attach(_MappedFile(path, read_only=read_only), function)
+        hash_map._clean = bool(HEADER.unpack_from(hash_map._buffer)[2] & CLEAN)
+        if not read_only:
+            hash_map._owner = True
+            hash_map.policy = policy
+            hash_map.tombstone_limit = tombstone_limit
+            if not hash_map._clean:
+                hash_map._recover()
+                hash_map.flush()
+        return hash_map
+
+    @classmethod
+    def attach(cls, name: str, function=None) -> 'HashMap':
+        """
+        Method attach opens the table saved at name for lookups only, the same as open with read_only set
+        """
+        return cls.open(name, function, read_only=True)
+
+    def _create(self, capacity: int, arena_size: int) -> None:
+        """
+        Method _create switches the map to a new empty file next to path. _install moves it into place once it holds
+        the whole table, so a crash part way through a resize leaves the old file as it was
+        """
+        self._handle = _MappedFile(self.path + '.new', HEADER_SIZE + capacity * SLOT.size + arena_size)
+        self._buffer = self._handle.buf
+        self._format(capacity, arena_size)
+
+    def _release(self, handle) -> None:
+        """
+        Method _release closes a file the map no longer uses. Files are never deleted, _install replaces them
+        """
+        handle.close()
+
+    def _install(self) -> None:
+        """
+        Method _install writes the new file made by _create to disk and renames it over path
+        """
+        self._handle.sync()
+        os.replace(self._handle.name, self.path)
+        self._handle.name = self.path
+        sync_directory(self.path)
+
+    def _rebuild(self, capacity: int, extra: int = 0) -> None:
+        """
+        Method _rebuild moves every live pair to a new file, as in hash_map_shared.HashMap, and then puts the new file
+        in place of the old one
+        """
+        super()._rebuild(capacity, extra)
+        self._install()
+
+    def _check_owner(self) -> None:
+        """
+        Method _check_owner raises PermissionError for a map opened read only. Before the first change after a flush
+        it also marks the file dirty on disk, so the counters in a clean header always match the slots
+        """
+        super()._check_owner()
+        if self._clean:
+            self._write_header()
+            self._handle.sync(header_only=True)
+            self._clean = False
+
+    def _recover(self) -> None:
+        """
+        Method _recover recounts the keys and tombstones from the slots and sets the end of the arena past the last
+        pair a slot refers to. Bytes a crashed put appended without reaching its slot are reused
+        """
+        buffer = self._buffer
+        size = tombstones = 0
+        used = self._arena_start
+
+        for bucket in range(self.capacity):
+            _, offset, key_length, value_length = SLOT.unpack_from(buffer, HEADER_SIZE + bucket * SLOT.size)
+            if offset == 0:
+                continue
+            if value_length == TOMBSTONE:
+                tombstones += 1
+                end = offset + key_length  # the removed value is never read again
+            else:
+                size += 1
+                end = offset + key_length + value_length
+            used = max(used, end)
+
+        self._size = size
+        self.tombstones = tombstones
+        self._arena_used = used
+
+    def flush(self) -> None:
+        """
+        Method flush writes every change to disk, then marks the header clean and writes it as well. After a crash the
+        table has at least every change made before the last flush
+        """
+        super()._check_owner()
+        if self._clean:
+            return
+        self._handle.sync()
+        self._write_header(CLEAN)
+        self._handle.sync(header_only=True)
+        self._clean = True
+
+    def close(self) -> None:
+        """
+        Method close flushes a writable map and closes the file
+        """
+        if self._handle is not None and self._owner:
+            self.flush()
+        super().close()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+def _crash_while_writing(path: str) -> None:
+    """
+    Function _crash_while_writing changes the table and exits without flushing, as a crashed process would
+    """
+    m = HashMap.open(path)
+    for i in range(100, 150):
+        m.put('key' + str(i), i)
+    m.remove('key0')
+    os._exit(1)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import tempfile
+
+    print("\nsave, reopen and recover after a crash")
+    print("--------------------------------------")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'table.hm')
+        with HashMap(path, 8, 'fnv1a', arena_size=64) as m:
+            for i in range(100):
+                m.put('key' + str(i), i * 100)
+            m.put('key1', 'one hundred')
+            m.remove('key4')
+
+        with HashMap.open(path) as m:
+            print(m.size, m.capacity, m.get('key1'), m.get('key4'), m.get('key99'), m.contains_key('key100'))
+
+        child = multiprocessing.Process(target=_crash_while_writing, args=(path,))
+        child.start()
+        child.join()
+
+        with HashMap.open(path) as m:
+            print(child.exitcode, m.size, m.get('key0'), m.get('key149'), m.get_keys().length())
@@ -7,19 +7,25 @@
 # for table collisions
 
 
+import expiry
+import instrumentation
+import snapshot
 from a6_include import *
+from hash_functions import hash_function_1, hash_function_2, resolve_hash_function
+from resize_policy import ResizePolicy, OPEN_ADDRESSING_DEFAULT
 
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object):
+    def __init__(self, key: str, value: object, hash: int = None):
         """
-        Initializes an entry for use in a hash map
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Initializes an entry for use in a hash map. The full hash of the key is kept so the table never has to hash
+        the key again
         """
         self.key = key
         self.value = value
         self.is_tombstone = False
+        self.hash = hash
 
     def __str__(self):
         """
@@ -30,51 +36,50 @@ class HashEntry:
         return f"K: {self.key} V: {self.value} TS: {self.is_tombstone}"
 
 
-def hash_function_1(key: str) -> int:
-    """
-    Sample Hash function #1 to be used with HashMap implementation
-    DO NOT CHANGE THIS FUNCTION IN ANY WAY
-    """
-    hash = 0
-    for letter in key:
-        hash += ord(letter)
-    return hash
-
-
-def hash_function_2(key: str) -> int:
-    """
-    Sample Hash function #2 to be used with HashMap implementation
-    DO NOT CHANGE THIS FUNCTION IN ANY WAY
-    """
-    hash, index = 0, 0
-    index = 0
-    for letter in key:
-        hash += (index + 1) * ord(letter)
-        index += 1
-    return hash
+# left in the old table's bucket once an incremental resize has moved its entry, so probing there still moves on
+_MOVED = HashEntry(None, None)
+_MOVED.is_tombstone = True
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    def __init__(self, capacity: int, function, policy: ResizePolicy = OPEN_ADDRESSING_DEFAULT,
+                 tombstone_limit: float = 0.25, rehash_step: int = 0) -> None:
         """
-        Initialize new HashMap that uses Quadratic Probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Initialize new HashMap that uses Quadratic (triangular) Probing for collision resolution. The resize policy
+        decides when the table grows and shrinks, by default it doubles once the load factor reaches 0.5. Once
+        tombstones take up tombstone_limit of the buckets the table is compacted in place. If rehash_step is set,
+        growing keeps the old table and every later operation moves rehash_step of its buckets to the new one,
+        instead of moving every entry during a single put
         """
-        self.buckets = DynamicArray()
-
-        for _ in range(capacity):
-            self.buckets.append(None)
+        capacity = policy.round_capacity(capacity)
+        self.policy = policy
+        self.buckets = DynamicArray([None] * capacity)  # filled in bulk, not one append at a time
 
         self.capacity = capacity
-        self.hash_function = function
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
         self.size = 0
+        self.tombstones = 0  # number of removed entries still occupying a bucket
+        self.tombstone_limit = tombstone_limit
+        self._version = 0  # changes whenever keys are added, removed or moved, so iterators can detect it
+        self._max_probe = 0  # longest probe sequence a put has walked since the table was last rebuilt
+
+        # incremental resize state, _old_buckets is None unless entries are still being moved out of the old table
+        self.rehash_step = rehash_step
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._old_size = 0  # live entries still in the old table
+        self._rehash_index = 0
+
+        self.instrumentation = None  # set by enable_instrumentation
+        self.wal = None  # a wal.WriteAheadLog that every change is logged to, set by wal.open_map
+        self.expiry = None  # an expiry.Expiry with the deadlines of keys put with a ttl, made by the first one
 
     def __str__(self) -> str:
         """
         Overrides object's string method
         Return content of hash map in human-readable form
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
+        self._finish_rehash()
         out = ''
         for i in range(self.buckets.length()):
             out += str(i) + ': ' + str(self.buckets[i]) + '\n'
@@ -84,135 +89,454 @@ class HashMap:
         """
         Method clear clears the contents of the hash map. It does not change the underlying hash table capacity.
         """
-        self.buckets = DynamicArray()  # initialize new dynamic array
-
-        # set all buckets to None
-        for _ in range(self.capacity):
-            self.buckets.append(None)
+        self.buckets = DynamicArray([None] * self.capacity)  # initialize new dynamic array with every bucket None
 
         self.size = 0
+        self.tombstones = 0
+        self._old_buckets = None
+        self._old_size = 0
+        self._max_probe = 0
+        self._version += 1
+        if self.wal is not None:
+            self.wal.log_clear()
+        if self.expiry is not None:
+            self.expiry.clear()
+
+    def _probe(self, key: str, hash: int, buckets: DynamicArray = None, capacity: int = 0) -> tuple:
+        """
+        Method _probe walks the probe sequence for key once and returns (found, free, probes). found is the bucket
+        holding the live key, or -1 if it is not in the table. free is the first bucket a new entry for key could use
+        (the first tombstone, otherwise the None bucket that ended the search), or -1 if the sequence ran out of
+        buckets. probes is the number of buckets looked at.
+        Probing is triangular (offsets 0, 1, 3, 6, ...) which visits every bucket when the capacity is a power of two.
+        The current table is probed unless another one (the old table of an incremental resize) is given
+        """
+        if buckets is None:
+            buckets, capacity = self.buckets, self.capacity
+        get_bucket = buckets.get_at_index  # bound once so the loop skips the __getitem__ indirection
+        bucket = hash % capacity
+        first_tombstone = -1
+        step = 0
+
+        # after capacity probes every bucket the sequence can reach has been seen, so stop there in case the table has
+        # no None bucket left
+        while step < capacity:
+            index = get_bucket(bucket)
+            if index is None:
+                return -1, bucket if first_tombstone < 0 else first_tombstone, step + 1
+
+            # only compare the keys once the cached hashes match
+            if index.is_tombstone:
+                if first_tombstone < 0:
+                    first_tombstone = bucket
+                # a put reuses the first tombstone it passes, so a live copy of the key is never past its own tombstone
+                if index.hash == hash and index.key == key:
+                    return -1, first_tombstone, step + 1
+
+            elif index.hash == hash and index.key == key:
+                return bucket, first_tombstone, step + 1
+
+            step += 1
+            bucket = (bucket + step) % capacity
+
+        return -1, first_tombstone, step
 
     def get(self, key: str) -> object:
         """
-        Method get returns the value associated with the given key. If the key does not exist it returns None. Quadratic
-        Probing is used to find the key
+        Method get returns the value associated with the given key. If the key does not exist, or has expired, it
+        returns None
         """
-        # quadratic probing required
-        bucket = self.hash_function(key) % self.capacity  # find the bucket the key should be in
-        quad_probe = 1
-        index = self.buckets[bucket]  # initialize index so we do not have to keep calling self
-        init_bucket = self.hash_function(key) % self.capacity  # need for quadratic probing as bucket will be updated
+        if self.expiry is not None and self._expire_key(key):
+            return None
 
-        # using quadratic probing, look until we have found key or find a spot bucket with None
-        while index is not None and index.key != key:
-            bucket = (init_bucket + quad_probe ** 2) % self.capacity
-            index = self.buckets[bucket]
-            quad_probe += 1
+        if self._old_buckets is not None:
+            self._rehash()
 
-        # if the key was found, return the value
-        if index is not None and index.key == key and not index.is_tombstone:
-            return self.buckets[bucket].value
+        hash = self.hash_function(key)
+        found, _, _ = self._probe(key, hash)
+        if found >= 0:
+            return self.buckets[found].value
+
+        # while resizing incrementally the key may not have been moved out of the old table yet
+        if self._old_buckets is not None:
+            found, _, _ = self._probe(key, hash, self._old_buckets, self._old_capacity)
+            if found >= 0:
+                return self._old_buckets[found].value
 
         return None  # the key was not found, so return None
 
-    def put(self, key: str, value: object) -> None:
+    def put(self, key: str, value: object, ttl: float = None) -> None:
         """
         Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
-        value is replaced with the new value. The table must be resized if the load factor is >= 0.5 before adding the
-        new key/value pair
+        value is replaced with the new value. The table is resized before adding a new key/value pair if the
+        resize policy says the load factor is too high, so replacing a value never moves any entries.
+        With a ttl the key expires that many seconds later, and a put without one keeps the key until it is removed.
+        The write-ahead log records the ttl along with the put
         """
-        # remember, if the load factor is greater than or equal to 0.5,
-        # resize the table before putting the new key/value pair
-        #
-        # quadratic probing required
+        if self._old_buckets is not None:
+            self._rehash()
 
-        if self.table_load() >= 0.5:
-            self.resize_table(self.capacity * 2)
+        self._put_hashed(key, value, self.hash_function(key), grow=True)
+        if self.wal is not None:
+            self.wal.log_put(key, value, ttl)
 
-        bucket = self.hash_function(key) % self.capacity  # find bucket for key/value pair to be added
-        index = self.buckets[bucket]  # save index of array so we do not need to keep calling self
+        if ttl is not None:
+            if self.expiry is None:
+                self.expiry = expiry.Expiry()
+            self.expiry.set(key, ttl)
+        elif self.expiry is not None:
+            self.expiry.discard(key)  # a put without a ttl keeps the key until it is removed
 
-        quad_probe = 1  # initialize quadratic probing parameter
-        init_bucket = self.hash_function(key) % self.capacity
+    def _put_hashed(self, key: str, value: object, hash: int, grow: bool = False) -> None:
+        """
+        Method _put_hashed does the work of put once the key is hashed. Only with grow set does a new key first grow
+        the table if the resize policy says the load factor is too high
+        """
+        found, free, probes = self._probe(key, hash)
 
-        # loop until an empty spot is found or the current index key is the same or the index is a tombstone
-        while index is not None and index.key != key and not index.is_tombstone:
-            bucket = (init_bucket + quad_probe ** 2) % self.capacity  # use quadratic probing to find empty bucket
-            index = self.buckets[bucket]  # update index
-            quad_probe += 1  # update quad_probe for next time through loop
+        # if the key already exists, replace the value
+        if found >= 0:
+            self.buckets[found].value = value
+            return
 
-        # if the key already exists at the index, replace the value
-        if index is not None and index.key == key:
-            self.buckets[bucket].value = value
+        # while resizing incrementally the key may still be in the old table, update it there and let it move later
+        if self._old_buckets is not None:
+            old_found, _, _ = self._probe(key, hash, self._old_buckets, self._old_capacity)
+            if old_found >= 0:
+                self._old_buckets[old_found].value = value
+                return
+
+        # a new key is being added, grow first if the policy says it would overload the table
+        if grow:
+            new_capacity = self.policy.grow_capacity(self.size, self.capacity)
+            if new_capacity is not None:
+                if self.rehash_step and self._old_buckets is None:
+                    self._start_rehash(new_capacity)
+                else:
+                    self.resize_table(new_capacity)
+                self._put_hashed(key, value, hash)
+                return
+
+        # the probe sequence has no free bucket left, grow the table and try again
+        if free < 0:
+            self.resize_table(self.capacity * 2)
+            self._put_hashed(key, value, hash)
+            return
 
-        # if the index contains a tombstone, update the key/value and update is_tombstone to False
-        elif index is not None and index.is_tombstone:
-            self.buckets[bucket].key = key
-            self.buckets[bucket].value = value
-            self.buckets[bucket].is_tombstone = False
-            self.size += 1  # add one to size since this bucket is no longer a tombstone
+        index = self.buckets[free]
 
         # an empty bucket has been found, add the new key value pair
+        if index is None:
+            self.buckets[free] = HashEntry(key, value, hash)
+
+        # otherwise reuse the tombstone, update the key/value/hash and update is_tombstone to False
         else:
-            self.buckets[bucket] = HashEntry(key, value)
-            self.size += 1
+            index.key = key
+            index.value = value
+            index.hash = hash
+            index.is_tombstone = False
+            self.tombstones -= 1
+
+        self.size += 1
+        self._version += 1
+        if probes > self._max_probe:
+            self._max_probe = probes
 
     def remove(self, key: str) -> None:
         """
         Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
         map, nothing is done.
         """
-        # quadratic probing required
-        bucket = self.hash_function(key) % self.capacity  # find the bucket the key should be in
-        quad_probe = 1
-        index = self.buckets[bucket]  # initialize index so we do not have to keep calling self
-        init_bucket = self.hash_function(key) % self.capacity  # need for quadratic probing as bucket will be updated
+        if self._old_buckets is not None:
+            self._rehash()
 
-        # using quadratic probing, look until we have found key or find a spot bucket with None
-        while index is not None and index.key != key:
-            bucket = (init_bucket + quad_probe ** 2) % self.capacity
-            index = self.buckets[bucket]
-            quad_probe += 1
+        if self.expiry is not None:
+            self.expiry.discard(key)
+        if self._remove_hashed(key, self.hash_function(key)):
+            if self.wal is not None:
+                self.wal.log_remove(key)
+            self._after_remove()
+
+    def _remove_hashed(self, key: str, hash: int) -> bool:
+        """
+        Method _remove_hashed does the work of remove once the key is hashed and returns True if the key was removed
+        """
+        found, _, _ = self._probe(key, hash)
+        if found < 0:
+            # while resizing incrementally the key may still be in the old table, which is thrown away once empty
+            if self._old_buckets is not None:
+                found, _, _ = self._probe(key, hash, self._old_buckets, self._old_capacity)
+                if found >= 0:
+                    self._old_buckets[found].is_tombstone = True
+                    self.size -= 1
+                    self._old_size -= 1
+                    self._version += 1
+                    return True
+            return False
+
+        # set the tombstone to true, which removes the key/value pair per ed thread
+        self.buckets[found].is_tombstone = True
+        self.size -= 1  # update size
+        self.tombstones += 1
+        self._version += 1
+        return True
+
+    def _after_remove(self) -> None:
+        """
+        Method _after_remove shrinks or compacts the table if removes have left it too empty or too full of tombstones
+        """
+        # wait for an incremental resize to finish before resizing or compacting again
+        if self._old_buckets is not None:
+            return
 
-        # if the key was found, set the tombstone to true, which removes the key/value pair per ed thread
-        if index is not None and index.key == key and not index.is_tombstone:
-            self.buckets[bucket].is_tombstone = True
-            self.size -= 1  # update size
+        # give memory back once the table has drained below the policy's minimum load
+        new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+
+        # otherwise reclaim the tombstones before they make probe sequences too long
+        elif self.tombstones >= self.capacity * self.tombstone_limit:
+            self.compact()
 
     def contains_key(self, key: str) -> bool:
         """
-        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        Method contains_key returns True if key is in the hash map and has not expired, otherwise it returns False.
         """
-        # quadratic probing required
-        bucket = self.hash_function(key) % self.capacity  # find the bucket the key should be in
-        quad_probe = 1
-        index = self.buckets[bucket]  # initialize index so we do not have to keep calling self
-        init_bucket = self.hash_function(key) % self.capacity  # need for quadratic probing as bucket will be updated
+        if self.expiry is not None and self._expire_key(key):
+            return False
 
-        # using quadratic probing, look until we have found key or find a spot bucket with None
-        while index is not None and index.key != key:
-            bucket = (init_bucket + quad_probe ** 2) % self.capacity
-            index = self.buckets[bucket]
-            quad_probe += 1
+        if self._old_buckets is not None:
+            self._rehash()
+
+        hash = self.hash_function(key)
+        found, _, _ = self._probe(key, hash)
+        if found < 0 and self._old_buckets is not None:
+            found, _, _ = self._probe(key, hash, self._old_buckets, self._old_capacity)
+        return found >= 0
+
+    def _expire_key(self, key: str) -> bool:
+        """
+        Method _expire_key removes key if its ttl has run out and returns True if it did
+        """
+        if not self.expiry.expired(key):
+            return False
+        self.remove(key)
+        return True
+
+    def _expire_keys(self, keys) -> None:
+        """
+        Method _expire_keys removes every key in keys whose ttl has run out, which get_many uses to check a batch
+        """
+        expired = [key for key in keys if self.expiry.expired(key)]
+        if expired:
+            self.remove_many(expired)
+
+    def expire(self, limit: int = None) -> int:
+        """
+        Method expire removes at most limit of the keys whose ttl has run out, the longest expired first, and returns
+        how many it removed. Only the due deadlines are looked at, so a small limit keeps each call short; expired
+        keys are also removed whenever get, get_many or contains_key find them, and until then they still count
+        towards size and are returned by the iterators. expiry.Sweeper calls this from a background thread
+        """
+        if self.expiry is None:
+            return 0
+        keys = self.expiry.due(limit)
+        if keys:
+            self.remove_many(keys)
+        return len(keys)
+
+    def ttl(self, key: str) -> float:
+        """
+        Method ttl returns the seconds left before key expires, or None if it was not put with a ttl
+        """
+        return self.expiry.remaining(key) if self.expiry is not None else None
+
+    def reserve(self, count: int) -> None:
+        """
+        Method reserve resizes the table once so that count more keys can be added without the load factor reaching
+        the resize policy's limit
+        """
+        self._finish_rehash()
+        # the same threshold grow_capacity applies, which lets the last key bring the load up to max_load
+        needed = int((self.size + count - 1) / self.policy.max_load) + 1
+        if needed > self.capacity:
+            # grow by at least the policy's factor, so a series of batches still resizes a logarithmic number of times
+            self.resize_table(max(needed, int(self.capacity * self.policy.growth_factor)))
+
+    def put_many(self, pairs) -> None:
+        """
+        Method put_many puts every (key, value) pair from pairs. The table is sized for the whole batch up front, so
+        it is resized at most once
+        """
+        if not isinstance(pairs, (list, tuple)):
+            pairs = list(pairs)  # the batch length is needed before anything is added
+        self.reserve(len(pairs))
+
+        hash_function, put_hashed = self.hash_function, self._put_hashed
+        for key, value in pairs:
+            put_hashed(key, value, hash_function(key))
+        if self.wal is not None:
+            self.wal.log_put_many(pairs)
+        if self.expiry is not None:
+            for key, _ in pairs:
+                self.expiry.discard(key)
+
+    def get_many(self, keys) -> list:
+        """
+        Method get_many returns a list with the value for each key, or None for keys that do not exist or have expired
+        """
+        if self.expiry is not None:
+            keys = list(keys)
+            self._expire_keys(keys)
+        self._finish_rehash()
+        hash_function, probe, get_bucket = self.hash_function, self._probe, self.buckets.get_at_index
+
+        values = []
+        for key in keys:
+            found, _, _ = probe(key, hash_function(key))
+            values.append(get_bucket(found).value if found >= 0 else None)
+        return values
+
+    def remove_many(self, keys) -> list:
+        """
+        Method remove_many removes every key and returns a list with True for each key that was in the hash map. The
+        table is shrunk or compacted afterwards instead of after every remove
+        """
+        self._finish_rehash()
+        hash_function, remove_hashed = self.hash_function, self._remove_hashed
+        if self.wal is not None or self.expiry is not None:
+            keys = list(keys)  # the keys are needed again to log the ones that were removed and drop their deadlines
+        removed = [remove_hashed(key, hash_function(key)) for key in keys]
+        if self.wal is not None:
+            self.wal.log_remove_many(key for key, was_removed in zip(keys, removed) if was_removed)
+        if self.expiry is not None:
+            for key in keys:
+                self.expiry.discard(key)
+
+        # a big batch may leave the table far emptier than a single shrink step fixes
+        capacity = None
+        while capacity != self.capacity:
+            capacity = self.capacity
+            self._after_remove()
+        return removed
+
+    @classmethod
+    def from_pairs(cls, pairs, function, **kwargs) -> 'HashMap':
+        """
+        Method from_pairs returns a new HashMap holding the (key, value) pairs, with the table sized for all of them
+        before anything is added. Any other HashMap argument can be passed by keyword
+        """
+        hash_map = cls(1, function, **kwargs)
+        hash_map.put_many(pairs)
+        return hash_map
+
+    def dump(self, stream, compression: str = None) -> None:
+        """
+        Method dump writes the hash map to the binary stream as a snapshot (see snapshot.py), a chunk at a time. Only
+        live keys are written, with their stored hashes. compression may be None, 'zlib', 'bz2' or 'lzma'
+        """
+        snapshot.dump(stream, self.capacity, self.hash_function, self.size,
+                      ((entry.hash, entry.key, entry.value) for entry in self._live_entries()), compression)
 
-        # if the key was found, return True
-        if index is not None and index.key == key and not index.is_tombstone:
-            return True
+    @classmethod
+    def load(cls, stream, function=None, **kwargs) -> 'HashMap':
+        """
+        Method load returns a new HashMap read from a snapshot written by dump, with the capacity it was saved with.
+        The hash function recorded in the snapshot is used unless function is given, and any other HashMap argument
+        can be passed by keyword
+        """
+        capacity, function, size, entries = snapshot.load(stream, function)
+        hash_map = cls(capacity, function, **kwargs)
+        hash_map.reserve(size)
+        hash_map._place_loaded(entries)
+        return hash_map
 
-        return False  # the key was not found, so return False
+    def _place_loaded(self, entries) -> None:
+        """
+        Method _place_loaded adds the (hash, key, value) entries read from a snapshot to the empty table
+        """
+        capacity = self.capacity
+        get_bucket, set_bucket = self.buckets.get_at_index, self.buckets.set_at_index
+        max_probe = 0
+        unplaced = []  # entries whose probe sequence had no free bucket left
+
+        placed = 0
+
+        for hash, key, value in entries:
+            # every key is distinct and there are no tombstones, so just take the first empty bucket on the sequence
+            bucket = hash % capacity
+            step = 0
+            index = get_bucket(bucket)
+            while index is not None and step < capacity:
+                step += 1
+                bucket = (bucket + step) % capacity
+                index = get_bucket(bucket)
+            if index is not None:
+                unplaced.append((hash, key, value))
+                continue
+
+            set_bucket(bucket, HashEntry(key, value, hash))
+            placed += 1
+            if step >= max_probe:
+                max_probe = step + 1
+
+        self.size += placed
+        self._max_probe = max_probe
+        self._version += 1
+
+        # _put_hashed grows the table when it cannot find a free bucket, so it can take care of any leftovers
+        for hash, key, value in unplaced:
+            self._put_hashed(key, value, hash)
 
     def empty_buckets(self) -> int:
         """
-        Method empty_buckets returns the number of empty buckets in the hash table.
+        Method empty_buckets returns the number of empty buckets in the hash table. A bucket is empty if it is set to
+        None or if it is a tombstone, so this is every bucket not holding a live entry
         """
-        empty_buckets = 0
+        return self.capacity - (self.size - self._old_size)  # keys still in the old table are not in a bucket here
 
-        for bucket in range(self.capacity):
-            # a bucket is empty if it is set to None or if it is a tombstone
-            if self.buckets[bucket] is None or self.buckets[bucket].is_tombstone:
-                empty_buckets += 1  # increase count if either condition is met
+    def stats(self) -> dict:
+        """
+        Method stats returns a snapshot of the table's counters. Every counter is kept up to date by the operations
+        that change it, so this never scans the table. max_probe is the longest probe sequence a put has walked since
+        the table was last resized, compacted or cleared
+        """
+        occupied = self.size - self._old_size
+        return {
+            'size': self.size,
+            'capacity': self.capacity,
+            'load': self.size / self.capacity,
+            'occupied_buckets': occupied,
+            'empty_buckets': self.capacity - occupied,
+            'tombstones': self.tombstones,
+            'max_probe': self._max_probe,
+            'resizing': self._old_buckets is not None,
+        }
+
+    def enable_instrumentation(self) -> instrumentation.Instrumentation:
+        """
+        Method enable_instrumentation starts recording how many buckets each get, put, remove and contains_key probes
+        and returns the Instrumentation holding the histograms. The counting versions of the methods are set on this
+        map only, so a map that never enables instrumentation runs no extra code
+        """
+        if self.instrumentation is None:
+            instrumentation.attach(self, 'buckets probed', {'_probe': self._counted_probe})
+        return self.instrumentation
 
-        return empty_buckets
+    def disable_instrumentation(self) -> None:
+        """
+        Method disable_instrumentation stops recording and puts the uninstrumented methods back
+        """
+        if self.instrumentation is not None:
+            instrumentation.detach(self)
+
+    def _counted_probe(self, key: str, hash: int, buckets: DynamicArray = None, capacity: int = 0) -> tuple:
+        """
+        Method _counted_probe is _probe, adding the number of buckets looked at to the current operation's count
+        """
+        result = HashMap._probe(self, key, hash, buckets, capacity)
+        self._probe_count += result[2]
+        return result
 
     def table_load(self) -> float:
         """
@@ -224,33 +548,164 @@ class HashMap:
     def resize_table(self, new_capacity: int) -> None:
         """
         Method resize_table changes the capacity of the internal hash table, while retaining
-        existing key/value pairs. The keys are rehashed so that they are in the proper bucket
-        in the new dynamic array.
+        existing key/value pairs. The entries are moved to their bucket in the new dynamic array
+        using their cached hash, so no key is hashed again.
         """
-        # remember to rehash non-deleted entries into new table
+        new_capacity = self.policy.round_capacity(new_capacity)  # keep prime/power of two capacities if requested
         if new_capacity < 1 or new_capacity < self.size:
             return
 
-        new_hash = HashMap(new_capacity, self.hash_function)  # initialize new hash map for copying data
+        new_buckets = DynamicArray([None] * new_capacity)
 
-        # loop through buckets in existing array
-        for bucket in range(self.capacity):
+        # loop through buckets in existing array, and in the old table if an incremental resize is still going
+        tables = [(self.buckets, self.capacity)]
+        if self._old_buckets is not None:
+            tables.append((self._old_buckets, self._old_capacity))
+        entries = (buckets[bucket] for buckets, capacity in tables for bucket in range(capacity))
+        max_probe = 0
+
+        for entry in entries:
             # check that there is a key/value pair in the bucket and that it is not a tombstone
-            if self.buckets[bucket] is not None and not self.buckets[bucket].is_tombstone:
-                # get the key and value once there is a valid one found
-                key = self.buckets[bucket].key
-                value = self.buckets[bucket].value
-                # add value to new hash using put
-                new_hash.put(key, value)
+            if entry is None or entry.is_tombstone:
+                continue
+
+            # every key in the table is distinct, so just find the first empty bucket on the entry's probe sequence
+            new_bucket = entry.hash % new_capacity
+            step = 0
+            while new_buckets[new_bucket] is not None and step < new_capacity:
+                step += 1
+                new_bucket = (new_bucket + step) % new_capacity
+
+            if new_buckets[new_bucket] is not None:
+                # the probe sequence has no free bucket at this capacity, start over with a bigger table
+                self.resize_table(new_capacity * 2)
+                return
+            new_buckets[new_bucket] = entry  # the entry object itself moves, nothing is copied
+            max_probe = max(max_probe, step + 1)
+
+        self.buckets = new_buckets
+        self.capacity = new_capacity
+        self.tombstones = 0  # tombstones are not copied to the new table
+        self._old_buckets = None
+        self._old_size = 0
+        self._max_probe = max_probe
+        self._version += 1
+
+    def _start_rehash(self, new_capacity: int) -> None:
+        """
+        Method _start_rehash swaps in an empty table of the new capacity and keeps the current one as the old table,
+        whose entries are moved over a few buckets at a time by _rehash
+        """
+        new_capacity = self.policy.round_capacity(new_capacity)
+        self._old_buckets = self.buckets
+        self._old_capacity = self.capacity
+        self._old_size = self.size
+        self._rehash_index = 0
+        self._max_probe = 0
+
+        self.buckets = DynamicArray([None] * new_capacity)
+        self.capacity = new_capacity
+        self.tombstones = 0  # the old table's tombstones are thrown away with it
+        self._version += 1
+
+    def _rehash(self, count: int = 0) -> None:
+        """
+        Method _rehash moves the entries of the next count buckets of the old table (rehash_step buckets by default)
+        into the current table, and drops the old table once every bucket has been moved
+        """
+        old_buckets, old_capacity = self._old_buckets, self._old_capacity
+        end = min(old_capacity, self._rehash_index + (count or self.rehash_step))
+
+        for bucket in range(self._rehash_index, end):
+            entry = old_buckets[bucket]
+            if entry is None or entry.is_tombstone:
+                continue
+
+            # the key is only in the old table, so it goes in the first free bucket on its probe sequence
+            # called on the class so instrumentation counts the operation's own probes, not the migration's
+            _, free, probes = HashMap._probe(self, entry.key, entry.hash)
+            if free < 0:
+                # the probe sequence has no free bucket left, resize both tables into a bigger one all at once
+                self._rehash_index = bucket
+                self.resize_table(self.capacity * 2)
+                return
+
+            if self.buckets[free] is not None:
+                self.tombstones -= 1
+            self.buckets[free] = entry
+            old_buckets[bucket] = _MOVED
+            self._old_size -= 1
+            if probes > self._max_probe:
+                self._max_probe = probes
+
+        self._rehash_index = end
+        self._version += 1
+        if end == old_capacity:
+            self._old_buckets = None  # every entry has been moved
+
+    def _finish_rehash(self) -> None:
+        """
+        Method _finish_rehash moves every entry left in the old table of an incremental resize
+        """
+        if self._old_buckets is not None:
+            self._rehash(self._old_capacity)
 
-        # update properties of the original hash map from new hash map created for resize
-        self.buckets = new_hash.buckets
-        self.capacity = new_hash.capacity
+    def compact(self) -> None:
+        """
+        Method compact removes every tombstone from the hash table and rehashes the remaining entries in place, without
+        building a second table. The capacity does not change
+        """
+        self._finish_rehash()
+        placed = bytearray(self.capacity)  # 1 once the entry in that bucket is in its final position
+        max_probe = 0
+        unplaced = []  # entries whose probe sequence had no free bucket left
+
+        # drop the tombstones so their buckets can be reused
+        for bucket in range(self.capacity):
+            index = self.buckets[bucket]
+            if index is not None and index.is_tombstone:
+                self.buckets[bucket] = None
+
+        for bucket in range(self.capacity):
+            entry = self.buckets[bucket]
+            if entry is None or placed[bucket]:
+                continue
+            self.buckets[bucket] = None  # lift the entry out and re-probe for it
+
+            # place the entry, and if it lands on an entry that has not been placed yet, carry that one on instead.
+            # Buckets before the current one are either empty or placed, so every entry carried is visited only once
+            while entry is not None:
+                new_bucket = entry.hash % self.capacity
+                step = 0
+                while self.buckets[new_bucket] is not None and placed[new_bucket] and step < self.capacity:
+                    step += 1
+                    new_bucket = (new_bucket + step) % self.capacity
+
+                if self.buckets[new_bucket] is not None and placed[new_bucket]:
+                    unplaced.append(entry)
+                    break
+
+                displaced = self.buckets[new_bucket]
+                self.buckets[new_bucket] = entry
+                placed[new_bucket] = 1
+                max_probe = max(max_probe, step + 1)
+                entry = displaced
+
+        self.tombstones = 0
+        self._max_probe = max_probe
+        self._version += 1
+
+        # _put_hashed grows the table when it cannot find a free bucket, so it can take care of any leftovers. It is
+        # internal work, so unlike put it leaves the write-ahead log, the ttls and the instrumentation alone
+        self.size -= len(unplaced)
+        for entry in unplaced:
+            self._put_hashed(entry.key, entry.value, entry.hash)
 
     def get_keys(self) -> DynamicArray:
         """
         Method get_keys returns a DynamicArray that contains all keys stored in the hash map
         """
+        self._finish_rehash()
         key_array = DynamicArray()  # initiate new array to store keys
 
         for bucket in range(self.capacity):
@@ -261,6 +716,77 @@ class HashMap:
 
         return key_array
 
+    def _live_entries(self):
+        """
+        Method _live_entries yields every live HashEntry without copying anything. It raises RuntimeError if the hash
+        map is changed by anything other than a value update while it is being iterated
+        """
+        self._finish_rehash()
+        buckets, capacity, version = self.buckets, self.capacity, self._version
+
+        for bucket in range(capacity):
+            entry = buckets[bucket]
+            if entry is not None and not entry.is_tombstone:
+                yield entry
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+
+    def keys(self):
+        """
+        Method keys returns a generator over the keys in the hash map
+        """
+        return (entry.key for entry in self._live_entries())
+
+    def values(self):
+        """
+        Method values returns a generator over the values in the hash map
+        """
+        return (entry.value for entry in self._live_entries())
+
+    def items(self):
+        """
+        Method items returns a generator over the (key, value) pairs in the hash map
+        """
+        return ((entry.key, entry.value) for entry in self._live_entries())
+
+    def __iter__(self):
+        """
+        Iterates over the keys in the hash map
+        """
+        return self.keys()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys in the hash map
+        """
+        return self.size
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Returns True if key is in the hash map
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        Returns the value for key, raising KeyError if the key does not exist or has expired
+        """
+        if self.expiry is not None and self._expire_key(key):
+            raise KeyError(key)
+
+        if self._old_buckets is not None:
+            self._rehash()
+
+        hash = self.hash_function(key)
+        found, _, _ = self._probe(key, hash)
+        if found >= 0:
+            return self.buckets[found].value
+        if self._old_buckets is not None:
+            found, _, _ = self._probe(key, hash, self._old_buckets, self._old_capacity)
+            if found >= 0:
+                return self._old_buckets[found].value
+        raise KeyError(key)
+
 
 if __name__ == "__main__":
 
@@ -443,3 +969,45 @@ if __name__ == "__main__":
     m.remove('100')
     m.resize_table(2)
     print(m.get_keys())
+
+    print("\nviews, and replacing values while iterating")
+    print("-------------------------------------------")
+    m = HashMap(4, 'fnv1a')
+    m.put('a', 1)
+    m.put('b', 2)
+    for key in m:
+        m.put(key, m[key] * 10)  # replacing a value never resizes, so the iteration carries on
+    print(sorted(m.items()), sorted(m.values()), m.capacity, len(m), 'a' in m, 'c' in m)
+    try:
+        for key in m:
+            m.put(key + key, 0)
+    except RuntimeError as error:
+        print(type(error).__name__, error)
+
+    print("\nbatch operations")
+    print("----------------")
+    m = HashMap.from_pairs((('key' + str(i), i) for i in range(100)), 'fnv1a')
+    m.put_many([('key1', 'one'), ('key100', 100)])
+    print(m.size, m.get_many(['key1', 'key99', 'key100', 'key101']))
+    removed = m.remove_many(['key' + str(i) for i in range(0, 110, 2)])
+    print(removed.count(True), removed.count(False), m.size, m.contains_key('key2'), m.get('key3'))
+
+    print("\nstats")
+    print("-----")
+    m = HashMap(16, 'fnv1a')
+    for i in range(40):
+        m.put('key' + str(i), i)
+    for i in range(0, 40, 3):
+        m.remove('key' + str(i))
+    stats = m.stats()
+    print(stats)
+    print(stats['size'] == m.size, stats['empty_buckets'] == m.empty_buckets())
+
+    print("\nkeys with a ttl")
+    print("---------------")
+    m = HashMap(16, 'fnv1a')
+    for i in range(10):
+        m.put('key' + str(i), i, ttl=-1 if i % 2 else 60)  # a negative ttl has already run out
+    m.put('key9', 9)  # a put without a ttl keeps the key
+    print(m.size, m.get('key1'), m.contains_key('key3'), m.get_many(['key4', 'key5', 'key9']), m.size)
+    print(m.expire(limit=1), m.expire(), m.size, m.ttl('key9'), 59 < m.ttl('key0') <= 60)
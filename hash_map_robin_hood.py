@@ -0,0 +1,286 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Open addressing hash map using Robin Hood hashing. It has the same API as hash_map_oa.HashMap, but uses
+# linear probing where an insert takes the bucket of any entry that is closer to its home bucket, and removes shift
+# the following entries back instead of leaving tombstones, so it can run at a much higher load factor
+
+
+from a6_include import *
+from hash_functions import hash_function_2, resolve_hash_function
+from hash_map_oa import HashEntry
+from resize_policy import ResizePolicy, ROBIN_HOOD_DEFAULT
+
+
+def _place(buckets: DynamicArray, capacity: int, entry: HashEntry, bucket: int = -1, distance: int = 0) -> int:
+    """
+    Helper _place adds an entry whose key is not in the buckets yet, displacing entries that are closer to their home
+    bucket, and returns the longest probe sequence it created. The walk starts at the entry's home bucket unless a
+    bucket further along and the entry's distance there are given
+    """
+    get_bucket, set_bucket = buckets.get_at_index, buckets.set_at_index
+    if bucket < 0:
+        bucket = entry.hash % capacity
+    longest = 0
+
+    while True:
+        current = get_bucket(bucket)
+        if current is None:
+            set_bucket(bucket, entry)
+            return max(longest, distance + 1)
+
+        current_distance = (bucket - current.hash) % capacity
+        if current_distance < distance:
+            # the entry has come further than the one in this bucket, so it takes the bucket and the other moves on
+            set_bucket(bucket, entry)
+            longest = max(longest, distance + 1)
+            entry, distance = current, current_distance
+
+        distance += 1
+        bucket = (bucket + 1) % capacity
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, policy: ResizePolicy = ROBIN_HOOD_DEFAULT) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood hashing with linear probing for collision resolution. The resize
+        policy decides when the table grows and shrinks, by default it doubles once the load factor reaches 0.9
+        """
+        capacity = policy.round_capacity(capacity)
+        self.policy = policy
+        self.buckets = DynamicArray([None] * capacity)  # filled in bulk, not one append at a time
+
+        self.capacity = capacity
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self.size = 0
+        self._max_probe = 0  # longest probe sequence an insert has created since the table was last rebuilt
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form, in the same format as hash_map_oa.HashMap
+        """
+        out = ''
+        for i in range(self.buckets.length()):
+            out += str(i) + ': ' + str(self.buckets[i]) + '\n'
+        return out
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map. It does not change the underlying hash table capacity.
+        """
+        self.buckets = DynamicArray([None] * self.capacity)  # initialize new dynamic array with every bucket None
+
+        self.size = 0
+        self._max_probe = 0
+
+    def _find(self, key: str, hash: int) -> int:
+        """
+        Method _find returns the bucket holding key, or -1 if the key is not in the table. An insert never passes
+        an entry that is closer to its home bucket than the new key is to its own, so the search stops as soon as it
+        reaches such an entry
+        """
+        get_bucket = self.buckets.get_at_index
+        capacity = self.capacity
+        bucket = hash % capacity
+        distance = 0
+
+        while True:
+            entry = get_bucket(bucket)
+            if entry is None or (bucket - entry.hash) % capacity < distance:
+                return -1
+
+            # only compare the keys once the cached hashes match
+            if entry.hash == hash and entry.key == key:
+                return bucket
+
+            distance += 1
+            bucket = (bucket + 1) % capacity
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        bucket = self._find(key, self.hash_function(key))
+        if bucket < 0:
+            return None  # the key was not found, so return None
+        return self.buckets[bucket].value
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value. The table is resized before adding a new key/value pair if the
+        resize policy says the load factor is too high
+        """
+        hash = self.hash_function(key)
+
+        while True:
+            get_bucket = self.buckets.get_at_index
+            capacity = self.capacity
+            bucket = hash % capacity
+            distance = 0
+
+            # the key can only be in the buckets before the first entry that is closer to home, which is also where
+            # the new entry belongs, so one walk both looks for the key and finds the bucket to insert at
+            while True:
+                entry = get_bucket(bucket)
+                if entry is None or (bucket - entry.hash) % capacity < distance:
+                    break
+
+                # if the key already exists, replace the value
+                if entry.hash == hash and entry.key == key:
+                    entry.value = value
+                    return
+
+                distance += 1
+                bucket = (bucket + 1) % capacity
+
+            # the key is new, so grow the table first if the policy says so and walk the bigger table instead
+            new_capacity = self.policy.grow_capacity(self.size, capacity)
+            if new_capacity is None and self.size >= capacity:
+                new_capacity = capacity * 2  # a policy allowing a full table would leave no bucket for the key
+            if new_capacity is None:
+                break
+            self.resize_table(new_capacity)
+
+        self.buckets[bucket] = HashEntry(key, value, hash)
+        self.size += 1
+        longest = distance + 1
+        if entry is not None:
+            # the displaced entry carries on from the next bucket, pushing along entries closer to home than it
+            distance = (bucket - entry.hash) % capacity + 1
+            longest = max(longest, _place(self.buckets, capacity, entry, (bucket + 1) % capacity, distance))
+        self._max_probe = max(self._max_probe, longest)
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done. The entries after it are shifted back a bucket, so no tombstone is left behind
+        """
+        bucket = self._find(key, self.hash_function(key))
+        if bucket < 0:
+            return
+
+        get_bucket, set_bucket = self.buckets.get_at_index, self.buckets.set_at_index
+        capacity = self.capacity
+        next_bucket = (bucket + 1) % capacity
+
+        # shift back every following entry until an empty bucket or an entry that is already in its home bucket
+        while True:
+            entry = get_bucket(next_bucket)
+            if entry is None or entry.hash % capacity == next_bucket:
+                break
+            set_bucket(bucket, entry)
+            bucket = next_bucket
+            next_bucket = (next_bucket + 1) % capacity
+
+        set_bucket(bucket, None)
+        self.size -= 1
+
+        # give memory back once the table has drained below the policy's minimum load
+        new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+        if new_capacity is not None:
+            self.resize_table(new_capacity)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        return self._find(key, self.hash_function(key)) >= 0
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets in the hash table. Removes leave no tombstones, so
+        this is every bucket not holding an entry
+        """
+        return self.capacity - self.size
+
+    def stats(self) -> dict:
+        """
+        Method stats returns a snapshot of the table's counters, in the same format as hash_map_oa.HashMap.stats.
+        max_probe is the longest probe sequence an insert has created since the table was last resized or cleared,
+        removes only ever shorten probe sequences
+        """
+        return {
+            'size': self.size,
+            'capacity': self.capacity,
+            'load': self.size / self.capacity,
+            'occupied_buckets': self.size,
+            'empty_buckets': self.capacity - self.size,
+            'tombstones': 0,
+            'max_probe': self._max_probe,
+            'resizing': False,
+        }
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table changes the capacity of the internal hash table, while retaining
+        existing key/value pairs. The entries are placed in the new dynamic array using their
+        cached hash, so no key is hashed again.
+        """
+        new_capacity = self.policy.round_capacity(new_capacity)  # keep prime/power of two capacities if requested
+        if new_capacity < 1 or new_capacity < self.size:
+            return
+
+        new_buckets = DynamicArray([None] * new_capacity)
+
+        max_probe = 0
+        for bucket in range(self.capacity):
+            entry = self.buckets[bucket]
+            if entry is not None:
+                max_probe = max(max_probe, _place(new_buckets, new_capacity, entry))
+
+        self.buckets = new_buckets
+        self.capacity = new_capacity
+        self._max_probe = max_probe
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()  # initiate new array to store keys
+
+        for bucket in range(self.capacity):
+            entry = self.buckets[bucket]
+            if entry is not None:
+                key_array.append(entry.key)  # add to the array
+
+        return key_array
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nrobin hood put/remove/resize")
+    print("----------------------------")
+    m = HashMap(8, 'fnv1a')
+    for i in range(50):
+        m.put('key' + str(i), i * 10)
+    m.put('key1', 'ten')
+    for i in range(0, 50, 4):
+        m.remove('key' + str(i))
+    print(m.size, m.capacity, m.get('key1'), m.get('key4'), m.contains_key('key49'), m.contains_key('key0'))
+    print(m.get_keys().length(), round(m.table_load(), 2), m.empty_buckets())
+
+    print("\nkeys that collide under hash_function_2, checked against a dict")
+    print("---------------------------------------------------------------")
+    m = HashMap(8, hash_function_2)
+    expected = {}
+    for i in range(600):
+        key = str(i * 7 % 300)
+        if i % 5 == 4:
+            m.remove(key)
+            expected.pop(key, None)
+        else:
+            m.put(key, i)
+            expected[key] = i
+    print(m.size == len(expected), all(m.get(key) == value for key, value in expected.items()),
+          not any(m.contains_key(str(i)) for i in range(300) if str(i) not in expected))
+    print(m.stats())
@@ -7,52 +7,96 @@
 # for table collisions
 
 
+import expiry
+import instrumentation
+import snapshot
 from a6_include import *
+from hash_functions import hash_function_1, hash_function_2, resolve_hash_function
+from resize_policy import ResizePolicy
 
 
-def hash_function_1(key: str) -> int:
+# stands in for every bucket no key has been added to yet, and for old table buckets that an incremental resize has
+# already moved, it is never modified
+_EMPTY_CHAIN = LinkedList()
+
+
+def _new_table(capacity: int) -> DynamicArray:
+    """
+    Helper _new_table returns a DynamicArray of capacity empty buckets. Every bucket starts as the shared empty chain,
+    so the array is filled in bulk and a LinkedList is only created once a key is added to its bucket
+    """
+    return DynamicArray([_EMPTY_CHAIN] * capacity)
+
+
+def _chain(buckets: DynamicArray, bucket: int) -> LinkedList:
+    """
+    Helper _chain returns the chain at bucket to add a node to, creating it if the bucket still holds the empty chain
+    """
+    chain = buckets[bucket]
+    if chain is _EMPTY_CHAIN:
+        chain = LinkedList()
+        buckets[bucket] = chain
+    return chain
+
+
+def _find(chain: LinkedList, key: str, hash: int) -> SLNode:
     """
-    Sample Hash function #1 to be used with A5 HashMap implementation
-    DO NOT CHANGE THIS FUNCTION IN ANY WAY
+    Helper _find returns the node for key in the chain, or None. The cached hashes are compared before the keys
     """
-    hash = 0
-    for letter in key:
-        hash += ord(letter)
-    return hash
+    for node in chain:
+        if node.hash == hash and node.key == key:
+            return node
+    return None
 
 
-def hash_function_2(key: str) -> int:
+def _insert(chain: LinkedList, key: str, value: object, hash: int) -> None:
     """
-    Sample Hash function #2 to be used with A5 HashMap implementation
-    DO NOT CHANGE THIS FUNCTION IN ANY WAY
+    Helper _insert adds the key/value pair to the chain and caches the key's full hash on the new node
     """
-    hash, index = 0, 0
-    index = 0
-    for letter in key:
-        hash += (index + 1) * ord(letter)
-        index += 1
-    return hash
+    chain.insert(key, value)
+    for node in chain:  # LinkedList.insert adds the node at the front
+        node.hash = hash
+        break
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    _find = staticmethod(_find)  # looked up on the map so enable_instrumentation can swap in a counting version
+
+    def __init__(self, capacity: int, function, policy: ResizePolicy = None, rehash_step: int = 0) -> None:
         """
-        Init new HashMap based on DA with SLL for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Init new HashMap based on DA with SLL for collision resolution. If a resize policy is given the table grows
+        and shrinks automatically, otherwise the capacity only changes through resize_table. If rehash_step is set,
+        growing keeps the old table and every later operation moves rehash_step of its buckets to the new one
         """
-        self.buckets = DynamicArray()
-        for _ in range(capacity):
-            self.buckets.append(LinkedList())
+        if policy is not None:
+            capacity = policy.round_capacity(capacity)
+        self.policy = policy
+        self.buckets = _new_table(capacity)
         self.capacity = capacity
-        self.hash_function = function
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
         self.size = 0
+        self._version = 0  # changes whenever keys are added, removed or moved, so iterators can detect it
+
+        # _chain_counts[n] is the number of buckets in the current table whose chain holds n nodes
+        self._chain_counts = [capacity]
+        self._max_chain = 0
+
+        # incremental resize state, _old_buckets is None unless nodes are still being moved out of the old table
+        self.rehash_step = rehash_step
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._rehash_index = 0
+
+        self.instrumentation = None  # set by enable_instrumentation
+        self.wal = None  # a wal.WriteAheadLog that every change is logged to, set by wal.open_map
+        self.expiry = None  # an expiry.Expiry with the deadlines of keys put with a ttl, made by the first one
 
     def __str__(self) -> str:
         """
         Overrides object's string method
         Return content of hash map t in human-readable form
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
+        self._finish_rehash()
         out = ''
         for i in range(self.buckets.length()):
             list = self.buckets.get_at_index(i)
@@ -63,78 +107,403 @@ class HashMap:
         """
         Method clear clears the contents of the hash map. It does not change the underlying hash table capacity
         """
-        self.buckets = DynamicArray()  # create new empty dynamic array
-        # initialize array with empty SLL at each bucket
-        for _ in range(self.capacity):
-            self.buckets.append(LinkedList())
+        self.buckets = _new_table(self.capacity)  # create new dynamic array of empty buckets
         self.size = 0  # reset size
+        self._old_buckets = None
+        self._chain_counts = [self.capacity]
+        self._max_chain = 0
+        self._version += 1
+        if self.wal is not None:
+            self.wal.log_clear()
+        if self.expiry is not None:
+            self.expiry.clear()
 
     def get(self, key: str) -> object:
         """
-        Method get returns the value associated with the given key. If the key does not exist it returns None
+        Method get returns the value associated with the given key. If the key does not exist, or has expired, it
+        returns None
         """
-        # loop through the dynamic array (buckets)
-        for bucket in range(self.capacity):
-            node = self.buckets[bucket].contains(key)  # contains will return an SLL node or none if the key is not in
-            # the SLL
-            if node is not None and node.key == key:
-                return node.value  # key is found and return True
+        if self.expiry is not None and self._expire_key(key):
+            return None
+
+        if self._old_buckets is not None:
+            self._rehash()
+
+        hash = self.hash_function(key)
+        bucket = hash % self.capacity  # only the bucket the key hashes to can hold it
+        node = self._find(self.buckets[bucket], key, hash)  # returns an SLL node or none if the key is not in the SLL
+        if node is None and self._old_buckets is not None:
+            node = self._find(self._old_chain(hash), key, hash)
+        if node is not None:
+            return node.value  # key is found, return the value
         return None  # there was no match, return None
 
-    def put(self, key: str, value: object) -> None:
+    def put(self, key: str, value: object, ttl: float = None) -> None:
         """
         Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
-        value is replaced with the new value
+        value is replaced with the new value.
+        With a ttl the key expires that many seconds later, and a put without one keeps the key until it is removed.
+        The write-ahead log records the ttl along with the put
+        """
+        if self._old_buckets is not None:
+            self._rehash()
+
+        self._put_hashed(key, value, self.hash_function(key))
+        if self.wal is not None:
+            self.wal.log_put(key, value, ttl)
+
+        if ttl is not None:
+            if self.expiry is None:
+                self.expiry = expiry.Expiry()
+            self.expiry.set(key, ttl)
+        elif self.expiry is not None:
+            self.expiry.discard(key)  # a put without a ttl keeps the key until it is removed
+
+    def _put_hashed(self, key: str, value: object, hash: int) -> None:
+        """
+        Method _put_hashed does the work of put once the key is hashed
         """
-        bucket = self.hash_function(key) % self.capacity  # find the bucket for the key/value to be added
-        node = self.buckets[bucket].contains(key)  # find if the SLL already contains the key
+        bucket = hash % self.capacity  # find the bucket for the key/value to be added
+        node = self._find(self.buckets[bucket], key, hash)  # find if the SLL already contains the key
+        if node is None and self._old_buckets is not None:
+            node = self._find(self._old_chain(hash), key, hash)  # not moved out of the old table yet
 
-        # if the SLL does contain the key, contains will return the node. Update the value of that node
-        if node is not None and node.key == key:
+        # if the SLL does contain the key, update the value of that node
+        if node is not None:
             node.value = value
 
         # otherwise the key does not exist, so insert the node to the SLL
         else:
-            self.buckets[bucket].insert(key, value)
+            # grow the table first if the policy says this insert would overload it
+            if self.policy is not None:
+                new_capacity = self.policy.grow_capacity(self.size, self.capacity)
+                if new_capacity is not None:
+                    if self.rehash_step and self._old_buckets is None:
+                        self._start_rehash(new_capacity)
+                    else:
+                        self.resize_table(new_capacity)
+                    bucket = hash % self.capacity  # the key's bucket moved with the resize
+
+            chain = _chain(self.buckets, bucket)
+            length = chain.length()
+            _insert(chain, key, value, hash)
+            self._count_chain(length, length + 1)
             self.size += 1
+            self._version += 1
 
     def remove(self, key: str) -> None:
         """
         Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
         map, nothing is done.
         """
-        # loop through all buckets. Since contains key does not return the node or bucket that the key is in, we still
-        # need to find which key the bucket is in, if it exists
-        for bucket in range(self.capacity):
-            node = self.buckets[bucket].contains(key)
-            if node is not None and node.key == key:
-                self.buckets[bucket].remove(key)  # remove node from SLL
-                self.size -= 1  # update size
+        if self._old_buckets is not None:
+            self._rehash()
+
+        if self.expiry is not None:
+            self.expiry.discard(key)
+        if self._remove_hashed(key, self.hash_function(key)):
+            if self.wal is not None:
+                self.wal.log_remove(key)
+            self._after_remove()
+
+    def _remove_hashed(self, key: str, hash: int) -> bool:
+        """
+        Method _remove_hashed does the work of remove once the key is hashed and returns True if the key was removed
+        """
+        bucket = hash % self.capacity  # only the bucket the key hashes to can hold it
+
+        # SLL remove finds and unlinks the node in a single pass, and reports whether the key was there
+        chain = self.buckets[bucket]
+        removed = chain.remove(key)
+        if removed:
+            self._count_chain(chain.length() + 1, chain.length())
+        elif self._old_buckets is not None:
+            removed = self._old_chain(hash).remove(key)
+
+        if removed:
+            self.size -= 1  # update size
+            self._version += 1
+        return removed
+
+    def _after_remove(self) -> None:
+        """
+        Method _after_remove shrinks the table if removes have left it too empty
+        """
+        # give memory back once the table has drained below the policy's minimum load
+        if self.policy is not None and self._old_buckets is None:
+            new_capacity = self.policy.shrink_capacity(self.size, self.capacity)
+            if new_capacity is not None:
+                self.resize_table(new_capacity)
 
     def contains_key(self, key: str) -> bool:
         """
-        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        Method contains_key returns True if key is in the hash map and has not expired, otherwise it returns False.
         """
-        # loop through the dynamic array (buckets)
-        for bucket in range(self.capacity):
-            node = self.buckets[bucket].contains(key)  # contains will return an SLL node or none if the key is not in
-            # the SLL
-            if node is not None and node.key == key:
-                return True  # key is found and return True
-        return False  # there was no match, return False
+        if self.expiry is not None and self._expire_key(key):
+            return False
+
+        if self._old_buckets is not None:
+            self._rehash()
+
+        hash = self.hash_function(key)
+        bucket = hash % self.capacity  # only the bucket the key hashes to can hold it
+        if self._find(self.buckets[bucket], key, hash) is not None:
+            return True
+        return self._old_buckets is not None and self._find(self._old_chain(hash), key, hash) is not None
+
+    def _expire_key(self, key: str) -> bool:
+        """
+        Method _expire_key removes key if its ttl has run out and returns True if it did
+        """
+        if not self.expiry.expired(key):
+            return False
+        self.remove(key)
+        return True
+
+    def _expire_keys(self, keys) -> None:
+        """
+        Method _expire_keys removes every key in keys whose ttl has run out, which get_many uses to check a batch
+        """
+        expired = [key for key in keys if self.expiry.expired(key)]
+        if expired:
+            self.remove_many(expired)
+
+    def expire(self, limit: int = None) -> int:
+        """
+        Method expire removes at most limit of the keys whose ttl has run out, the longest expired first, and returns
+        how many it removed. Only the due deadlines are looked at, so a small limit keeps each call short; expired
+        keys are also removed whenever get, get_many or contains_key find them, and until then they still count
+        towards size and are returned by the iterators. expiry.Sweeper calls this from a background thread
+        """
+        if self.expiry is None:
+            return 0
+        keys = self.expiry.due(limit)
+        if keys:
+            self.remove_many(keys)
+        return len(keys)
+
+    def ttl(self, key: str) -> float:
+        """
+        Method ttl returns the seconds left before key expires, or None if it was not put with a ttl
+        """
+        return self.expiry.remaining(key) if self.expiry is not None else None
+
+    def reserve(self, count: int) -> None:
+        """
+        Method reserve resizes the table once so that count more keys can be added without the load factor reaching
+        the resize policy's limit. Without a policy the capacity is fixed and nothing is done
+        """
+        if self.policy is None:
+            return
+        self._finish_rehash()
+        # the same threshold grow_capacity applies, which lets the last key bring the load up to max_load
+        needed = int((self.size + count - 1) / self.policy.max_load) + 1
+        if needed > self.capacity:
+            # grow by at least the policy's factor, so a series of batches still resizes a logarithmic number of times
+            self.resize_table(max(needed, int(self.capacity * self.policy.growth_factor)))
+
+    def put_many(self, pairs) -> None:
+        """
+        Method put_many puts every (key, value) pair from pairs. The table is sized for the whole batch up front, so
+        it is resized at most once
+        """
+        if not isinstance(pairs, (list, tuple)):
+            pairs = list(pairs)  # the batch length is needed before anything is added
+        self.reserve(len(pairs))
+        self._finish_rehash()
+
+        hash_function, put_hashed = self.hash_function, self._put_hashed
+        for key, value in pairs:
+            put_hashed(key, value, hash_function(key))
+        if self.wal is not None:
+            self.wal.log_put_many(pairs)
+        if self.expiry is not None:
+            for key, _ in pairs:
+                self.expiry.discard(key)
+
+    def get_many(self, keys) -> list:
+        """
+        Method get_many returns a list with the value for each key, or None for keys that do not exist or have expired
+        """
+        if self.expiry is not None:
+            keys = list(keys)
+            self._expire_keys(keys)
+        self._finish_rehash()
+        hash_function, get_bucket, capacity = self.hash_function, self.buckets.get_at_index, self.capacity
+        find = self._find
+
+        values = []
+        for key in keys:
+            hash = hash_function(key)
+            node = find(get_bucket(hash % capacity), key, hash)
+            values.append(node.value if node is not None else None)
+        return values
+
+    def remove_many(self, keys) -> list:
+        """
+        Method remove_many removes every key and returns a list with True for each key that was in the hash map. The
+        table is shrunk afterwards instead of after every remove
+        """
+        self._finish_rehash()
+        hash_function, remove_hashed = self.hash_function, self._remove_hashed
+        if self.wal is not None or self.expiry is not None:
+            keys = list(keys)  # the keys are needed again to log the ones that were removed and drop their deadlines
+        removed = [remove_hashed(key, hash_function(key)) for key in keys]
+        if self.wal is not None:
+            self.wal.log_remove_many(key for key, was_removed in zip(keys, removed) if was_removed)
+        if self.expiry is not None:
+            for key in keys:
+                self.expiry.discard(key)
+
+        # a big batch may leave the table far emptier than a single shrink step fixes
+        capacity = None
+        while capacity != self.capacity:
+            capacity = self.capacity
+            self._after_remove()
+        return removed
+
+    @classmethod
+    def from_pairs(cls, pairs, function, **kwargs) -> 'HashMap':
+        """
+        Method from_pairs returns a new HashMap holding the (key, value) pairs, with the table sized for all of them
+        before anything is added. Without a resize policy the capacity is the number of pairs. Any other HashMap
+        argument can be passed by keyword
+        """
+        if not isinstance(pairs, (list, tuple)):
+            pairs = list(pairs)
+        # with a policy, put_many sizes the table itself
+        capacity = 1 if kwargs.get('policy') is not None else max(1, len(pairs))
+        hash_map = cls(capacity, function, **kwargs)
+        hash_map.put_many(pairs)
+        return hash_map
+
+    def dump(self, stream, compression: str = None) -> None:
+        """
+        Method dump writes the hash map to the binary stream as a snapshot (see snapshot.py), a chunk at a time. Only
+        live keys are written, with their stored hashes. compression may be None, 'zlib', 'bz2' or 'lzma'
+        """
+        snapshot.dump(stream, self.capacity, self.hash_function, self.size,
+                      ((node.hash, node.key, node.value) for node in self._live_entries()), compression)
+
+    @classmethod
+    def load(cls, stream, function=None, **kwargs) -> 'HashMap':
+        """
+        Method load returns a new HashMap read from a snapshot written by dump, with the capacity it was saved with.
+        The hash function recorded in the snapshot is used unless function is given, and any other HashMap argument
+        can be passed by keyword
+        """
+        capacity, function, size, entries = snapshot.load(stream, function)
+        hash_map = cls(capacity, function, **kwargs)
+        hash_map.reserve(size)
+        hash_map._place_loaded(entries)
+        return hash_map
+
+    def _place_loaded(self, entries) -> None:
+        """
+        Method _place_loaded adds the (hash, key, value) entries read from a snapshot to the empty table
+        """
+        buckets, capacity = self.buckets, self.capacity
+        placed = 0
+
+        # every key is distinct, so each node goes straight into its chain without searching it
+        for hash, key, value in entries:
+            _insert(_chain(buckets, hash % capacity), key, value, hash)
+            placed += 1
+
+        self.size += placed
+        self._recount_chains()
+        self._version += 1
 
     def empty_buckets(self) -> int:
         """
         Method empty_buckets returns the number of empty buckets in the hash table.
         """
-        empty_buckets = 0
+        return self._chain_counts[0]  # buckets whose SLL has length 0
 
-        # loop through array
-        for bucket in range(self.capacity):
-            if self.buckets[bucket].length() == 0:
-                empty_buckets += 1  # if the length of the SLL is 0, the bucket is empty, increase cnt by 1
+    def stats(self) -> dict:
+        """
+        Method stats returns a snapshot of the table's counters. Every counter is kept up to date by the operations
+        that change it, so this never scans the table. During an incremental resize the bucket counts are for the new
+        table only
+        """
+        return {
+            'size': self.size,
+            'capacity': self.capacity,
+            'load': self.size / self.capacity,
+            'occupied_buckets': self.capacity - self._chain_counts[0],
+            'empty_buckets': self._chain_counts[0],
+            'max_chain': self._max_chain,
+            'resizing': self._old_buckets is not None,
+        }
+
+    def enable_instrumentation(self) -> instrumentation.Instrumentation:
+        """
+        Method enable_instrumentation starts recording how many chain nodes each get, put, remove and contains_key
+        visits and returns the Instrumentation holding the histograms. The counting versions of the methods are set on
+        this map only, so a map that never enables instrumentation runs no extra code
+        """
+        if self.instrumentation is None:
+            hooks = {'_find': self._counted_find, '_remove_hashed': self._counted_remove_hashed}
+            instrumentation.attach(self, 'chain nodes visited', hooks)
+        return self.instrumentation
+
+    def disable_instrumentation(self) -> None:
+        """
+        Method disable_instrumentation stops recording and puts the uninstrumented methods back
+        """
+        if self.instrumentation is not None:
+            instrumentation.detach(self)
+
+    def _counted_find(self, chain: LinkedList, key: str, hash: int) -> SLNode:
+        """
+        Method _counted_find is _find, adding the number of nodes visited to the current operation's count
+        """
+        depth = 0
+        for node in chain:
+            depth += 1
+            if node.hash == hash and node.key == key:
+                self._probe_count += depth
+                return node
+        self._probe_count += depth
+        return None
+
+    def _counted_remove_hashed(self, key: str, hash: int) -> bool:
+        """
+        Method _counted_remove_hashed is _remove_hashed, first walking the chains with _counted_find to count the nodes
+        that SLL remove visits, since remove unlinks the node without reporting how far it went
+        """
+        node = self._counted_find(self.buckets[hash % self.capacity], key, hash)
+        if node is None and self._old_buckets is not None:
+            self._counted_find(self._old_chain(hash), key, hash)
+        return HashMap._remove_hashed(self, key, hash)
 
-        return empty_buckets
+    def _count_chain(self, old_length: int, new_length: int) -> None:
+        """
+        Method _count_chain records that a chain in the current table went from old_length to new_length nodes
+        """
+        counts = self._chain_counts
+        counts[old_length] -= 1
+        if new_length == len(counts):
+            counts.append(0)
+        counts[new_length] += 1
+
+        if new_length > self._max_chain:
+            self._max_chain = new_length
+        elif old_length == self._max_chain and counts[old_length] == 0:
+            self._max_chain = new_length  # the only longest chain got shorter
+
+    def _recount_chains(self) -> None:
+        """
+        Method _recount_chains rebuilds the chain counters from the current table, after a resize
+        """
+        self._chain_counts = [0]
+        self._max_chain = 0
+        for bucket in range(self.capacity):
+            length = self.buckets[bucket].length()
+            while length >= len(self._chain_counts):
+                self._chain_counts.append(0)
+            self._chain_counts[length] += 1
+            self._max_chain = max(self._max_chain, length)
 
     def table_load(self) -> float:
         """
@@ -145,35 +514,97 @@ class HashMap:
     def resize_table(self, new_capacity: int) -> None:
         """
         Method resize_table changes the capacity of the internal hash table, while retaining
-        existing key/value pairs. The keys are rehashed so that they are in the proper bucket
-        in the new dynamic array.
+        existing key/value pairs. The nodes are moved to their bucket in the new dynamic array
+        using their cached hash, so no key is hashed again.
         """
         # do not do anything if the new capacity is less than 1
         if new_capacity < 1:
             return
 
-        new_array = DynamicArray()  # create the new array
-        for _ in range(new_capacity):  # initialize an empty linked list at each element of the new array
-            new_array.append(LinkedList())
+        # keep the capacity in the form the policy expects (prime or power of two)
+        if self.policy is not None:
+            new_capacity = self.policy.round_capacity(new_capacity)
 
-        # iterate through the existing hash map
-        for bucket in range(self.capacity):
-            linked_list = self.buckets[bucket]
+        new_array = _new_table(new_capacity)  # create the new array
+
+        # iterate through the existing hash map, and the old table's unmoved buckets if an incremental resize is going
+        chains = [self.buckets[bucket] for bucket in range(self.capacity)]
+        if self._old_buckets is not None:
+            chains += [self._old_buckets[bucket] for bucket in range(self._rehash_index, self._old_capacity)]
 
+        for linked_list in chains:
             # iterate through the linked list at each bucket of the array
             for node in linked_list:
                 if node is not None:
-                    key = node.key
-                    new_bucket = self.hash_function(key) % new_capacity  # rehash the key to the new capacity
-                    new_array[new_bucket].insert(key, node.value)  # add the key/value pair to the new array
+                    new_bucket = node.hash % new_capacity  # the cached hash gives the bucket at the new capacity
+                    # add the pair to the new array
+                    _insert(_chain(new_array, new_bucket), node.key, node.value, node.hash)
 
         self.buckets = new_array  # copy data from the new array
         self.capacity = new_capacity
+        self._old_buckets = None
+        self._recount_chains()
+        self._version += 1
+
+    def _start_rehash(self, new_capacity: int) -> None:
+        """
+        Method _start_rehash swaps in an empty table of the new capacity and keeps the current one as the old table,
+        whose nodes are moved over a few buckets at a time by _rehash
+        """
+        if self.policy is not None:
+            new_capacity = self.policy.round_capacity(new_capacity)
+        self._old_buckets = self.buckets
+        self._old_capacity = self.capacity
+        self._rehash_index = 0
+
+        self.buckets = _new_table(new_capacity)
+        self.capacity = new_capacity
+        self._chain_counts = [new_capacity]
+        self._max_chain = 0
+        self._version += 1
+
+    def _old_chain(self, hash: int) -> LinkedList:
+        """
+        Method _old_chain returns the old table's chain for hash during an incremental resize, or an empty chain if that
+        bucket has already been moved
+        """
+        bucket = hash % self._old_capacity
+        if bucket < self._rehash_index:
+            return _EMPTY_CHAIN
+        return self._old_buckets[bucket]
+
+    def _rehash(self, count: int = 0) -> None:
+        """
+        Method _rehash moves the nodes of the next count buckets of the old table (rehash_step buckets by default)
+        into the current table, and drops the old table once every bucket has been moved
+        """
+        end = min(self._old_capacity, self._rehash_index + (count or self.rehash_step))
+
+        for bucket in range(self._rehash_index, end):
+            for node in self._old_buckets[bucket]:
+                chain = _chain(self.buckets, node.hash % self.capacity)
+                length = chain.length()
+                _insert(chain, node.key, node.value, node.hash)
+                self._count_chain(length, length + 1)
+            self._old_buckets[bucket] = None  # release the chain, lookups skip buckets before _rehash_index
+
+        self._rehash_index = end
+        self._version += 1
+        if end == self._old_capacity:
+            self._old_buckets = None  # every node has been moved
+
+    def _finish_rehash(self) -> None:
+        """
+        Method _finish_rehash moves every node left in the old table of an incremental resize
+        """
+        if self._old_buckets is not None:
+            self._rehash(self._old_capacity)
 
     def get_keys(self) -> DynamicArray:
         """
         Method get_keys returns a DynamicArray that contains all keys stored in the hash map
         """
+        self._finish_rehash()
         key_array = DynamicArray()  # initialize key array
 
         # iterate through each bucket in hash map array
@@ -187,6 +618,74 @@ class HashMap:
 
         return key_array
 
+    def _live_entries(self):
+        """
+        Method _live_entries yields every SLL node without copying anything. It raises RuntimeError if the hash map is
+        changed by anything other than a value update while it is being iterated
+        """
+        self._finish_rehash()
+        buckets, capacity, version = self.buckets, self.capacity, self._version
+
+        for bucket in range(capacity):
+            for node in buckets[bucket]:
+                yield node
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+
+    def keys(self):
+        """
+        Method keys returns a generator over the keys in the hash map
+        """
+        return (entry.key for entry in self._live_entries())
+
+    def values(self):
+        """
+        Method values returns a generator over the values in the hash map
+        """
+        return (entry.value for entry in self._live_entries())
+
+    def items(self):
+        """
+        Method items returns a generator over the (key, value) pairs in the hash map
+        """
+        return ((entry.key, entry.value) for entry in self._live_entries())
+
+    def __iter__(self):
+        """
+        Iterates over the keys in the hash map
+        """
+        return self.keys()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of keys in the hash map
+        """
+        return self.size
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Returns True if key is in the hash map
+        """
+        return self.contains_key(key)
+
+    def __getitem__(self, key: str) -> object:
+        """
+        Returns the value for key, raising KeyError if the key does not exist or has expired
+        """
+        if self.expiry is not None and self._expire_key(key):
+            raise KeyError(key)
+
+        if self._old_buckets is not None:
+            self._rehash()
+
+        hash = self.hash_function(key)
+        node = self._find(self.buckets[hash % self.capacity], key, hash)
+        if node is None and self._old_buckets is not None:
+            node = self._find(self._old_chain(hash), key, hash)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
 
 # BASIC TESTING
 if __name__ == "__main__":
@@ -386,3 +885,45 @@ if __name__ == "__main__":
     m.remove('100')
     m.resize_table(2)
     print(m.get_keys())
+
+    print("\nviews, and replacing values while iterating")
+    print("-------------------------------------------")
+    m = HashMap(4, 'fnv1a')
+    m.put('a', 1)
+    m.put('b', 2)
+    for key in m:
+        m.put(key, m[key] * 10)  # replacing a value never resizes, so the iteration carries on
+    print(sorted(m.items()), sorted(m.values()), m.capacity, len(m), 'a' in m, 'c' in m)
+    try:
+        for key in m:
+            m.put(key + key, 0)
+    except RuntimeError as error:
+        print(type(error).__name__, error)
+
+    print("\nbatch operations")
+    print("----------------")
+    m = HashMap.from_pairs((('key' + str(i), i) for i in range(100)), 'fnv1a')
+    m.put_many([('key1', 'one'), ('key100', 100)])
+    print(m.size, m.get_many(['key1', 'key99', 'key100', 'key101']))
+    removed = m.remove_many(['key' + str(i) for i in range(0, 110, 2)])
+    print(removed.count(True), removed.count(False), m.size, m.contains_key('key2'), m.get('key3'))
+
+    print("\nstats")
+    print("-----")
+    m = HashMap(16, 'fnv1a')
+    for i in range(40):
+        m.put('key' + str(i), i)
+    for i in range(0, 40, 3):
+        m.remove('key' + str(i))
+    stats = m.stats()
+    print(stats)
+    print(stats['size'] == m.size, stats['empty_buckets'] == m.empty_buckets())
+
+    print("\nkeys with a ttl")
+    print("---------------")
+    m = HashMap(16, 'fnv1a')
+    for i in range(10):
+        m.put('key' + str(i), i, ttl=-1 if i % 2 else 60)  # a negative ttl has already run out
+    m.put('key9', 9)  # a put without a ttl keeps the key
+    print(m.size, m.get('key1'), m.contains_key('key3'), m.get_many(['key4', 'key5', 'key9']), m.size)
+    print(m.expire(limit=1), m.expire(), m.size, m.ttl('key9'), 59 < m.ttl('key0') <= 60)
@@ -0,0 +1,278 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Hash map whose keys are partitioned over worker processes. Each worker holds an ordinary HashMap, and
+# the front end routes every key to its shard by hash. Batch operations send one message per shard and let the
+# workers run at the same time, so throughput can scale with the number of cores
+
+
+import importlib
+import multiprocessing
+
+from a6_include import *
+from hash_functions import resolve_hash_function
+
+
+MASK_64 = (1 << 64) - 1
+FIBONACCI = 0x9E3779B97F4A7C15  # odd 64 bit multiplier (2 ** 64 / golden ratio) that spreads low bits upwards
+
+
+def _serve(connection, backend: str, capacity: int, function, kwargs: dict) -> None:
+    """
+    Function _serve runs in a worker process. It builds the shard's HashMap and answers (name, args) requests until
+    it is sent None. A request calls the HashMap method called name, or reads the attribute if it is not a method,
+    and the reply is (True, result) or (False, exception)
+    """
+    shard = importlib.import_module(backend).HashMap(capacity, function, **kwargs)
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        name, args = request
+        try:
+            result = getattr(shard, name)
+            if callable(result):
+                result = result(*args)
+            if isinstance(result, DynamicArray):
+                result = [result[i] for i in range(result.length())]  # send a plain list back
+        except Exception as error:
+            connection.send((False, error))
+            continue
+        connection.send((True, result))
+    connection.close()
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, shards: int = 4, backend: str = 'hash_map_oa', **kwargs) -> None:
+        """
+        Init new HashMap split over shards worker processes, each holding a backend.HashMap with an equal share of
+        the capacity. Any other keyword argument is passed on to the shards. The hash function is sent to the
+        workers, so pass the name of a registered one, or a function defined at the top level of a module. Call
+        close, or use the map in a with statement, to stop the workers
+        """
+        self.hash_function = resolve_hash_function(function)
+        self.shards = shards
+        self._connections = []
+        self._processes = []
+
+        for _ in range(shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, daemon=True,
+                                              args=(worker_connection, backend, max(1, -(-capacity // shards)),
+                                                    function, kwargs))
+            process.start()
+            worker_connection.close()  # the worker holds its own copy
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def close(self) -> None:
+        """
+        Method close stops the worker processes. The hash map cannot be used afterwards
+        """
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _shard(self, key: str) -> int:
+        """
+        Method _shard returns the index of the shard that holds key. The hash is multiplied out to 64 bits and its top
+        bits pick the shard, so the shard does not depend on the bits a shard uses to pick a bucket
+        """
+        return ((self.hash_function(key) * FIBONACCI) & MASK_64) * self.shards >> 64
+
+    def _call(self, shard: int, name: str, *args) -> object:
+        """
+        Method _call runs one request on one shard and returns its result
+        """
+        connection = self._connections[shard]
+        connection.send((name, args))
+        ok, result = connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call_all(self, name: str, batches: list) -> list:
+        """
+        Method _call_all sends request name to every shard with its batch as the argument (None sends no argument,
+        an empty batch skips the shard), then collects the replies, so every shard works at the same time. It returns
+        the results in shard order, None for skipped shards
+        """
+        sent = []
+        for shard, batch in enumerate(batches):
+            if batch is None:
+                self._connections[shard].send((name, ()))
+            elif batch:
+                self._connections[shard].send((name, (batch,)))
+            else:
+                continue
+            sent.append(shard)
+
+        results = [None] * self.shards
+        error = None
+        for shard in sent:  # read every reply, even after an error, so the pipes stay in step
+            ok, result = self._connections[shard].recv()
+            if ok:
+                results[shard] = result
+            elif error is None:
+                error = result
+        if error is not None:
+            raise error
+        return results
+
+    def _route(self, keys) -> tuple:
+        """
+        Method _route splits keys into a batch per shard and returns (batches, positions), where positions[shard]
+        holds the index in keys of each key in batches[shard]
+        """
+        batches = [[] for _ in range(self.shards)]
+        positions = [[] for _ in range(self.shards)]
+        for index, key in enumerate(keys):
+            shard = self._shard(key)
+            batches[shard].append(key)
+            positions[shard].append(index)
+        return batches, positions
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        return self._call(self._shard(key), 'get', key)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value
+        """
+        self._call(self._shard(key), 'put', key, value)
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        self._call(self._shard(key), 'remove', key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        return self._call(self._shard(key), 'contains_key', key)
+
+    def put_many(self, pairs) -> None:
+        """
+        Method put_many puts every (key, value) pair from pairs, with one message to each shard
+        """
+        batches = [[] for _ in range(self.shards)]
+        for pair in pairs:
+            batches[self._shard(pair[0])].append(pair)
+        self._call_all('put_many', batches)
+
+    def get_many(self, keys) -> list:
+        """
+        Method get_many returns a list with the value for each key, or None for keys that do not exist
+        """
+        keys = list(keys)
+        batches, positions = self._route(keys)
+        values = [None] * len(keys)
+        for shard, results in enumerate(self._call_all('get_many', batches)):
+            if results is not None:
+                for index, value in zip(positions[shard], results):
+                    values[index] = value
+        return values
+
+    def remove_many(self, keys) -> list:
+        """
+        Method remove_many removes every key and returns a list with True for each key that was in the hash map
+        """
+        keys = list(keys)
+        batches, positions = self._route(keys)
+        removed = [False] * len(keys)
+        for shard, results in enumerate(self._call_all('remove_many', batches)):
+            if results is not None:
+                for index, value in zip(positions[shard], results):
+                    removed[index] = value
+        return removed
+
+    @property
+    def size(self) -> int:
+        """
+        Number of keys in the hash map
+        """
+        return sum(self._call_all('size', [None] * self.shards))
+
+    @property
+    def capacity(self) -> int:
+        """
+        Total capacity of the shards
+        """
+        return sum(self._call_all('capacity', [None] * self.shards))
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of every shard. It does not change the capacity
+        """
+        self._call_all('clear', [None] * self.shards)
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets over all shards
+        """
+        return sum(self._call_all('empty_buckets', [None] * self.shards))
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor over all shards
+        """
+        return self.size / self.capacity
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table gives every shard an equal share of new_capacity. The shards resize at the same time
+        """
+        if new_capacity < 1:
+            return
+        share = max(1, -(-new_capacity // self.shards))
+        self._call_all('resize_table', [share] * self.shards)
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()
+        for keys in self._call_all('get_keys', [None] * self.shards):
+            for key in keys:
+                key_array.append(key)
+        return key_array
+
+    def __len__(self) -> int:
+        """
+        Return the number of keys in the hash map
+        """
+        return self.size
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nsharded map with 4 workers")
+    print("--------------------------")
+    with HashMap(100, 'fnv1a', shards=4) as m:
+        m.put_many(('key' + str(i), i) for i in range(1000))
+        m.put('key5', 'five')
+        print(m.size, m.get('key5'), m.get('key999'), m.get('missing'), m.contains_key('key10'))
+        print(m.remove_many(['key1', 'key2', 'missing']), m.size)
+        print(m.get_many(['key0', 'key1', 'key3']))
+        m.resize_table(4000)
+        print(m.capacity, m.get_keys().length(), round(m.table_load(), 2))
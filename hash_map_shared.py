@@ -0,0 +1,526 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Open addressing hash map laid out entirely in one flat block of memory, a multiprocessing.shared_memory
+# block by default. A header is followed by fixed width slot records and an arena holding the key and value bytes,
+# so one process can build the table and any number of other processes can attach to it by name and look keys up
+# in place, without copying or unpickling anything
+
+
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+from a6_include import *
+from hash_functions import function_name, resolve_hash_function
+from resize_policy import ResizePolicy, OPEN_ADDRESSING_DEFAULT
+
+
+MAGIC = b'HMSLOTS1'
+FORMAT_VERSION = 1
+
+# magic, format version, flags, capacity, size, tombstones, arena size, arena used, hash function name
+HEADER = struct.Struct('<8sIIQQQQQ32s')
+HEADER_SIZE = 128  # room for the header to grow without moving the slots
+
+# hash, offset of the key in the block (0 for a slot that was never used), key length, value length
+SLOT = struct.Struct('<QQII')
+TOMBSTONE = 0xFFFFFFFF  # value length of a removed entry, its key stays so lookups for it can stop there
+
+MASK_64 = (1 << 64) - 1  # hashes are stored as unsigned 64 bit values
+
+_created = set()  # names of the blocks this process created, which its resource tracker has to keep tracking
+
+# value type tags, the first byte of every value in the arena
+NONE, FALSE, TRUE, INT, FLOAT, STR, BYTES = range(7)
+FLOAT_FORMAT = struct.Struct('<d')
+
+
+def encode_value(value: object) -> bytes:
+    """
+    Function encode_value returns the arena encoding of value, a type tag followed by the value's bytes
+    """
+    if value is None:
+        return bytes((NONE,))
+    if value is True or value is False:
+        return bytes((TRUE if value else FALSE,))
+    if isinstance(value, int):
+        return bytes((INT,)) + value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+    if isinstance(value, float):
+        return bytes((FLOAT,)) + FLOAT_FORMAT.pack(value)
+    if isinstance(value, str):
+        return bytes((STR,)) + value.encode()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes((BYTES,)) + bytes(value)
+    raise TypeError(f"values must be None, bool, int, float, str or bytes, not {type(value).__name__}")
+
+
+def decode_value(buffer: memoryview, offset: int, length: int) -> object:
+    """
+    Function decode_value returns the value encoded in the length bytes of the buffer starting at offset
+    """
+    tag = buffer[offset]
+    if tag == NONE:
+        return None
+    if tag == FALSE or tag == TRUE:
+        return tag == TRUE
+    payload = buffer[offset + 1:offset + length]
+    if tag == INT:
+        return int.from_bytes(payload, 'little', signed=True)
+    if tag == FLOAT:
+        return FLOAT_FORMAT.unpack(payload)[0]
+    if tag == STR:
+        return str(payload, 'utf-8')
+    return bytes(payload)
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, arena_size: int = 1 << 16,
+                 policy: ResizePolicy = OPEN_ADDRESSING_DEFAULT, tombstone_limit: float = 0.25) -> None:
+        """
+        Create a new HashMap in a new shared memory block with capacity slots and arena_size bytes for keys and
+        values, both growing as needed. Values must be None, bool, int, float, str or bytes. Other processes attach
+        with HashMap.attach(name). A registered hash function is recorded by name so they pick the same one; note
+        that 'builtin' only agrees between processes forked from one another or started with the same PYTHONHASHSEED.
+        Attached processes read the slots while the creator writes them, so the table is meant to be built first and
+        then read, not changed under readers. Tombstones are compacted away once they take up tombstone_limit of
+        the slots, the same as in hash_map_oa.HashMap
+        """
+        self.policy = policy
+        self.tombstone_limit = tombstone_limit
+        self.hash_function = resolve_hash_function(function)  # a function, or the name of a registered one
+        self._function_name = function_name(self.hash_function)
+        self._owner = True
+        self._handle = None
+        self._create(policy.round_capacity(capacity), arena_size)
+
+    @classmethod
+    def attach(cls, name: str, function=None) -> 'HashMap':
+        """
+        Method attach opens the table another process created under name for lookups. function is only needed if the
+        table was built with a hash function that is not registered in hash_functions
+        """
+        hash_map = cls.__new__(cls)
+        try:
+            handle = shared_memory.SharedMemory(name=name, track=False)  # only the creator may unlink the block
+        except TypeError:
+            # before Python 3.13 every user is tracked, and the tracker would unlink the block when this process exits
+            handle = shared_memory.SharedMemory(name=name)
+            if handle._name not in _created:
+                resource_tracker.unregister(handle._name, 'shared_memory')
+        hash_map._attach(handle, function)
+        return hash_map
+
+    def _attach(self, handle, function) -> None:
+        """
+        Method _attach sets the map up to read an existing table in the block behind handle
+        """
+        self._handle = handle
+        self._buffer = handle.buf
+        self._owner = False
+        self.policy = OPEN_ADDRESSING_DEFAULT
+        self.tombstone_limit = 0.25
+        self._read_header()
+        if function is None:
+            if not self._function_name:
+                raise ValueError("the table was built with an unregistered hash function, pass it as function")
+            function = self._function_name
+        self.hash_function = resolve_hash_function(function)
+
+    def _create(self, capacity: int, arena_size: int) -> None:
+        """
+        Method _create switches the map to a new empty block with capacity slots and arena_size arena bytes
+        """
+        self._handle = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * SLOT.size + arena_size)
+        _created.add(self._handle._name)
+        self._buffer = self._handle.buf
+        self._format(capacity, arena_size)
+
+    def _format(self, capacity: int, arena_size: int) -> None:
+        """
+        Method _format clears the slots of a new block and writes its header
+        """
+        self.capacity = capacity
+        self._arena_start = HEADER_SIZE + capacity * SLOT.size
+        self._arena_size = arena_size
+        self._arena_used = self._arena_start
+        self._size = 0
+        self.tombstones = 0
+        self._buffer[HEADER_SIZE:self._arena_start] = bytes(capacity * SLOT.size)
+        self._write_header()
+
+    def _release(self, handle) -> None:
+        """
+        Method _release gives back a block the map no longer uses. A block that is already gone is left alone
+        """
+        handle.close()
+        if self._owner:
+            _created.discard(handle._name)
+            try:
+                handle.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _write_header(self, flags: int = 0) -> None:
+        """
+        Method _write_header stores the table's counters and flags in the block so attached processes see them
+        """
+        HEADER.pack_into(self._buffer, 0, MAGIC, FORMAT_VERSION, flags, self.capacity, self._size, self.tombstones,
+                         self._arena_size, self._arena_used, self._function_name.encode())
+
+    def _read_header(self) -> None:
+        """
+        Method _read_header loads the table's counters from the block
+        """
+        magic, version, _, capacity, size, tombstones, arena_size, arena_used, name = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a hash table block, or one written by an incompatible version")
+        self.capacity = capacity
+        self._size = size
+        self.tombstones = tombstones
+        self._arena_start = HEADER_SIZE + capacity * SLOT.size
+        self._arena_size = arena_size
+        self._arena_used = arena_used
+        self._function_name = name.rstrip(b'\0').decode()
+
+    @property
+    def name(self) -> str:
+        """
+        Name other processes attach to. It changes when the table grows, since a grown table is a new block
+        """
+        return self._handle.name
+
+    @property
+    def size(self) -> int:
+        """
+        Number of keys in the table, read from the block so an attached process sees the builder's count
+        """
+        if not self._owner:
+            self._size = HEADER.unpack_from(self._buffer)[4]
+        return self._size
+
+    def close(self) -> None:
+        """
+        Method close detaches from the block. The process that created the table also frees it
+        """
+        if self._handle is not None:
+            self._buffer.release()
+            self._release(self._handle)
+            self._handle = None
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        """
+        Overrides object's string method
+        Return content of hash map in human-readable form, in the same format as hash_map_oa.HashMap
+        """
+        out = ''
+        for i in range(self.capacity):
+            _, offset, key_length, value_length = SLOT.unpack_from(self._buffer, HEADER_SIZE + i * SLOT.size)
+            if offset == 0:
+                out += str(i) + ': None\n'
+                continue
+            key = str(self._buffer[offset:offset + key_length], 'utf-8')
+            if value_length == TOMBSTONE:
+                out += f"{i}: K: {key} V: None TS: True\n"
+            else:
+                value = decode_value(self._buffer, offset + key_length, value_length)
+                out += f"{i}: K: {key} V: {value} TS: False\n"
+        return out
+
+    def clear(self) -> None:
+        """
+        Method clear clears the contents of the hash map. It does not change the table capacity or arena size.
+        """
+        self._check_owner()
+        self._format(self.capacity, self._arena_size)
+
+    def _check_owner(self) -> None:
+        """
+        Method _check_owner raises PermissionError unless this process created the table
+        """
+        if not self._owner:
+            raise PermissionError("an attached HashMap is read only, only the process that created it can change it")
+
+    def _probe(self, key: bytes, hash: int) -> tuple:
+        """
+        Method _probe walks the probe sequence for the encoded key once and returns (found, free), the same as
+        hash_map_oa.HashMap._probe. Keys are compared against the block in place
+        """
+        buffer, capacity = self._buffer, self.capacity
+        unpack = SLOT.unpack_from
+        key_length = len(key)
+        bucket = hash % capacity
+        first_tombstone = -1
+        step = 0
+
+        while step < capacity:
+            slot_hash, offset, slot_key_length, value_length = unpack(buffer, HEADER_SIZE + bucket * SLOT.size)
+            if offset == 0:
+                return -1, bucket if first_tombstone < 0 else first_tombstone
+
+            # only compare the keys once the stored hashes and lengths match
+            same_key = (slot_hash == hash and slot_key_length == key_length
+                        and buffer[offset:offset + key_length] == key)
+            if value_length == TOMBSTONE:
+                if first_tombstone < 0:
+                    first_tombstone = bucket
+                # a put reuses the first tombstone it passes, so a live copy of the key is never past its own tombstone
+                if same_key:
+                    return -1, first_tombstone
+            elif same_key:
+                return bucket, first_tombstone
+
+            step += 1
+            bucket = (bucket + step) % capacity
+
+        return -1, first_tombstone
+
+    def get(self, key: str) -> object:
+        """
+        Method get returns the value associated with the given key. If the key does not exist it returns None
+        """
+        found, _ = self._probe(key.encode(), self.hash_function(key) & MASK_64)
+        if found < 0:
+            return None  # the key was not found, so return None
+        _, offset, key_length, value_length = SLOT.unpack_from(self._buffer, HEADER_SIZE + found * SLOT.size)
+        return decode_value(self._buffer, offset + key_length, value_length)
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Method put updates the key/value pair in the hash map. If the given key already exists in the hash map, the
+        value is replaced with the new value. The table is moved to a bigger block first if the resize policy says
+        the load factor is too high for a new key, or the arena has no room for the pair
+        """
+        self._check_owner()
+        hash = self.hash_function(key) & MASK_64
+        key_bytes, value_bytes = key.encode(), encode_value(value)
+        record = key_bytes + value_bytes
+
+        found, free = self._probe(key_bytes, hash)
+        buffer = self._buffer
+
+        # if the key already exists, replace the value in place if the new one is no longer
+        if found >= 0:
+            slot = HEADER_SIZE + found * SLOT.size
+            _, offset, key_length, value_length = SLOT.unpack_from(buffer, slot)
+            if len(value_bytes) <= value_length:
+                buffer[offset + key_length:offset + key_length + len(value_bytes)] = value_bytes
+                SLOT.pack_into(buffer, slot, hash, offset, key_length, len(value_bytes))
+                return
+
+        # only a new key counts toward the load factor, so replacing a value keeps the block attached readers have
+        # open unless the arena is out of room
+        new_capacity = None if found >= 0 else self.policy.grow_capacity(self._size, self.capacity)
+        if new_capacity is not None or self._arena_used + len(record) > self._arena_start + self._arena_size:
+            self._rebuild(new_capacity or self.capacity, len(record))
+            found, free = self._probe(key_bytes, hash)
+            buffer = self._buffer
+
+        if found >= 0:
+            free = found
+        elif free < 0:
+            # the probe sequence has no free slot left, grow the table and try again
+            self._rebuild(self.capacity * 2, len(record))
+            self.put(key, value)
+            return
+        else:
+            if SLOT.unpack_from(buffer, HEADER_SIZE + free * SLOT.size)[3] == TOMBSTONE:
+                self.tombstones -= 1
+            self._size += 1
+
+        # the pair is appended to the arena, space a replaced pair used is reclaimed when the table is rebuilt
+        offset = self._arena_used
+        buffer[offset:offset + len(record)] = record
+        self._arena_used += len(record)
+        SLOT.pack_into(buffer, HEADER_SIZE + free * SLOT.size, hash, offset, len(key_bytes), len(value_bytes))
+        self._write_header()
+
+    def remove(self, key: str) -> None:
+        """
+        Method remove removes the given key and it's associated value from the hash map. If the key is not in the hash
+        map, nothing is done.
+        """
+        self._check_owner()
+        found, _ = self._probe(key.encode(), self.hash_function(key) & MASK_64)
+        if found < 0:
+            return
+
+        slot = HEADER_SIZE + found * SLOT.size
+        hash, offset, key_length, _ = SLOT.unpack_from(self._buffer, slot)
+        SLOT.pack_into(self._buffer, slot, hash, offset, key_length, TOMBSTONE)
+        self._size -= 1
+        self.tombstones += 1
+        self._write_header()
+
+        # give memory back once the table has drained below the policy's minimum load
+        new_capacity = self.policy.shrink_capacity(self._size, self.capacity)
+        if new_capacity is not None:
+            self._rebuild(new_capacity)
+
+        # otherwise reclaim the tombstones, and the arena space behind them, before they make probing too long
+        elif self.tombstones >= self.capacity * self.tombstone_limit:
+            self._rebuild(self.capacity)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Method contains_key returns True if key is in the hash map, otherwise it returns False.
+        """
+        found, _ = self._probe(key.encode(), self.hash_function(key) & MASK_64)
+        return found >= 0
+
+    def empty_buckets(self) -> int:
+        """
+        Method empty_buckets returns the number of empty buckets in the hash table, counting tombstones as empty
+        """
+        return self.capacity - self.size
+
+    def table_load(self) -> float:
+        """
+        Method table_load returns the current hash table load factor
+        """
+        return self.size / self.capacity
+
+    def _live_records(self):
+        """
+        Method _live_records yields (hash, key bytes, value bytes) for every live entry, copied out of the block
+        """
+        buffer = self._buffer
+        for bucket in range(self.capacity):
+            hash, offset, key_length, value_length = SLOT.unpack_from(buffer, HEADER_SIZE + bucket * SLOT.size)
+            if offset != 0 and value_length != TOMBSTONE:
+                value_start = offset + key_length
+                yield hash, bytes(buffer[offset:value_start]), bytes(buffer[value_start:value_start + value_length])
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Method resize_table changes the capacity of the hash table, while retaining existing key/value pairs. The
+        pairs are copied to a new block using their stored hash, so no key is hashed again, and the arena is
+        compacted on the way. Attached processes keep reading the old block until they attach to the new name
+        """
+        self._check_owner()
+        new_capacity = self.policy.round_capacity(new_capacity)
+        if new_capacity < 1 or new_capacity < self._size:
+            return
+        self._rebuild(new_capacity)
+
+    def _rebuild(self, capacity: int, extra: int = 0) -> None:
+        """
+        Method _rebuild moves every live pair to a new block with the given capacity and an arena with room for the
+        pairs, extra more bytes and as much again to grow into
+        """
+        records = list(self._live_records())
+        used = sum(len(key) + len(value) for _, key, value in records)
+        arena_size = max(self._arena_size, 2 * (used + extra))
+
+        old_handle, old_buffer = self._handle, self._buffer
+        while True:
+            self._create(capacity, arena_size)
+            if self._place_all(records):
+                break
+            # a probe sequence had no free slot at this capacity, start over with a bigger table
+            self._buffer.release()
+            self._release(self._handle)
+            capacity *= 2
+
+        old_buffer.release()
+        self._release(old_handle)
+
+    def _place_all(self, records: list) -> bool:
+        """
+        Method _place_all writes the records into the freshly formatted block and returns False if one did not fit
+        """
+        buffer, capacity = self._buffer, self.capacity
+        offset = self._arena_used
+
+        for hash, key, value in records:
+            # every key is distinct, so just take the first empty slot on the key's probe sequence
+            bucket = hash % capacity
+            step = 0
+            while SLOT.unpack_from(buffer, HEADER_SIZE + bucket * SLOT.size)[1] != 0:
+                step += 1
+                if step >= capacity:
+                    return False
+                bucket = (bucket + step) % capacity
+
+            buffer[offset:offset + len(key)] = key
+            buffer[offset + len(key):offset + len(key) + len(value)] = value
+            SLOT.pack_into(buffer, HEADER_SIZE + bucket * SLOT.size, hash, offset, len(key), len(value))
+            offset += len(key) + len(value)
+
+        self._arena_used = offset
+        self._size = len(records)
+        self._write_header()
+        return True
+
+    def get_keys(self) -> DynamicArray:
+        """
+        Method get_keys returns a DynamicArray that contains all keys stored in the hash map
+        """
+        key_array = DynamicArray()  # initiate new array to store keys
+
+        for _, key, _ in self._live_records():
+            key_array.append(key.decode())  # add to the array
+
+        return key_array
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+def _read_in_child(name: str, keys: list, results) -> None:
+    """
+    Function _read_in_child attaches to the table from another process and sends back the values it finds
+    """
+    with HashMap.attach(name) as m:
+        results.put([m.get(key) for key in keys] + [m.size, m.contains_key('missing')])
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    print("\nbuild in one process, read from another")
+    print("---------------------------------------")
+    with HashMap(8, 'fnv1a', arena_size=64) as m:
+        for i in range(100):
+            m.put('key' + str(i), i * 100)
+        m.put('key1', 'one hundred')
+        m.put('key2', 2.5)
+        m.put('key3', None)
+        m.remove('key4')
+        print(m.size, m.capacity, m.get('key1'), m.get('key2'), m.get('key3'), m.get('key4'), m.get('key99'))
+
+        results = multiprocessing.Queue()
+        child = multiprocessing.Process(target=_read_in_child,
+                                        args=(m.name, ['key0', 'key1', 'key2', 'key4', 'key99'], results))
+        child.start()
+        print(results.get())
+        child.join()
+
+        # a spawned reader has its own resource tracker, which must not unlink the block when the reader exits
+        spawn = multiprocessing.get_context('spawn')
+        results = spawn.Queue()
+        for _ in range(2):
+            child = spawn.Process(target=_read_in_child, args=(m.name, ['key99'], results))
+            child.start()
+            print(results.get())
+            child.join()
+        with HashMap.attach(m.name) as reader:
+            print(reader.get('key99'))
+
+    print("\nreplacing a value at the load threshold keeps the block readers attached to")
+    print("---------------------------------------------------------------------------")
+    with HashMap(8, 'fnv1a', arena_size=4096) as m:
+        for i in range(4):
+            m.put('key' + str(i), i)
+        name, capacity = m.name, m.capacity
+        with HashMap.attach(name) as reader:
+            m.put('key0', 'zero')
+            m.put('key1', -1)
+            assert (m.name, m.capacity) == (name, capacity), (m.name, m.capacity)
+            print(m.size, m.capacity, reader.get('key0'), reader.get('key1'))
+        m.put('key4', 4)
+        print(m.name != name, m.capacity)
@@ -0,0 +1,179 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Optional probe length and chain depth instrumentation for the hash maps. Nothing here is used unless a
+# map's enable_instrumentation is called, so an uninstrumented map runs exactly the same code as before
+
+
+import json
+
+
+OPERATIONS = ('get', 'put', 'remove', 'contains_key')
+
+
+class Histogram:
+    def __init__(self) -> None:
+        """
+        Init new empty Histogram of non-negative integer samples
+        """
+        self.counts = {}  # sample value -> number of times it was recorded
+        self.count = 0
+        self.total = 0
+
+    def record(self, value: int) -> None:
+        """
+        Method record adds one sample to the histogram
+        """
+        self.counts[value] = self.counts.get(value, 0) + 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction: float) -> int:
+        """
+        Method percentile returns the smallest sample that at least the given fraction of all samples are less than
+        or equal to, or 0 if nothing has been recorded
+        """
+        if self.count == 0:
+            return 0
+        wanted = max(1, fraction * self.count)
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= wanted:
+                return value
+        return max(self.counts)
+
+    def mean(self) -> float:
+        """
+        Method mean returns the average sample, or 0.0 if nothing has been recorded
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        """
+        Method to_dict returns the summary statistics and the full histogram in a JSON friendly dictionary
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'p999': self.percentile(0.999),
+            'max': max(self.counts) if self.counts else 0,
+            'histogram': {str(value): self.counts[value] for value in sorted(self.counts)},
+        }
+
+
+class Instrumentation:
+    def __init__(self, unit: str) -> None:
+        """
+        Init new Instrumentation with one histogram per map operation. unit names what is counted, buckets probed
+        for open addressing or chain nodes visited for separate chaining
+        """
+        self.unit = unit
+        self.histograms = {operation: Histogram() for operation in OPERATIONS}
+
+    def wrap(self, hash_map, operation: str, method):
+        """
+        Method wrap returns a replacement for the unbound method that runs the operation and records how many probes
+        it took. The map's probe counter only ever goes up, so an instrumented operation called from another one, such
+        as the remove a get of an expired key does, is recorded on its own and still counts towards the outer one
+        """
+        histogram = self.histograms[operation]
+
+        def instrumented(*args, **kwargs):
+            start = hash_map._probe_count
+            result = method(hash_map, *args, **kwargs)
+            histogram.record(hash_map._probe_count - start)
+            return result
+
+        return instrumented
+
+    def reset(self) -> None:
+        """
+        Method reset empties every histogram
+        """
+        self.histograms = {operation: Histogram() for operation in OPERATIONS}
+
+    def to_dict(self) -> dict:
+        """
+        Method to_dict returns the histograms of every operation in a JSON friendly dictionary
+        """
+        return {
+            'unit': self.unit,
+            'operations': {operation: histogram.to_dict() for operation, histogram in self.histograms.items()},
+        }
+
+    def to_json(self, indent: int = None) -> str:
+        """
+        Method to_json returns the histograms as a JSON string
+        """
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def dump(self, path: str) -> None:
+        """
+        Method dump writes the histograms as JSON to the file at path
+        """
+        with open(path, 'w') as file:
+            file.write(self.to_json(indent=2))
+
+
+def attach(hash_map, unit: str, hooks: dict) -> Instrumentation:
+    """
+    Function attach turns on instrumentation for hash_map. hooks maps the names of the map's internal methods to the
+    counting versions that should shadow them, and the public operations are shadowed with recording wrappers. Both are
+    set on the instance only, so detach restores the class methods
+    """
+    instrumentation = Instrumentation(unit)
+    hash_map._probe_count = getattr(hash_map, '_probe_count', 0)  # never reset, the wrappers only use differences
+    for name, hook in hooks.items():
+        setattr(hash_map, name, hook)
+    for operation in OPERATIONS:
+        setattr(hash_map, operation, instrumentation.wrap(hash_map, operation, getattr(type(hash_map), operation)))
+    hash_map._instrumented = tuple(hooks) + OPERATIONS
+    hash_map.instrumentation = instrumentation
+    return instrumentation
+
+
+def detach(hash_map) -> None:
+    """
+    Function detach turns instrumentation for hash_map off again
+    """
+    for name in hash_map.__dict__.pop('_instrumented', ()):
+        delattr(hash_map, name)
+    hash_map.instrumentation = None
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import time
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\ninstrumented maps, including a put with a ttl")
+    print("---------------------------------------------")
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(16, 'fnv1a')
+        m.enable_instrumentation()
+        for i in range(20):
+            m.put('key' + str(i), i)
+        m.put('session', 'token', ttl=60)
+        print(module.__name__, m.get('session'), m.contains_key('key7'), 0 < m.ttl('session') <= 60,
+              {operation: histogram.count for operation, histogram in m.instrumentation.histograms.items()})
+        m.disable_instrumentation()
+
+    print("\na get that removes an expired key counts the remove's probes too")
+    print("----------------------------------------------------------------")
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(16, 'fnv1a')
+        m.enable_instrumentation()
+        m.put('session', 'token', ttl=0.01)
+        time.sleep(0.02)
+        print(module.__name__, m.get('session'), m.size)
+        histograms = m.instrumentation.histograms
+        assert histograms['remove'].count == 1 and histograms['get'].total >= histograms['remove'].total > 0
+        print(histograms['get'].total, histograms['remove'].total)
+        m.disable_instrumentation()
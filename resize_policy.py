@@ -0,0 +1,108 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Load factor driven resize policy shared by the open addressing and separate chaining hash maps
+
+
+EXACT = 'exact'
+PRIME = 'prime'
+POWER_OF_TWO = 'power_of_two'
+
+
+def next_prime(n: int) -> int:
+    """
+    Function next_prime returns the smallest prime number that is greater than or equal to n
+    """
+    if n <= 2:
+        return 2
+    if n % 2 == 0:
+        n += 1  # even numbers past 2 are never prime
+
+    while True:
+        divisor = 3
+        while divisor * divisor <= n and n % divisor != 0:
+            divisor += 2
+        if divisor * divisor > n:
+            return n
+        n += 2
+
+
+def next_power_of_two(n: int) -> int:
+    """
+    Function next_power_of_two returns the smallest power of two that is greater than or equal to n
+    """
+    if n <= 1:
+        return 1
+    return 1 << (n - 1).bit_length()
+
+
+class ResizePolicy:
+    def __init__(self, max_load: float = 0.75, min_load: float = 0.0, growth_factor: float = 2,
+                 capacity_mode: str = EXACT, min_capacity: int = 1) -> None:
+        """
+        Init new ResizePolicy. The table grows by growth_factor once the load reaches max_load and shrinks by
+        growth_factor once the load drops below min_load (0 disables shrinking). A shrink is only allowed if it
+        cannot immediately trigger another grow, which keeps a table from thrashing at the thresholds
+        """
+        if max_load <= 0:
+            raise ValueError("max_load must be greater than 0")
+        if min_load < 0 or min_load >= max_load:
+            raise ValueError("min_load must be at least 0 and less than max_load")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        if min_load * growth_factor >= max_load:
+            # a table shrunk below min_load would land at or above max_load and grow straight back
+            raise ValueError("min_load * growth_factor must be less than max_load")
+        if capacity_mode not in (EXACT, PRIME, POWER_OF_TWO):
+            raise ValueError("capacity_mode must be one of 'exact', 'prime' or 'power_of_two'")
+
+        self.max_load = max_load
+        self.min_load = min_load
+        self.growth_factor = growth_factor
+        self.capacity_mode = capacity_mode
+        self.min_capacity = max(1, min_capacity)
+
+    def round_capacity(self, capacity: int) -> int:
+        """
+        Method round_capacity returns the capacity the table should actually use for the requested capacity
+        """
+        capacity = max(capacity, self.min_capacity)
+        if self.capacity_mode == PRIME:
+            return next_prime(capacity)
+        if self.capacity_mode == POWER_OF_TWO:
+            return next_power_of_two(capacity)
+        return capacity
+
+    def grow_capacity(self, size: int, capacity: int) -> int:
+        """
+        Method grow_capacity returns the capacity to resize to before an insert, or None if no resize is needed
+        """
+        if size / capacity < self.max_load:
+            return None
+        new_capacity = self.round_capacity(int(capacity * self.growth_factor))
+        return new_capacity if new_capacity > capacity else None
+
+    def shrink_capacity(self, size: int, capacity: int) -> int:
+        """
+        Method shrink_capacity returns the capacity to resize to after a remove, or None if no resize is needed
+        """
+        if self.min_load == 0 or size / capacity >= self.min_load:
+            return None
+        new_capacity = self.round_capacity(int(capacity / self.growth_factor))
+        if new_capacity >= capacity or size / new_capacity >= self.max_load:
+            return None  # rounding left nothing to give back, or the smaller table would need to grow again
+        return new_capacity
+
+
+# the policy the open addressing map has always used: double the capacity once the load reaches 0.5
+OPEN_ADDRESSING_DEFAULT = ResizePolicy(max_load=0.5, growth_factor=2)
+
+# Robin Hood hashing keeps probe sequences short enough to fill the table to 0.9 before doubling it
+ROBIN_HOOD_DEFAULT = ResizePolicy(max_load=0.9, growth_factor=2)
+
+# Swiss tables scan aligned groups of 16 buckets, so the capacity is a power of two of at least one group, and
+# the one byte fingerprints keep lookups cheap up to 7/8 full
+SWISS_TABLE_DEFAULT = ResizePolicy(max_load=0.875, growth_factor=2, capacity_mode=POWER_OF_TWO, min_capacity=16)
+
+# buckets of four slots with two choices each, plus a small stash, stay insertable well past 0.9 full
+CUCKOO_DEFAULT = ResizePolicy(max_load=0.9, growth_factor=2)
@@ -0,0 +1,245 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Compact binary snapshot format for the hash maps. A snapshot is a small header followed by one
+# length-prefixed record per live key, optionally compressed, and it is written and read a chunk at a time so
+# neither side ever holds the whole encoding in memory
+
+
+import bz2
+import itertools
+import lzma
+import pickle
+import struct
+import zlib
+
+from hash_functions import HASH_FUNCTIONS, function_name, resolve_hash_function
+from hash_map_shared import INT, decode_value, encode_value
+
+
+MAGIC = b'HMSNAP\r\n'  # the line ending bytes catch a snapshot mangled by a text mode stream
+FORMAT_VERSION = 1
+
+# magic, format version, compression, hash function name length, capacity, number of records
+HEADER = struct.Struct('<8sHBBQQ')
+
+# hash (as an unsigned 64 bit value), key length, value length, followed by the key's UTF-8 bytes and the value
+RECORD = struct.Struct('<QII')
+CHECKSUM = struct.Struct('<I')  # CRC-32 of every record, written after the last one
+
+PICKLE = 7  # value tag for anything hash_map_shared.encode_value cannot encode, after its own tags
+CHUNK_SIZE = 1 << 16  # bytes encoded before a write, and read from the stream at a time
+
+MASK_64 = (1 << 64) - 1
+
+# compression names in the order of their header ids, with the (compressor, decompressor) factories
+COMPRESSION = (None, 'zlib', 'bz2', 'lzma')
+CODECS = {
+    'zlib': (zlib.compressobj, zlib.decompressobj),
+    'bz2': (bz2.BZ2Compressor, bz2.BZ2Decompressor),
+    'lzma': (lzma.LZMACompressor, lzma.LZMADecompressor),
+}
+
+
+def encode(value: object) -> bytes:
+    """
+    Function encode returns the snapshot encoding of value, pickling it only if it is not a primitive
+    """
+    try:
+        return encode_value(value)
+    except TypeError:
+        return bytes((PICKLE,)) + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(data: bytes) -> object:
+    """
+    Function decode returns the value encoded in data
+    """
+    if data[0] == PICKLE:
+        return pickle.loads(data[1:])
+    return decode_value(data, 0, len(data))
+
+
+def dump(stream, capacity: int, function, size: int, entries, compression: str = None) -> None:
+    """
+    Function dump writes a snapshot of a hash map to the binary stream. entries yields (hash, key, value) for each of
+    the size live keys. capacity and the name of the registered hash function are recorded so load can size the
+    table up front and reuse the stored hashes. compression is None, 'zlib', 'bz2' or 'lzma'
+    """
+    if compression not in COMPRESSION:
+        raise ValueError(f"unknown compression {compression!r}, choose one of {COMPRESSION}")
+    name = function_name(function).encode()
+    stream.write(HEADER.pack(MAGIC, FORMAT_VERSION, COMPRESSION.index(compression), len(name), capacity, size))
+    stream.write(name)
+
+    compressor = CODECS[compression][0]() if compression else None
+    pack, chunk, checksum, count = RECORD.pack, bytearray(), 0, 0
+
+    for hash, key, value in entries:
+        key_bytes, value_bytes = key.encode(), encode(value)
+        chunk += pack(hash & MASK_64, len(key_bytes), len(value_bytes))
+        chunk += key_bytes
+        chunk += value_bytes
+        count += 1
+        if len(chunk) >= CHUNK_SIZE:
+            checksum = zlib.crc32(chunk, checksum)
+            stream.write(compressor.compress(chunk) if compressor else chunk)
+            chunk = bytearray()
+
+    if count != size:
+        raise RuntimeError(f"expected {size} entries but got {count}")
+    checksum = zlib.crc32(chunk, checksum)
+    chunk += CHECKSUM.pack(checksum)
+    stream.write(compressor.compress(chunk) + compressor.flush() if compressor else chunk)
+
+
+class _ChunkReader:
+    """
+    Reads a stream a chunk at a time through an optional decompressor, keeping the CRC-32 of the bytes consumed
+    """
+
+    def __init__(self, stream, decompressor=None) -> None:
+        """
+        Init new _ChunkReader over stream
+        """
+        self.stream = stream
+        self.decompressor = decompressor
+        self.checksum = 0
+
+    def fill(self, data: bytes, position: int, count: int) -> tuple:
+        """
+        Method fill takes the chunk being parsed and the position parsing has reached in it, and returns (data, 0)
+        where data starts at that position and holds at least count bytes. It raises ValueError if the stream ends
+        first
+        """
+        self.consume(data, position)
+        data = data[position:]
+        while len(data) < count:
+            chunk = self.stream.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("snapshot is truncated")
+            data += self.decompressor.decompress(chunk) if self.decompressor is not None else chunk
+        return data, 0
+
+    def consume(self, data: bytes, position: int) -> None:
+        """
+        Method consume adds the bytes of data before position to the checksum
+        """
+        self.checksum = zlib.crc32(memoryview(data)[:position], self.checksum)
+
+
+def load(stream, function=None) -> tuple:
+    """
+    Function load reads a snapshot header from the binary stream and returns (capacity, hash function, size,
+    entries). The hash function is the one recorded in the snapshot unless function is given. entries is an iterator
+    over the (hash, key, value) records, with each hash recomputed if the stored one cannot be trusted, and it raises
+    ValueError at the end if the snapshot is truncated or its checksum is wrong. The records are read ahead a chunk
+    at a time, so the snapshot should be the rest of the stream
+    """
+    header = stream.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise ValueError("snapshot is truncated")
+    magic, version, compression, name_length, capacity, size = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("not a hash map snapshot, or one written by an incompatible version")
+    if compression >= len(COMPRESSION):
+        raise ValueError(f"snapshot uses unknown compression id {compression}")
+    name = stream.read(name_length).decode()
+
+    if function is None:
+        if not name:
+            raise ValueError("the snapshot was written with an unregistered hash function, pass it as function")
+        function = name
+    function = resolve_hash_function(function)
+
+    compression = COMPRESSION[compression]
+    entries = _entries(_ChunkReader(stream, CODECS[compression][1]() if compression else None), size)
+    return capacity, function, size, _hashed(entries, function, name)
+
+
+def _hashed(entries, function, name: str):
+    """
+    Helper _hashed returns the entries with each hash made by function. The stored hashes are kept if function is the
+    registered one they were made with (registered functions give 64 bit hashes, so storing them loses nothing) and
+    it still gives the first key the same hash, which 'builtin' does not in a process with another hash seed.
+    Otherwise every key is hashed again
+    """
+    if not name or HASH_FUNCTIONS.get(name) is not function:
+        return ((function(key), key, value) for _, key, value in entries)
+
+    first = next(entries, None)
+    if first is None:
+        return entries
+    if function(first[1]) == first[0]:
+        return itertools.chain((first,), entries)
+    return ((function(key), key, value) for _, key, value in itertools.chain((first,), entries))
+
+
+def _entries(reader: _ChunkReader, size: int):
+    """
+    Helper _entries yields the size records of a snapshot and then checks its checksum. Records are parsed straight
+    out of the chunk they are in, and a record split between chunks is joined up by _ChunkReader.fill
+    """
+    unpack_from, record_size, fill = RECORD.unpack_from, RECORD.size, reader.fill
+    data, position = b'', 0
+
+    for _ in range(size):
+        if position + record_size > len(data):
+            data, position = fill(data, position, record_size)
+        hash, key_length, value_length = unpack_from(data, position)
+        end = position + record_size + key_length + value_length
+        if end > len(data):
+            data, position = fill(data, position, end - position)
+            end = record_size + key_length + value_length
+
+        value_start = position + record_size + key_length
+        key = data[position + record_size:value_start].decode()
+        tag = data[value_start]
+        if tag == INT:  # the most common value, decoded here to save a call
+            value = int.from_bytes(data[value_start + 1:end], 'little', signed=True)
+        elif tag == PICKLE:
+            value = pickle.loads(data[value_start + 1:end])
+        else:
+            value = decode_value(data, value_start, value_length)
+        position = end
+        yield hash, key, value
+
+    data, _ = fill(data, position, CHECKSUM.size)  # the checksum covers every byte before the trailer
+    if CHECKSUM.unpack_from(data)[0] != reader.checksum:
+        raise ValueError("snapshot checksum does not match, the data is corrupt")
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import io
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\ndump and load with each compression")
+    print("-----------------------------------")
+    for module in (hash_map_oa, hash_map_sc):
+        m = module.HashMap(100, 'fnv1a')
+        for i in range(50):
+            m.put('key' + str(i), i)
+        m.put('key1', 'one')
+        m.put('key2', [2, 'two'])  # not a primitive, so it is pickled
+        for compression in COMPRESSION:
+            stream = io.BytesIO()
+            m.dump(stream, compression)
+            stream.seek(0)
+            loaded = module.HashMap.load(stream)
+            print(module.__name__, compression, len(stream.getvalue()), loaded.size, loaded.capacity,
+                  loaded.get('key1'), loaded.get('key2'), loaded.get('key49'))
+
+    print("\na corrupt snapshot")
+    print("------------------")
+    stream = io.BytesIO()
+    m.dump(stream)
+    data = bytearray(stream.getvalue())
+    data[-5] ^= 0xFF  # the last byte of the last value, just before the checksum
+    try:
+        hash_map_sc.HashMap.load(io.BytesIO(data))
+    except ValueError as error:
+        print(type(error).__name__, error)
@@ -0,0 +1,408 @@
+# Name: Brian Chamberlain
+# OSU Email: chambbri@oregonstate.edu
+# Course: CS261 - Data Structures
+# Description: Write-ahead log for hash_map_oa.HashMap and hash_map_sc.HashMap. Every change is appended to a log
+# segment, a background thread writes and fsyncs the log in batches (group commit), and old segments are compacted
+# into a snapshot (see snapshot.py) in the background, so recovering a map means loading one snapshot and replaying
+# the segments written after it. Keys put with a ttl are logged with their deadline and expire on schedule after
+# recovery
+
+
+import os
+import struct
+import threading
+import time
+import zlib
+
+import snapshot
+from hash_map_mmap import sync_directory
+
+
+PUT, REMOVE, CLEAR = 1, 2, 3
+PUT_EXPIRING = 4  # a put whose value starts with the key's deadline
+EXPIRE = 5  # sets the deadline of a key already in the map, the value is only the deadline
+
+DEADLINE = struct.Struct('<d')  # time.time() at which a key expires, wall clock time so it survives a restart
+
+# CRC-32 of the rest of the record, operation, key length, value length, followed by the key and the value
+RECORD = struct.Struct('<IBII')
+CHECKSUM = struct.Struct('<I')
+HEAD = struct.Struct('<BII')  # the part of RECORD after the checksum
+
+SEGMENT = 'log.{:08d}'  # a log segment, numbered in the order they were written
+SNAPSHOT = 'snapshot.{:08d}'  # a snapshot holding the changes of every segment numbered below its own number
+DEADLINES = 'deadlines.{:08d}'  # EXPIRE records for the keys of the snapshot with the same number that have a ttl
+
+REPLAY_BATCH = 4096  # puts collected before recovery applies them together
+
+
+def _record(operation: int, key: bytes = b'', value: bytes = b'') -> bytes:
+    """
+    Helper _record returns the encoded log record for one change
+    """
+    body = HEAD.pack(operation, len(key), len(value)) + key + value
+    return CHECKSUM.pack(zlib.crc32(body)) + body
+
+
+def _scan(directory: str) -> tuple:
+    """
+    Helper _scan returns the sorted numbers of the snapshots, of the log segments and of the deadline files in
+    directory
+    """
+    snapshots, segments, deadlines = [], [], []
+    for name in os.listdir(directory):
+        kind, _, number = name.partition('.')
+        if number.isdigit():
+            if kind == 'snapshot':
+                snapshots.append(int(number))
+            elif kind == 'log':
+                segments.append(int(number))
+            elif kind == 'deadlines':
+                deadlines.append(int(number))
+    return sorted(snapshots), sorted(segments), sorted(deadlines)
+
+
+def _replay(path: str, hash_map) -> int:
+    """
+    Helper _replay applies every change in the log segment at path to hash_map and returns the length of the valid
+    part of the segment. A record cut short or with the wrong checksum is the tail a crash left half written, so
+    replay stops there. Runs of puts are applied with put_many, which sizes the table once per run. A key whose
+    deadline has passed is removed instead of put
+    """
+    unpack, size, decode = RECORD.unpack, RECORD.size, snapshot.decode
+    deadline_size = DEADLINE.size
+    valid = 0
+    pairs = []
+
+    with open(path, 'rb') as file:
+        read = file.read
+        while True:
+            head = read(size)
+            if len(head) < size:
+                break
+            checksum, operation, key_length, value_length = unpack(head)
+            data = read(key_length + value_length)
+            if len(data) < key_length + value_length or zlib.crc32(data, zlib.crc32(head[4:])) != checksum:
+                break
+            valid += size + key_length + value_length
+
+            if operation == PUT:
+                pairs.append((data[:key_length].decode(), decode(data[key_length:])))
+                if len(pairs) < REPLAY_BATCH:
+                    continue
+            if pairs:
+                hash_map.put_many(pairs)
+                pairs = []
+            if operation == REMOVE:
+                hash_map.remove(data.decode())
+            elif operation == CLEAR:
+                hash_map.clear()
+            elif operation in (PUT_EXPIRING, EXPIRE):
+                key = data[:key_length].decode()
+                ttl = DEADLINE.unpack_from(data, key_length)[0] - time.time()
+                if ttl <= 0:
+                    hash_map.remove(key)
+                elif operation == PUT_EXPIRING:
+                    hash_map.put(key, decode(data[key_length + deadline_size:]), ttl=ttl)
+                elif hash_map.contains_key(key):
+                    hash_map.put(key, hash_map.get(key), ttl=ttl)
+
+    if pairs:
+        hash_map.put_many(pairs)
+    return valid
+
+
+def _load_snapshot(directory: str, number: int, map_class, capacity: int, function, kwargs: dict):
+    """
+    Helper _load_snapshot returns a map_class holding the snapshot numbered number, with the deadlines saved along
+    with it, or an empty one if number is 0
+    """
+    if number == 0:
+        return map_class(capacity, function, **kwargs)
+    with open(os.path.join(directory, SNAPSHOT.format(number)), 'rb') as stream:
+        hash_map = map_class.load(stream, function, **kwargs)
+    deadlines = os.path.join(directory, DEADLINES.format(number))
+    if os.path.exists(deadlines):
+        _replay(deadlines, hash_map)
+    return hash_map
+
+
+def open_map(directory: str, map_class, capacity: int, function, sync_interval: float = 0.01,
+             sync_bytes: int = 1 << 20, compact_bytes: int = 64 << 20, compression: str = None, **kwargs):
+    """
+    Function open_map returns a map_class (hash_map_oa.HashMap or hash_map_sc.HashMap) holding the contents logged in
+    directory, with a WriteAheadLog attached so every later change is logged as well. An empty or missing directory
+    gives an empty map of the given capacity. The other arguments are passed to the WriteAheadLog, and any keyword
+    argument left over to map_class
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.tmp'):
+            os.remove(os.path.join(directory, name))  # a snapshot a compaction never finished
+
+    snapshots, segments, deadlines = _scan(directory)
+    base = snapshots[-1] if snapshots else 0
+    hash_map = _load_snapshot(directory, base, map_class, capacity, function, kwargs)
+
+    for number in segments:
+        path = os.path.join(directory, SEGMENT.format(number))
+        if number < base:
+            os.remove(path)  # already in the snapshot, left behind by a compaction that crashed while cleaning up
+            continue
+        valid = _replay(path, hash_map)
+        if valid < os.path.getsize(path):
+            os.truncate(path, valid)  # drop the torn tail so the segment replays the same way next time
+    for number in snapshots[:-1]:
+        os.remove(os.path.join(directory, SNAPSHOT.format(number)))
+    for number in deadlines:
+        if number != base:
+            os.remove(os.path.join(directory, DEADLINES.format(number)))
+
+    next_segment = max(segments[-1] if segments else 0, base) + 1
+    hash_map.wal = WriteAheadLog(directory, next_segment, base, map_class, capacity, hash_map.hash_function, kwargs,
+                                 sync_interval, sync_bytes, compact_bytes, compression)
+    return hash_map
+
+
+class WriteAheadLog:
+    """
+    Log of the changes to one hash map. Records are collected in memory and written and fsynced together, by a
+    background thread every sync_interval seconds and as soon as sync_bytes are waiting, so a change costs an append
+    to a buffer instead of an fsync. A crash loses at most the changes of the last sync_interval; call commit to wait
+    until everything logged so far is on disk. A sync_interval of 0 fsyncs every change before it returns instead.
+    Once compact_bytes have been logged since the last snapshot, the log moves on to a new segment and a background
+    thread writes a new snapshot from the old snapshot and segments, without touching the live map. A compact_bytes
+    of None leaves compaction to explicit calls to compact
+    """
+
+    def __init__(self, directory: str, segment: int, snapshot_number: int, map_class, capacity: int, function,
+                 map_kwargs: dict, sync_interval: float = 0.01, sync_bytes: int = 1 << 20,
+                 compact_bytes: int = 64 << 20, compression: str = None) -> None:
+        """
+        Init new WriteAheadLog that writes to segment number segment in directory. Use open_map rather than
+        creating one directly
+        """
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self.sync_bytes = sync_bytes
+        self.compact_bytes = compact_bytes
+        self.compression = compression
+        self._map_class, self._capacity, self._function, self._map_kwargs = map_class, capacity, function, map_kwargs
+
+        self._segment = segment
+        self._snapshot = snapshot_number  # number of the newest complete snapshot, 0 for none
+        self._file = open(os.path.join(directory, SEGMENT.format(segment)), 'ab')
+        self._logged = 0  # bytes logged since the newest snapshot was started
+        self._buffer = bytearray()
+        self._buffer_lock = threading.Lock()  # guards _buffer
+        self._commit_lock = threading.Lock()  # one commit or segment switch at a time
+        self._compaction = None
+        self.error = None  # an exception raised by a background thread, raised again by the next commit
+
+        self._closed = threading.Event()
+        self._wake = threading.Event()
+        self._syncer = None
+        if sync_interval > 0:
+            self._syncer = threading.Thread(target=self._sync_loop, daemon=True)
+            self._syncer.start()
+
+    def _append(self, record: bytes) -> None:
+        """
+        Method _append adds a record to the log
+        """
+        with self._buffer_lock:
+            self._buffer += record
+            waiting = len(self._buffer)
+        if self._syncer is None:
+            self.commit()
+        elif waiting >= self.sync_bytes:
+            self._wake.set()
+
+    def log_put(self, key: str, value: object, ttl: float = None) -> None:
+        """
+        Method log_put logs that key was set to value, expiring ttl seconds from now if ttl is given
+        """
+        if ttl is None:
+            self._append(_record(PUT, key.encode(), snapshot.encode(value)))
+        else:
+            self._append(_record(PUT_EXPIRING, key.encode(), DEADLINE.pack(time.time() + ttl) + snapshot.encode(value)))
+
+    def log_put_many(self, pairs) -> None:
+        """
+        Method log_put_many logs a put for every (key, value) pair, as one append
+        """
+        self._append(b''.join(_record(PUT, key.encode(), snapshot.encode(value)) for key, value in pairs))
+
+    def log_remove(self, key: str) -> None:
+        """
+        Method log_remove logs that key was removed
+        """
+        self._append(_record(REMOVE, key.encode()))
+
+    def log_remove_many(self, keys) -> None:
+        """
+        Method log_remove_many logs a remove for every key, as one append
+        """
+        self._append(b''.join(_record(REMOVE, key.encode()) for key in keys))
+
+    def log_clear(self) -> None:
+        """
+        Method log_clear logs that the map was cleared
+        """
+        self._append(_record(CLEAR))
+
+    def commit(self) -> None:
+        """
+        Method commit writes every record logged so far to the current segment and waits for the fsync. It also
+        raises any exception a background thread ran into
+        """
+        with self._commit_lock:
+            with self._buffer_lock:
+                data, self._buffer = self._buffer, bytearray()
+            if data:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._logged += len(data)
+
+            if (self.compact_bytes is not None and self._logged >= self.compact_bytes and self._compaction is None
+                    and not self._closed.is_set()):  # close must not leave a compaction running behind it
+                self._start_compaction()
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _sync_loop(self) -> None:
+        """
+        Method _sync_loop is the background thread that commits every sync_interval, or sooner when woken
+        """
+        while not self._closed.is_set():
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            try:
+                self.commit()
+            except Exception as error:
+                self.error = error
+
+    def compact(self, wait: bool = False) -> None:
+        """
+        Method compact starts a compaction now instead of waiting for compact_bytes to be logged, and with wait set
+        waits for it to finish. Nothing new is started if a compaction is already running
+        """
+        self.commit()
+        with self._commit_lock:
+            if self._compaction is None:
+                self._start_compaction()
+            compaction = self._compaction
+        if wait and compaction is not None:
+            compaction.join()
+            self.commit()
+
+    def _start_compaction(self) -> None:
+        """
+        Method _start_compaction closes the current segment, starts a new one and compacts the closed ones in a
+        background thread. The commit lock must be held
+        """
+        self._file.close()
+        closed = self._segment
+        self._segment += 1
+        self._file = open(os.path.join(self.directory, SEGMENT.format(self._segment)), 'ab')
+        self._logged = 0
+        self._compaction = threading.Thread(target=self._compact, args=(closed,), daemon=True)
+        self._compaction.start()
+
+    def _compact(self, last_segment: int) -> None:
+        """
+        Method _compact is the background thread that replays every segment up to last_segment on top of the newest
+        snapshot, writes the result as a new snapshot and then deletes the files it replaces
+        """
+        try:
+            directory, base = self.directory, self._snapshot
+            hash_map = _load_snapshot(directory, base, self._map_class, self._capacity, self._function,
+                                      self._map_kwargs)
+            segments = [number for number in _scan(directory)[1] if base <= number <= last_segment]
+            for number in segments:
+                _replay(os.path.join(directory, SEGMENT.format(number)), hash_map)
+            hash_map.expire()  # no need to save keys that have already expired
+
+            # the snapshot format has no room for deadlines, so they go in a file of their own, which has to be in
+            # place before the snapshot is. Both are written under a temporary name and renamed once on disk
+            number = last_segment + 1
+            path = os.path.join(directory, SNAPSHOT.format(number))
+            deadlines = os.path.join(directory, DEADLINES.format(number))
+            if hash_map.expiry is not None and hash_map.expiry.deadlines:
+                now = time.time()
+                with open(deadlines + '.tmp', 'wb') as stream:
+                    stream.write(b''.join(_record(EXPIRE, key.encode(), DEADLINE.pack(now + hash_map.ttl(key)))
+                                          for key in hash_map.expiry.deadlines))
+                    stream.flush()
+                    os.fsync(stream.fileno())
+                os.replace(deadlines + '.tmp', deadlines)
+            with open(path + '.tmp', 'wb') as stream:
+                hash_map.dump(stream, self.compression)
+                stream.flush()
+                os.fsync(stream.fileno())
+            os.replace(path + '.tmp', path)
+            sync_directory(path)
+            self._snapshot = number
+
+            if base:
+                os.remove(os.path.join(directory, SNAPSHOT.format(base)))
+                if os.path.exists(os.path.join(directory, DEADLINES.format(base))):
+                    os.remove(os.path.join(directory, DEADLINES.format(base)))
+            for number in segments:
+                os.remove(os.path.join(directory, SEGMENT.format(number)))
+        except Exception as error:
+            self.error = error
+        finally:
+            self._compaction = None
+
+    def close(self) -> None:
+        """
+        Method close commits everything logged, waits for a running compaction and stops the background thread
+        """
+        self._closed.set()
+        self._wake.set()
+        if self._syncer is not None:
+            self._syncer.join()
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        self.commit()
+        self._file.close()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import tempfile
+
+    import hash_map_oa
+    import hash_map_sc
+
+    print("\nlog, crash, recover and compact")
+    print("-------------------------------")
+    for module in (hash_map_oa, hash_map_sc):
+        with tempfile.TemporaryDirectory() as directory:
+            m = open_map(directory, module.HashMap, 16, 'fnv1a')
+            for i in range(100):
+                m.put('key' + str(i), i)
+            m.put_many([('key1', 'one'), ('key100', 100)])
+            m.remove('key2')
+            m.remove_many(['key3', 'key4'])
+            m.wal.close()
+
+            # a crash while writing leaves half a record at the end of the segment
+            with open(os.path.join(directory, SEGMENT.format(m.wal._segment)), 'ab') as file:
+                file.write(_record(PUT, b'key5', snapshot.encode('lost'))[:-2])
+
+            m = open_map(directory, module.HashMap, 16, 'fnv1a')
+            print(module.__name__, m.size, m.get('key1'), m.get('key2'), m.get('key5'), m.get('key100'))
+            m.wal.compact(wait=True)
+            m.put('key6', 'six')
+            m.wal.close()
+
+            m = open_map(directory, module.HashMap, 16, 'fnv1a')
+            print(module.__name__, m.size, m.get('key1'), m.get('key6'), sorted(os.listdir(directory)))
+            m.wal.close()